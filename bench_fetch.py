@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+RSS 获取性能基准测试
+
+启动本地 HTTP 服务器提供可配置大小、延迟和失败率的合成 RSS，
+分别测试 fetch_single_source 和 fetch_multiple_sources，输出 p50/p95 延迟、
+每秒条目数和峰值内存。服务器运行在独立进程中，不影响被测进程的内存和延迟统计。
+可用 --max-p95 作为回归门槛（超出时退出码为 1）。
+
+运行方式: uv run python bench_fetch.py --sources 20 --latency-ms 200
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from services.rss_fetcher import fetch_multiple_sources, fetch_single_source
+
+
+def build_feed(feed_id: str, items: int, body_chars: int) -> bytes:
+    """生成合成 RSS 文档"""
+    now = time.time()
+    body = ("合成新闻正文内容，用于测试解析性能。" * (body_chars // 18 + 1))[:body_chars]
+    entries = []
+    for i in range(items):
+        entries.append(
+            f"<item><title>{feed_id} 新闻 {i}</title>"
+            f"<link>https://bench.local/{feed_id}/{i}</link>"
+            f"<pubDate>{formatdate(now - i * 600, usegmt=True)}</pubDate>"
+            f"<description><![CDATA[<p>{body}</p>]]></description>"
+            f'<media:content url="https://bench.local/img/{feed_id}/{i}.jpg" medium="image"/>'
+            f"</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>'
+        f"<title>{feed_id}</title>{''.join(entries)}</channel></rss>"
+    ).encode("utf-8")
+
+
+class SyntheticFeedHandler(BaseHTTPRequestHandler):
+    """/feed/<id>?items=&body=&latency=&fail= 返回合成 RSS"""
+
+    rng = random.Random(42)
+    rng_lock = threading.Lock()
+    feed_cache: Dict[tuple, bytes] = {}
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        items = int(params.get("items", 50))
+        body_chars = int(params.get("body", 2000))
+        latency = float(params.get("latency", 0)) / 1000
+        fail_rate = float(params.get("fail", 0))
+
+        if latency:
+            time.sleep(latency)
+
+        with self.rng_lock:
+            failed = self.rng.random() < fail_rate
+        if failed:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        key = (parsed.path, items, body_chars)
+        body = self.feed_cache.get(key)
+        if body is None:
+            body = build_feed(parsed.path.rsplit("/", 1)[-1], items, body_chars)
+            self.feed_cache[key] = body
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端读够条目后提前关闭连接
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(port_queue) -> None:
+    """子进程入口：启动合成服务器并把端口号交给父进程"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SyntheticFeedHandler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server() -> Tuple[multiprocessing.Process, int]:
+    """在独立进程中启动合成服务器，返回 (进程, 端口号)"""
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(port_queue,), daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: List[float], items: int, elapsed: float, peak_bytes: int) -> Dict:
+    return {
+        "name": name,
+        "runs": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "items": items,
+        "items_per_sec": items / elapsed if elapsed > 0 else 0.0,
+        "peak_mem_mb": peak_bytes / 1024 / 1024,
+    }
+
+
+def bench_single(base: str, args) -> Dict:
+    """重复获取单个源"""
+    latencies = []
+    total_items = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(args.rounds):
+        url = f"{base}/feed/single?{args.query}&r={i}"
+        t0 = time.perf_counter()
+        news_list = fetch_single_source(url, "基准源", count=args.count, use_cache=False)
+        latencies.append(time.perf_counter() - t0)
+        total_items += len(news_list)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize("fetch_single_source", latencies, total_items, elapsed, peak)
+
+
+def bench_multiple(base: str, args) -> Dict:
+    """批量获取多个源"""
+    latencies = []
+    total_items = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for r in range(args.rounds):
+        sources = [
+            {"name": f"源{i}", "url": f"{base}/feed/s{i}?{args.query}&r={r}", "count": args.count}
+            for i in range(args.sources)
+        ]
+        t0 = time.perf_counter()
+        news_list = fetch_multiple_sources(
+            sources,
+            use_cache=False,
+            max_age_hours=0,
+            parse_in_process=args.process_parse,
+        )
+        latencies.append(time.perf_counter() - t0)
+        total_items += len(news_list)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(f"fetch_multiple_sources[{args.sources}]", latencies, total_items, elapsed, peak)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="RSS 获取性能基准测试")
+    parser.add_argument("--items", type=int, default=100, help="每个合成源的条目数")
+    parser.add_argument("--body-chars", type=int, default=2000, help="每条正文字符数")
+    parser.add_argument("--latency-ms", type=float, default=50, help="服务器响应延迟（毫秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="服务器失败率（0-1）")
+    parser.add_argument("--sources", type=int, default=10, help="批量测试的源数量")
+    parser.add_argument("--count", type=int, default=5, help="每个源获取的条目数")
+    parser.add_argument("--rounds", type=int, default=10, help="每项测试的重复次数")
+    parser.add_argument("--process-parse", action="store_true", help="批量测试时在进程池中解析")
+    parser.add_argument("--max-p95", type=float, default=None, help="批量获取 p95 延迟门槛（毫秒），超出时退出码为 1")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+    args.query = f"items={args.items}&body={args.body_chars}&latency={args.latency_ms}&fail={args.failure_rate}"
+
+    server, port = start_server()
+    base = f"http://127.0.0.1:{port}"
+    try:
+        results = [bench_single(base, args), bench_multiple(base, args)]
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"\n{'测试项':32} {'p50(ms)':>9} {'p95(ms)':>9} {'条目/秒':>9} {'峰值内存(MB)':>12}")
+        for r in results:
+            print(f"{r['name']:32} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['items_per_sec']:9.1f} {r['peak_mem_mb']:12.2f}")
+
+    if args.max_p95 is not None and results[1]["p95_ms"] > args.max_p95:
+        print(f"\n✗ 批量获取 p95 {results[1]['p95_ms']:.1f}ms 超过门槛 {args.max_p95}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
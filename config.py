@@ -28,6 +28,18 @@ AI_API_KEY = _llm_config.get("api_key") or os.getenv("AI_API_KEY", os.getenv("KI
 AI_BASE_URL = _llm_config.get("base_url") or os.getenv("AI_BASE_URL", "https://api.moonshot.cn/v1")
 AI_MODEL = _llm_config.get("model") or os.getenv("AI_MODEL", "kimi-k2-turbo-preview")
 
+AI_MAX_CONCURRENCY = 4  # 批量生成文案时同时进行的最大请求数
+AI_ITEM_TIMEOUT = 60  # 单条新闻生成文案的超时（秒），超时后使用备用方案
+AI_BATCH_SIZE = 1  # 每个请求打包的新闻条数（1 表示逐条请求）。可设为 3 减少请求数和提示词开销，但同组条目要等整组完成
+AI_INPUT_TOKEN_BUDGET = 400  # 每条新闻正文发送给 AI 前压缩到的 token 预算（0 表示只去除样板文字）
+AI_STREAM_PREVIEW = True  # 生成文案预览时流式接收，字段一完成就先显示在预览卡片上
+AI_RPM_LIMIT = 60  # 每分钟最多请求数（0 表示不限制），按所用接口的限额调整
+AI_TPM_LIMIT = 100000  # 每分钟最多 token 数（0 表示不限制）
+AI_MAX_RETRIES = 4  # 限流、超时或服务端错误时的最多重试次数
+AI_MAX_CONNECTIONS = 10  # AI 接口连接池大小
+LLM_CACHE_TTL = 7 * 24 * 3600  # AI 文案缓存有效期（秒），同一新闻重复生成时直接复用
+LLM_CACHE_MAX_ROWS = 2000  # AI 文案缓存最多保留的记录数，超出时淘汰最久未使用的
+
 # 兼容旧配置
 QWEN_API_KEY = AI_API_KEY  # 保持向后兼容
 QWEN_BASE_URL = AI_BASE_URL
@@ -53,6 +65,37 @@ _default_rss_presets = {
 
 RSS_PRESETS: Dict[str, List[Dict[str, any]]] = _user_config.get("rss_sources", _default_rss_presets)
 
+# ===== RSS 获取配置 =====
+RSS_FETCH_MAX_WORKERS = 6  # 并发获取的最大线程数
+RSS_SOURCE_TIMEOUT = 10  # 单个源的请求超时（秒）
+RSS_TOTAL_TIMEOUT = 30  # 一次批量获取的总截止时间（秒）
+RSS_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+RSS_STREAM_PARSE = True  # 使用流式解析（读够条数即停止），格式异常时回退到 feedparser
+RSS_PARSE_IN_PROCESS = False  # 在进程池中解析 RSS（源很多时可利用多核），下载仍使用线程
+RSS_PARSE_PROCESSES = 0  # 解析进程数，0 表示使用 CPU 核数
+RSS_MAX_AGE_HOURS = 0  # 只保留最近 N 小时内发布的新闻（如 72），0 表示不限制
+RSS_PER_SOURCE_QUOTA = 0  # 时间过滤后每个源最多保留的条数，0 表示不限制
+RSS_CONTENT_MAX_CHARS = 3000  # 保存的新闻摘要最大长度，发送给 AI 前再按 AI_INPUT_TOKEN_BUDGET 压缩
+RSS_CACHE_TTL = 300  # RSS 缓存有效期（秒），有效期内重复获取不发起网络请求
+NEWS_DEDUP_THRESHOLD = 0.9  # 跨来源去重的相似度阈值（0-1），越高越严格
+HISTORY_SKIP_SEEN = False  # True: 获取时直接过滤已制作过的新闻；False: 仅标记
+
+# ===== 后台轮询配置（services/feed_poller.py）=====
+POLL_MIN_INTERVAL = 300  # 最短轮询间隔（秒）
+POLL_MAX_INTERVAL = 3600  # 最长轮询间隔（秒）
+POLL_MAX_BACKOFF = 6 * 3600  # 连续失败时的最长退避间隔（秒）
+
+# ===== 原文正文抓取配置（services/article_extractor.py）=====
+ARTICLE_FETCH_ENABLED = False  # 生成文案前是否默认抓取原文全文（界面中可切换）
+ARTICLE_FETCH_WORKERS = 6  # 并发抓取的最大线程数
+ARTICLE_PER_HOST_LIMIT = 2  # 同一域名的最大并发连接数
+ARTICLE_FETCH_TIMEOUT = 10  # 单个页面的请求超时（秒）
+ARTICLE_FETCH_DEADLINE = 20  # 一批页面抓取的总截止时间（秒），超时的新闻继续使用 RSS 摘要
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024  # 单个页面最多读取的字节数
+ARTICLE_MIN_CHARS = 200  # 抽取的正文少于该字数时视为失败，继续使用 RSS 摘要
+ARTICLE_CACHE_TTL = 7 * 24 * 3600  # 正文缓存有效期（秒）
+ARTICLE_SHORT_CACHE_TTL = 3600  # 正文过短（抽取失败）时的缓存有效期（秒），到期后重新抓取
+
 # ===== 图片生成配置 =====
 LAYOUT_CONFIG = {
     "canvas_width": 1920,
@@ -72,6 +115,21 @@ LAYOUT_CONFIG = {
     "card_width_ratio": 0.85,
 }
 
+# 新闻配图下载
+IMAGE_DOWNLOAD_TIMEOUT = 10  # 单张配图的请求超时（秒）
+IMAGE_DOWNLOAD_WORKERS = 8  # 并发下载的最大线程数
+IMAGE_PER_HOST_LIMIT = 2  # 同一域名的最大并发连接数
+IMAGE_DOWNLOAD_DEADLINE = 30  # 一批配图下载的总截止时间（秒）
+IMAGE_FIT_MODE = "letterbox"  # 配图画布布局：letterbox 缩放居中留白；fill 按 16:9 裁切细节最丰富的区域铺满画布
+IMAGE_PROCESS_IN_POOL = False  # 在进程池中生成配图画布（配图很多且多核时更快；冷启动需数秒，打包后需确认可用），下载仍使用线程
+IMAGE_PROCESS_WORKERS = 0  # 配图处理进程数，0 表示使用 CPU 核数
+IMAGE_MAX_BYTES = 10 * 1024 * 1024  # 单张配图的最大字节数，超出时放弃下载
+IMAGE_MAX_PIXELS = 40_000_000  # 单张配图的最大像素数（宽×高）
+IMAGE_MIN_SIDE = 120  # 配图短边的最小像素数，更小的图片（图标、统计像素等）直接跳过
+IMAGE_DEDUP_DISTANCE = 8  # 配图感知哈希的最大汉明距离（0-64），不超过时视为同一张图片
+IMAGE_CACHE_TTL = 7 * 24 * 3600  # 配图缓存有效期（秒），过期后发起条件请求校验
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # 配图缓存容量上限（字节），超出时按最近使用时间淘汰
+
 # 卡片配色方案（参考VS Code风格）
 CARD_STYLES = {
     "blue": {
@@ -127,6 +185,7 @@ TTS_VOICES = {
 TTS_DEFAULT_VOICE = "zh-CN-XiaoxiaoNeural"
 TTS_RATE = "+0%"  # 语速
 TTS_PITCH = "+0Hz"  # 音调
+TTS_MAX_CONCURRENCY = 4  # 生成视频时同时合成语音的最大条数
 
 # ===== 视频配置 =====
 VIDEO_FPS = 30
@@ -175,6 +234,12 @@ OUTPUT_DIR = os.path.join(_get_output_base_dir(), "output")
 IMAGE_DIR = os.path.join(OUTPUT_DIR, "images")
 AUDIO_DIR = os.path.join(OUTPUT_DIR, "audio")
 VIDEO_DIR = os.path.join(OUTPUT_DIR, "videos")
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+RSS_CACHE_DIR = os.path.join(CACHE_DIR, "feeds")
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+ARTICLE_CACHE_DIR = os.path.join(CACHE_DIR, "articles")
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.db")
+HISTORY_DB_PATH = os.path.join(OUTPUT_DIR, "history.db")
 
 # 字体目录使用应用程序所在目录的相对路径
 FONT_DIR = "assets/fonts"
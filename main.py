@@ -1,15 +1,18 @@
 import flet as ft
 import asyncio
+import multiprocessing
 import threading
 from typing import List
 import config
 from models.news import NewsItem, VideoProject
 from services import (
-    fetch_multiple_sources,
     generate_news_audio,
     create_adaptive_news_card,
     compose_news_collection_video,
 )
+from services.rss_fetcher import iter_multiple_sources, news_sort_key
+from services.news_dedup import deduplicate_news
+from services.history_store import get_history_store
 from services.ai_writer import generate_opening_script
 from services.tts_service import generate_opening_audio
 from services.image_generator import create_opening_slide
@@ -46,6 +49,14 @@ def main(page: ft.Page):
 
     fetch_status = ft.Text("", size=12, color=ft.Colors.BLUE)
 
+    # 获取新闻按钮（需要在函数外定义以便在获取期间禁用）
+    fetch_button = ft.ElevatedButton(
+        "获取新闻",
+        icon=ft.Icons.DOWNLOAD,
+        height=40,
+        on_click=None,  # 稍后设置
+    )
+
     # 步骤2: 新闻列表
     news_list_view = ft.Column(
         spacing=3,
@@ -96,6 +107,13 @@ def main(page: ft.Page):
         on_click=None,  # 稍后设置
     )
 
+    # 生成文案前抓取原文全文（RSS 摘要过短时让 AI 拿到更充分的素材）
+    full_article_checkbox = ft.Checkbox(
+        label="抓取原文全文",
+        value=config.ARTICLE_FETCH_ENABLED,
+        tooltip="生成文案前并发抓取新闻原文页面并提取正文，摘要过短时效果更好",
+    )
+
     # 步骤4: 设置
     style_dropdown = ft.Dropdown(
         label="卡片风格",
@@ -119,34 +137,61 @@ def main(page: ft.Page):
     # ===== 事件处理 =====
 
     def fetch_news_clicked(e):
-        """获取新闻"""
-        nonlocal all_news
-
+        """获取新闻（在后台线程中并发获取，避免阻塞界面）"""
         fetch_status.value = "正在获取新闻..."
+        fetch_status.color = ft.Colors.BLUE
+        fetch_button.disabled = True
         page.update()
 
-        try:
-            # 获取选中分类的 RSS 源
-            category = rss_category_dropdown.value
-            sources = config_manager.get_rss_sources(category)
+        # 获取选中分类的 RSS 源
+        category = rss_category_dropdown.value
+        sources = config_manager.get_rss_sources(category)
+
+        threading.Thread(target=run_fetch, args=(sources,), daemon=True).start()
 
-            # 批量获取
-            all_news = fetch_multiple_sources(sources)
+    def run_fetch(sources):
+        """后台获取新闻，每个源完成后立即刷新列表"""
+        nonlocal all_news
 
-            # 更新 UI
+        try:
+            all_news = []
+            statuses = []
             news_list_view.controls.clear()
 
-            for news in all_news:
-                checkbox = ft.Checkbox(
-                    label=f"{news.title[:45]}... ({news.source})",
-                    value=False,
-                    on_change=lambda e, n=news: toggle_news_selection(n, e.control.value),
-                    label_style=ft.TextStyle(size=12)
-                )
-                news_list_view.controls.append(checkbox)
+            # 并发获取，按源完成顺序逐步填充列表（保持按时间排序）
+            for status, news_list in iter_multiple_sources(
+                sources,
+                history=get_history_store(),
+                skip_seen=config.HISTORY_SKIP_SEEN,
+            ):
+                statuses.append(status)
+                all_news = sorted(all_news + news_list, key=news_sort_key, reverse=True)
+                refresh_news_list()
+
+                fetch_status.value = f"正在获取新闻... ({len(statuses)}/{len(sources)} 个源完成，已获取 {len(all_news)} 条)"
+                step2_empty_hint.visible = False
+                step2_list_container.visible = True
+                page.update()
 
-            fetch_status.value = f"✓ 已获取 {len(all_news)} 条新闻"
-            fetch_status.color = ft.Colors.GREEN
+            # 合并跨来源的重复新闻，避免重复生成文案、语音和卡片
+            fetched_count = len(all_news)
+            all_news = deduplicate_news(all_news)
+            merged_count = fetched_count - len(all_news)
+            refresh_news_list()
+
+            ok_count = sum(1 for s in statuses if s.status == "ok")
+            failed = [f"{s.name}({'超时' if s.status == 'timeout' else '失败'})"
+                      for s in statuses if s.status in ("timeout", "error")]
+
+            fetch_status.value = f"✓ 已获取 {len(all_news)} 条新闻（{ok_count}/{len(statuses)} 个源成功）"
+            if merged_count:
+                fetch_status.value += f"，已合并 {merged_count} 条重复"
+            seen_count = sum(1 for news in all_news if news.seen)
+            if seen_count:
+                fetch_status.value += f"，{seen_count} 条已制作过"
+            if failed:
+                fetch_status.value += f"，未完成: {'、'.join(failed)}"
+            fetch_status.color = ft.Colors.GREEN if not failed else ft.Colors.ORANGE
 
             # 隐藏空状态提示，显示列表
             step2_empty_hint.visible = False
@@ -156,7 +201,24 @@ def main(page: ft.Page):
             fetch_status.value = f"✗ 获取失败: {ex}"
             fetch_status.color = ft.Colors.RED
 
-        page.update()
+        finally:
+            fetch_button.disabled = False
+            page.update()
+
+    def refresh_news_list():
+        """按 all_news 重建新闻勾选列表（保留已勾选状态）"""
+        news_list_view.controls.clear()
+
+        for news in all_news:
+            checkbox = ft.Checkbox(
+                label=f"{news.title[:45]}... ({news.source}){' [已制作]' if news.seen else ''}",
+                value=news.selected,
+                on_change=lambda e, n=news: toggle_news_selection(n, e.control.value),
+                label_style=ft.TextStyle(size=12)
+            )
+            news_list_view.controls.append(checkbox)
+
+        selected_count_text.value = f"已选: {sum(1 for news in all_news if news.selected)} 条"
 
     def toggle_news_selection(news: NewsItem, selected: bool):
         """切换新闻选中状态"""
@@ -170,12 +232,11 @@ def main(page: ft.Page):
         page.update()
 
     def select_all_clicked(e):
-        """全选"""
-        for news in all_news:
-            news.selected = True
-        for control in news_list_view.controls:
+        """全选（跳过已制作过的新闻）"""
+        for news, control in zip(all_news, news_list_view.controls):
+            news.selected = not news.seen
             if isinstance(control, ft.Checkbox):
-                control.value = True
+                control.value = news.selected
         update_selected_count()
 
     def clear_selection_clicked(e):
@@ -233,41 +294,130 @@ def main(page: ft.Page):
         page.update()
 
         try:
-            # 为每条新闻生成文案
-            from services.ai_writer import generate_news_content
-            from services.image_downloader import download_and_process_images
-
-            for i, news in enumerate(selected_news):
-                preview_status.value = f"正在生成文案... ({i+1}/{len(selected_news)})"
+            # 为每条新闻并发生成文案
+            from services.ai_writer import batch_generate_news_content
+            from services.image_downloader import download_images_for_news_list
+            from services.image_hash import find_duplicate_images
+            from services.article_extractor import iter_full_articles
+
+            # 配图在后台并发下载，与文案生成同时进行；每条新闻的配图一到就加到它的卡片上
+            card_lock = threading.Lock()
+            delivered = set()
+
+            def refresh_card(i: int):
+                """重建可编辑卡片（调用方持有 card_lock）"""
+                duplicate_images = find_duplicate_images(selected_news)
+                preview_container.controls[i] = create_preview_card(selected_news[i], i, duplicate_images)
+
+            def on_photos_done(i: int, news: NewsItem):
+                with card_lock:
+                    # 初始化选中状态（默认都不选中）
+                    news.selected_images = [False] * len(news.downloaded_images)
+                    if not news.downloaded_images:
+                        return
+                    # 后面新闻的配图可能与这条重复，一并刷新重复标注
+                    for k in sorted(delivered):
+                        if k == i or (k > i and selected_news[k].downloaded_images):
+                            refresh_card(k)
                 page.update()
 
-                # 生成AI文案
-                content = generate_news_content(news)
-                news.tts_script = content["tts_script"]
-                news.card_title = content["card_title"]
-                news.card_points = content["card_points"]
-
-                # 下载新闻配图
-                if news.image_urls:
-                    preview_status.value = f"正在下载配图... ({i+1}/{len(selected_news)})"
-                    page.update()
-                    downloaded = download_and_process_images(news, i)
-                    news.downloaded_images = downloaded
-                    # 初始化选中状态（默认都不选中）
-                    news.selected_images = [False] * len(downloaded)
+            # 先清掉上次的配图，文案先完成时卡片不会显示旧配图
+            for news in selected_news:
+                news.downloaded_images = []
+                news.image_hashes = []
+                news.selected_images = []
+            threading.Thread(
+                target=download_images_for_news_list,
+                args=(selected_news,),
+                kwargs={"on_news_done": on_photos_done},
+                daemon=True,
+            ).start()
+
+            fetch_articles = bool(full_article_checkbox.value)
+            if not fetch_articles:
+                for news in selected_news:
+                    news.full_content = ""
+
+            # 先按顺序放置占位卡片，流式生成时逐步填入已完成的字段，每条文案完成后替换为可编辑卡片
+            live_cards = []
+            for i in range(len(selected_news)):
+                placeholder = "正在抓取原文..." if fetch_articles else "正在生成文案..."
+                title_text = ft.Text(f"📰 新闻 {i+1} {placeholder}", size=13, weight=ft.FontWeight.BOLD, color=ft.Colors.GREY_600)
+                script_text = ft.Text("", size=12, color=ft.Colors.GREY_700)
+                points_column = ft.Column([], spacing=2)
+                live_cards.append((title_text, script_text, points_column))
+                preview_container.controls.append(
+                    ft.Container(
+                        content=ft.Column([title_text, script_text, points_column], spacing=6),
+                        padding=15,
+                        border=ft.border.all(1, ft.Colors.GREY_300),
+                        border_radius=8,
+                    )
+                )
+            step3_empty_hint.visible = False
+            step3_preview_container.visible = True
+            page.update()
+
+            # 原文在后台逐条抓取，每条一有结果（成功、失败或超时）就开始生成该条文案
+            article_ready = [threading.Event() for _ in selected_news]
+
+            def fetch_articles_in_background():
+                try:
+                    for i, news in iter_full_articles(selected_news):
+                        state = "原文已获取" if news.full_content else "使用 RSS 摘要"
+                        live_cards[i][0].value = f"📰 新闻 {i+1} {state}，正在生成文案..."
+                        article_ready[i].set()
+                        page.update()
+                finally:
+                    for event in article_ready:
+                        event.set()
+
+            if fetch_articles:
+                threading.Thread(target=fetch_articles_in_background, daemon=True).start()
+
+            completed = 0
+
+            def on_item_done(i: int, news: NewsItem):
+                nonlocal completed
+                completed += 1
+
+                # 替换占位卡片；配图尚未下载完成时先不显示，到达后由 on_photos_done 刷新
+                with card_lock:
+                    delivered.add(i)
+                    refresh_card(i)
+                preview_status.value = f"正在生成文案... ({completed}/{len(selected_news)})"
+                page.update()
 
-                # 创建预览卡片
-                preview_card = create_preview_card(news, i)
-                preview_container.controls.append(preview_card)
+            def on_partial(i: int, field: str, value):
+                """流式生成的部分结果（在工作线程中调用）"""
+                if i in delivered:
+                    return  # 已替换为可编辑卡片（如超时回退后迟到的结果）
+                title_text, script_text, points_column = live_cards[i]
+                if field == "reset":
+                    # 该条单独重新生成，清掉上一次尝试已显示的内容
+                    title_text.value = f"📰 新闻 {i+1} 正在重新生成文案..."
+                    script_text.value = ""
+                    points_column.controls.clear()
+                elif field == "card_title":
+                    title_text.value = f"📰 新闻 {i+1}：{value}"
+                elif field == "tts_script":
+                    script_text.value = value
+                elif field == "card_point":
+                    points_column.controls.append(
+                        ft.Text(f"• {value.subtitle}：{value.content}", size=12, color=ft.Colors.GREY_700)
+                    )
                 page.update()
 
+            batch_generate_news_content(
+                selected_news,
+                on_item_done=on_item_done,
+                on_partial=on_partial if config.AI_STREAM_PREVIEW else None,
+                wait_for=(lambda i: article_ready[i].wait()) if fetch_articles else None,
+            )
+
             preview_status.value = f"✓ 已生成 {len(selected_news)} 条文案，请检查并编辑"
             preview_status.color = ft.Colors.GREEN
 
-            # 隐藏空状态提示，显示预览
-            step3_empty_hint.visible = False
-            step3_preview_container.visible = True
-
         except Exception as ex:
             preview_status.value = f"✗ 生成失败: {ex}"
             preview_status.color = ft.Colors.RED
@@ -281,10 +431,19 @@ def main(page: ft.Page):
             page.update()
 
     # 设置按钮事件
+    fetch_button.on_click = fetch_news_clicked
     generate_preview_button.on_click = generate_preview_clicked
 
-    def create_preview_card(news: NewsItem, index: int):
-        """创建文案预览卡片"""
+    def create_preview_card(news: NewsItem, index: int, duplicate_images: dict = None):
+        """
+        创建文案预览卡片
+
+        Args:
+            news: 新闻项
+            index: 新闻序号
+            duplicate_images: find_duplicate_images 的结果，用于标注与前面新闻重复的配图
+        """
+        duplicate_images = duplicate_images or {}
 
         # TTS文案编辑框（用于语音）
         tts_field = ft.TextField(
@@ -338,8 +497,13 @@ def main(page: ft.Page):
 
             image_checkboxes = []
             for img_idx, img_path in enumerate(news.downloaded_images):
+                label = f"使用配图 {img_idx+1}"
+                original = duplicate_images.get((index, img_idx))
+                if original:
+                    # 与前面的配图相同，建议不要重复使用
+                    label += f"（与新闻 {original[0]+1} 配图 {original[1]+1} 重复，建议不选）"
                 checkbox = ft.Checkbox(
-                    label=f"使用配图 {img_idx+1}",
+                    label=label,
                     value=news.selected_images[img_idx] if img_idx < len(news.selected_images) else False,
                     on_change=lambda e, idx=img_idx: toggle_image_selection(idx, e.control.value)
                 )
@@ -464,61 +628,61 @@ def main(page: ft.Page):
             voice_name = tts_config.get("edge_voice", "中文女声")
             voice = config.TTS_VOICES.get(voice_name, config.TTS_DEFAULT_VOICE)
 
-            # === 新增：生成片头 ===
-            # 步骤0.1: 生成片头文案
-            progress_text.value = "正在生成片头文案..."
-            page.update()
-
-            opening_script = generate_opening_script(selected_news)
-
-            current_step += 1
-            progress_bar.value = current_step / total_steps
-            page.update()
-
-            # 步骤0.2: 生成片头语音
-            progress_text.value = "正在生成片头语音..."
-            page.update()
-
-            opening_audio_path, opening_duration = await generate_opening_audio(opening_script, voice)
-
-            current_step += 1
-            progress_bar.value = current_step / total_steps
-            page.update()
-
-            # 步骤0.3: 生成片头图片
-            progress_text.value = "正在生成片头图片..."
-            page.update()
-
-            opening_image_path = create_opening_slide(selected_news, style)
-
-            current_step += 1
-            progress_bar.value = current_step / total_steps
-            page.update()
-
-            # 步骤1: 生成语音
-            for i, news in enumerate(selected_news):
-                progress_text.value = f"[{i+1}/{len(selected_news)}] 正在生成语音..."
-                page.update()
-
-                audio_path, duration = await generate_news_audio(news, i, voice)
-                news.audio_path = audio_path
-                news.duration = duration
+            loop = asyncio.get_running_loop()
+            completed_steps = {"audio": 0, "image": 0}
 
+            def finish_step(message):
+                """完成一步：各任务并发执行，进度按完成数累计"""
+                nonlocal current_step
                 current_step += 1
                 progress_bar.value = current_step / total_steps
+                progress_text.value = message
                 page.update()
 
-            # 步骤2: 生成图片
-            for i, news in enumerate(selected_news):
-                progress_text.value = f"[{i+1}/{len(selected_news)}] 正在生成图片..."
-                page.update()
+            # 片头只依赖新闻标题：文案 → 语音 与 片头图片 并行，并与各条新闻的语音、卡片同时进行
+            async def build_opening_audio():
+                opening_script = await loop.run_in_executor(None, generate_opening_script, selected_news)
+                finish_step("片头文案已生成")
+                result = await generate_opening_audio(opening_script, voice)
+                finish_step("片头语音已生成")
+                return result
+
+            async def build_opening_image():
+                result = await loop.run_in_executor(None, create_opening_slide, selected_news, style)
+                finish_step("片头图片已生成")
+                return result
+
+            tts_semaphore = asyncio.Semaphore(max(1, config.TTS_MAX_CONCURRENCY))
+
+            async def build_news_audio(i, news):
+                async with tts_semaphore:
+                    news.audio_path, news.duration = await generate_news_audio(news, i, voice)
+                completed_steps["audio"] += 1
+                finish_step(f"[{completed_steps['audio']}/{len(selected_news)}] 语音已生成")
+
+            async def build_news_image(i, news):
+                news.image_path = await loop.run_in_executor(
+                    None, create_adaptive_news_card, news, style, i
+                )
+                completed_steps["image"] += 1
+                finish_step(f"[{completed_steps['image']}/{len(selected_news)}] 图片已生成")
 
-                image_path = create_adaptive_news_card(news, style, i)
-                news.image_path = image_path
+            progress_text.value = "正在并行生成片头、语音和图片..."
+            page.update()
 
-                current_step += 1
-                progress_bar.value = current_step / total_steps
-                page.update()
+            # 任一任务失败时取消其余任务并等它们结束，事件循环关闭时不会留下未完成的任务
+            try:
+                async with asyncio.TaskGroup() as group:
+                    opening_audio_task = group.create_task(build_opening_audio())
+                    opening_image_task = group.create_task(build_opening_image())
+                    for i, news in enumerate(selected_news):
+                        group.create_task(build_news_audio(i, news))
+                    for i, news in enumerate(selected_news):
+                        group.create_task(build_news_image(i, news))
+            except ExceptionGroup as eg:
+                raise eg.exceptions[0] from None  # 界面只显示第一个失败原因
+            opening_audio_path, opening_duration = opening_audio_task.result()
+            opening_image_path = opening_image_task.result()
 
             # 步骤3: 合成视频（带进度回调，包含片头）
             def video_progress_callback(current, total, message):
@@ -546,6 +710,12 @@ def main(page: ft.Page):
             progress_text.color = ft.Colors.GREEN
 
             total_duration = sum(news.duration for news in selected_news) + opening_duration
+
+            # 记录已制作的新闻，下次获取时跳过或标记
+            try:
+                get_history_store().mark_produced(selected_news)
+            except Exception as history_ex:
+                print(f"记录制作历史失败: {history_ex}")
             video_info_text.value = f"视频路径: {video_path}\n总时长: {total_duration:.1f} 秒（含片头 {opening_duration:.1f} 秒）"
 
         except Exception as ex:
@@ -904,6 +1074,7 @@ def main(page: ft.Page):
         ft.Row([
             ft.TextButton("全选", on_click=select_all_clicked),
             ft.TextButton("清空", on_click=clear_selection_clicked),
+            full_article_checkbox,
             generate_preview_button,
         ], spacing=10),
     ], spacing=5)
@@ -956,7 +1127,7 @@ def main(page: ft.Page):
                     ft.Text("步骤 1: 获取新闻", size=14, weight=ft.FontWeight.BOLD),
                     ft.Row([
                         rss_category_dropdown,
-                        ft.ElevatedButton("获取新闻", on_click=fetch_news_clicked, icon=ft.Icons.DOWNLOAD, height=40),
+                        fetch_button,
                     ], spacing=10),
                     fetch_status,
                 ], spacing=5),
@@ -1045,4 +1216,6 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，开启进程池选项（RSS_PARSE_IN_PROCESS / IMAGE_PROCESS_IN_POOL）时子进程需要
+    multiprocessing.freeze_support()
     ft.app(target=main)
@@ -18,7 +18,12 @@ class NewsItem:
     published: str
     raw_content: str
     selected: bool = False
+    published_ts: float = 0.0  # 发布时间的 Unix 时间戳（由 published 解析，0 表示未知）
     image_urls: List[str] = field(default_factory=list)  # RSS中的新闻配图URL（最多2张）
+    duplicate_of: str = ""  # 近似重复时，指向保留的那条新闻的 URL
+    seen: bool = False  # 是否已在之前的视频中制作过
+    full_content: str = ""  # 从原文页面抽取的正文（为空时使用 raw_content）
+    tokens_saved: int = 0  # 发送给 AI 前压缩正文节省的 token 数（估算）
 
     # AI 生成的内容
     # 1. TTS 文案（用于语音合成）- AI总结的新闻播报稿
@@ -33,6 +38,7 @@ class NewsItem:
     audio_path: str = ""  # 生成的音频路径
     duration: float = 0.0  # 音频时长
     downloaded_images: List[str] = field(default_factory=list)  # 下载的新闻配图本地路径
+    image_hashes: List[str] = field(default_factory=list)  # 配图的感知哈希（与 downloaded_images 一一对应）
     selected_images: List[bool] = field(default_factory=list)  # 标记哪些配图被用户选中使用（默认都不选中）
 
 
@@ -1,48 +1,162 @@
 import json
-import re
-from typing import Dict, List
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
 from models.news import NewsItem, CardPoint
+from services.llm_cache import get_llm_cache, make_cache_key
+from services.json_stream import JSONStreamParser
+from services.llm_client import estimate_tokens, get_llm_client
+from services.text_compactor import compact_text
+from services.text_utils import clean_html_tags
 import config
 
+# 新闻文案提示词模板版本，参与文案缓存 key，修改提示词或校验规则时需同步修改
+PROMPT_VERSION = "news-v2"
 
-def clean_html_tags(text: str) -> str:
+# 多条新闻打包请求的提示词模板版本，与单条模板的缓存分开，修改批量提示词时需同步修改
+BATCH_PROMPT_VERSION = "news-batch-v1"
+
+# 文案要求（单条和批量提示词共用）
+_CONTENT_RULES = """请生成两部分内容：
+
+1. **播报文案**（用于语音合成）：
+   - 150-200字的完整新闻播报稿
+   - 语言口语化、流畅自然
+   - 包含核心信息和关键细节
+   - 适合直接朗读
+   - **纯文本，不包含任何HTML标签、特殊符号、markdown格式**
+
+2. **卡片内容**（用于视觉展示）：
+   - 主标题：简洁有力，8-12字
+   - 要点列表：根据新闻内容丰富程度生成3-8个关键信息点
+     * 每个要点包含：
+       - subtitle: 4-6字的精炼小标题（提炼该要点的核心关键词）
+       - content: 25-35字的详细内容
+     * 新闻内容丰富：生成6-8个要点
+     * 新闻内容一般：生成4-5个要点
+     * 新闻内容简单：生成3个要点即可
+     * **宁可减少要点数量，也要保证每个要点内容详实（25-35字）**
+   - **纯文本，不包含任何特殊符号**"""
+
+_CARD_POINTS_EXAMPLE = """    "card_points": [
+        {"subtitle": "功能开源", "content": "微软VS Code团队正式宣布AI编辑器内联补全功能已作为Copilot Chat扩展的一部分开源"},
+        {"subtitle": "里程碑", "content": "这是微软开源AI编辑器计划的第二个重要里程碑，继6月开源GitHub Copilot Chat扩展之后"},
+        ...
+    ]"""
+
+
+def _prompt_content(news: NewsItem) -> str:
+    """
+    发送给 AI 的新闻正文：优先使用抓取的原文正文，清理 HTML、去除样板文字并压缩到
+    config.AI_INPUT_TOKEN_BUDGET
     """
-    清理HTML标签和特殊符号
+    cleaned = clean_html_tags(news.full_content or news.raw_content)
+    return compact_text(cleaned, config.AI_INPUT_TOKEN_BUDGET, clean_html_tags(news.title)) or cleaned
 
-    Args:
-        text: 原始文本
+
+def _compaction_savings(news: NewsItem) -> int:
+    """压缩正文节省的 token 数（估算，以清理 HTML 后的正文为基准，不计入去掉的标签）"""
+    cleaned = clean_html_tags(news.full_content or news.raw_content)
+    return max(0, estimate_tokens(cleaned) - estimate_tokens(_prompt_content(news)))
+
+
+def _validate_result(result: Dict[str, any]) -> Dict[str, any]:
+    """
+    校验 AI 返回的单条结果并清理HTML标签和特殊符号，格式不符时抛出 ValueError
 
     Returns:
-        清理后的纯文本
+        清理后的结果（card_points 为字典列表，可直接缓存）
     """
-    if not text:
-        return ""
+    if not isinstance(result, dict):
+        raise ValueError("AI 返回格式错误")
+
+    # 验证返回结果
+    if "tts_script" not in result or "card_title" not in result or "card_points" not in result:
+        raise ValueError("AI 返回格式错误")
+
+    if not isinstance(result["card_points"], list) or len(result["card_points"]) < 3 or len(result["card_points"]) > 8:
+        count = len(result["card_points"]) if isinstance(result["card_points"], list) else 0
+        raise ValueError(f"要点数量应为3-8个，当前为{count}个")
+
+    # 验证每个要点的格式
+    for point in result["card_points"]:
+        if not isinstance(point, dict) or "subtitle" not in point or "content" not in point:
+            raise ValueError("要点格式错误，应包含subtitle和content字段")
+
+    # 文本字段必须是字符串，否则清理时会抛出 TypeError
+    fields = [result["tts_script"], result["card_title"]]
+    fields += [p[name] for p in result["card_points"] for name in ("subtitle", "content")]
+    if not all(isinstance(field, str) for field in fields):
+        raise ValueError("AI 返回格式错误，文本字段应为字符串")
+
+    # 清理HTML标签和特殊符号
+    return {
+        "tts_script": clean_html_tags(result["tts_script"]),
+        "card_title": clean_html_tags(result["card_title"]),
+        "card_points": [
+            {"subtitle": clean_html_tags(p["subtitle"]), "content": clean_html_tags(p["content"])}
+            for p in result["card_points"]
+        ],
+    }
 
-    # 移除HTML标签
-    text = re.sub(r'<[^>]+>', '', text)
 
-    # 移除常见的HTML实体
-    text = text.replace('&nbsp;', ' ')
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    text = text.replace('&amp;', '&')
-    text = text.replace('&quot;', '"')
-    text = text.replace('&#39;', "'")
+def _cache_key(news: NewsItem, prompt_version: str = PROMPT_VERSION) -> str:
+    # 压缩预算会改变提示词中的正文，一并计入提示词版本
+    prompt_version = f"{prompt_version}/{config.AI_INPUT_TOKEN_BUDGET}"
+    return make_cache_key(config.AI_MODEL, config.AI_BASE_URL, prompt_version, news)
 
-    # 移除多余的空白
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
 
-    return text
+def _cache_get(key: str) -> Optional[Dict[str, any]]:
+    try:
+        return get_llm_cache().get(key)
+    except Exception as e:
+        print(f"读取文案缓存失败: {e}")
+        return None
+
+
+def _cache_put(key: str, result: Dict[str, any]) -> None:
+    try:
+        get_llm_cache().put(key, result, model=config.AI_MODEL)
+    except Exception as e:
+        print(f"保存文案缓存失败: {e}")
+
+
+def _to_card_points(result: Dict[str, any]) -> Dict[str, any]:
+    """将结果中的要点字典转换为 CardPoint 对象"""
+    result["card_points"] = [CardPoint(subtitle=p["subtitle"], content=p["content"]) for p in result["card_points"]]
+    return result
 
 
-def generate_news_content(news: NewsItem) -> Dict[str, any]:
+def _build_news_prompt(news: NewsItem) -> str:
+    """单条新闻的文案提示词"""
+    return f"""你是专业的新闻编辑。请将以下新闻改写为适合短视频的格式。
+
+原新闻：
+标题：{news.title}
+内容：{_prompt_content(news)}
+来源：{news.source}
+
+{_CONTENT_RULES}
+
+请严格按照以下JSON格式返回：
+{{
+    "tts_script": "完整的播报文案...",
+    "card_title": "主标题",
+{_CARD_POINTS_EXAMPLE}
+}}"""
+
+
+def generate_news_content(news: NewsItem, timeout: float = None, use_cache: bool = True) -> Dict[str, any]:
     """
     使用 AI 为单条新闻生成内容（TTS文案 + 卡片内容）
 
+    校验通过的结果按模型、接口地址、提示词版本和新闻内容缓存，再次生成同一新闻时直接返回。
+
     Args:
         news: 新闻对象
+        timeout: 请求超时（秒），默认使用共享客户端的超时设置
+        use_cache: 是否使用文案缓存
 
     Returns:
         {
@@ -57,89 +171,233 @@ def generate_news_content(news: NewsItem) -> Dict[str, any]:
         print("警告: 未配置 AI_API_KEY，使用模拟数据")
         return _generate_mock_content(news)
 
+    cache_key = _cache_key(news)
+    cached = _cache_get(cache_key) if use_cache else None
+    if cached:
+        return _to_card_points(cached)
+
     try:
-        client = OpenAI(
-            api_key=config.AI_API_KEY,
-            base_url=config.AI_BASE_URL
+        prompt = _build_news_prompt(news)
+
+        response = get_llm_client().chat(
+            model=config.AI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            timeout=timeout,
         )
 
-        prompt = f"""你是专业的新闻编辑。请将以下新闻改写为适合短视频的格式。
+        result = _validate_result(json.loads(response.choices[0].message.content))
+        if use_cache:
+            _cache_put(cache_key, result)
 
-原新闻：
-标题：{news.title}
-内容：{news.raw_content}
-来源：{news.source}
+        # 转换为CardPoint对象
+        return _to_card_points(result)
 
-请生成两部分内容：
+    except Exception as e:
+        print(f"AI 生成失败: {e}，使用备用方案")
+        return _generate_mock_content(news)
 
-1. **播报文案**（用于语音合成）：
-   - 150-200字的完整新闻播报稿
-   - 语言口语化、流畅自然
-   - 包含核心信息和关键细节
-   - 适合直接朗读
-   - **纯文本，不包含任何HTML标签、特殊符号、markdown格式**
 
-2. **卡片内容**（用于视觉展示）：
-   - 主标题：简洁有力，8-12字
-   - 要点列表：根据新闻内容丰富程度生成3-8个关键信息点
-     * 每个要点包含：
-       - subtitle: 4-6字的精炼小标题（提炼该要点的核心关键词）
-       - content: 25-35字的详细内容
-     * 新闻内容丰富：生成6-8个要点
-     * 新闻内容一般：生成4-5个要点
-     * 新闻内容简单：生成3个要点即可
-     * **宁可减少要点数量，也要保证每个要点内容详实（25-35字）**
-   - **纯文本，不包含任何特殊符号**
+def _emit_partial(on_partial: Callable[[str, any], None], path: tuple, value: any) -> None:
+    """把流式解析出的完整字段交给回调：tts_script、card_title 和每个要点（CardPoint）"""
+    if path in (("tts_script",), ("card_title",)) and isinstance(value, str):
+        on_partial(path[0], clean_html_tags(value))
+    elif len(path) == 2 and path[0] == "card_points" and isinstance(path[1], int) and path[1] < 8:
+        if isinstance(value, dict) and "subtitle" in value and "content" in value:
+            on_partial("card_point", CardPoint(
+                subtitle=clean_html_tags(str(value["subtitle"])),
+                content=clean_html_tags(str(value["content"])),
+            ))
 
-请严格按照以下JSON格式返回：
-{{
-    "tts_script": "完整的播报文案...",
-    "card_title": "主标题",
-    "card_points": [
-        {{"subtitle": "功能开源", "content": "微软VS Code团队正式宣布AI编辑器内联补全功能已作为Copilot Chat扩展的一部分开源"}},
-        {{"subtitle": "里程碑", "content": "这是微软开源AI编辑器计划的第二个重要里程碑，继6月开源GitHub Copilot Chat扩展之后"}},
-        ...
-    ]
-}}"""
 
-        response = client.chat.completions.create(
-            model=config.AI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
+def generate_news_content_stream(
+    news: NewsItem,
+    on_partial: Callable[[str, any], None] = None,
+    timeout: float = None,
+    use_cache: bool = True,
+) -> Dict[str, any]:
+    """
+    以流式方式为单条新闻生成内容，字段一完整就回调 on_partial(字段, 值)
 
-        result = json.loads(response.choices[0].message.content)
+    字段依次为 "tts_script"（str）、"card_title"（str）和每个 "card_point"（CardPoint），
+    顺序取决于模型输出。回调只用于提前展示，最终结果仍以返回值为准（完整校验后才缓存）；
+    命中缓存或使用备用方案时不回调。
 
-        # 验证返回结果
-        if "tts_script" not in result or "card_title" not in result or "card_points" not in result:
-            raise ValueError("AI 返回格式错误")
+    Args:
+        news: 新闻对象
+        on_partial: 部分结果回调，在当前线程中调用
+        timeout: 请求超时（秒）
+        use_cache: 是否使用文案缓存
+
+    Returns:
+        同 generate_news_content
+    """
+    if not config.AI_API_KEY:
+        print("警告: 未配置 AI_API_KEY，使用模拟数据")
+        return _generate_mock_content(news)
 
-        if not isinstance(result["card_points"], list) or len(result["card_points"]) < 3 or len(result["card_points"]) > 8:
-            raise ValueError(f"要点数量应为3-8个，当前为{len(result['card_points'])}个")
+    cache_key = _cache_key(news)
+    cached = _cache_get(cache_key) if use_cache else None
+    if cached:
+        return _to_card_points(cached)
 
-        # 验证每个要点的格式
-        for point in result["card_points"]:
-            if not isinstance(point, dict) or "subtitle" not in point or "content" not in point:
-                raise ValueError("要点格式错误，应包含subtitle和content字段")
+    def on_value(path: tuple, value: any) -> None:
+        if on_partial:
+            _emit_partial(on_partial, path, value)
 
-        # 清理HTML标签和特殊符号，并转换为CardPoint对象
-        result["tts_script"] = clean_html_tags(result["tts_script"])
-        result["card_title"] = clean_html_tags(result["card_title"])
-        result["card_points"] = [
-            CardPoint(
-                subtitle=clean_html_tags(p["subtitle"]),
-                content=clean_html_tags(p["content"])
-            )
-            for p in result["card_points"]
-        ]
+    try:
+        parser = JSONStreamParser(on_value)
+        for delta in get_llm_client().chat_stream(
+            model=config.AI_MODEL,
+            messages=[{"role": "user", "content": _build_news_prompt(news)}],
+            response_format={"type": "json_object"},
+            timeout=timeout,
+        ):
+            parser.feed(delta)
 
-        return result
+        result = _validate_result(json.loads(parser.root_text()))
+        if use_cache:
+            _cache_put(cache_key, result)
+        return _to_card_points(result)
 
     except Exception as e:
         print(f"AI 生成失败: {e}，使用备用方案")
         return _generate_mock_content(news)
 
 
+def generate_news_content_batch(
+    news_list: List[NewsItem],
+    timeout: float = None,
+    use_cache: bool = True,
+    on_partial: Callable[[int, str, any], None] = None,
+) -> List[Dict[str, any]]:
+    """
+    用一次请求为多条新闻生成内容
+
+    未命中缓存的新闻按编号打包进同一个 JSON 请求，返回结果按编号对应。每条结果单独校验，
+    只有校验失败或缺失的条目才改为单条生成；整个请求失败时全部改为单条生成。
+    批量结果按 BATCH_PROMPT_VERSION 缓存，单条生成的结果按 PROMPT_VERSION 缓存，两种模板互不复用。
+
+    Args:
+        news_list: 新闻列表
+        timeout: 请求超时（秒）
+        use_cache: 是否使用文案缓存
+        on_partial: 指定时以流式方式请求，字段一完整就回调 on_partial(在 news_list 中的索引, 字段, 值)，
+            字段含义同 generate_news_content_stream；某条改为单独重新生成前先回调 (索引, "reset", None)，
+            调用方应丢弃该条此前收到的部分结果
+
+    Returns:
+        与 news_list 一一对应的生成结果（格式同 generate_news_content）
+    """
+    if not config.AI_API_KEY:
+        print("警告: 未配置 AI_API_KEY，使用模拟数据")
+        return [_generate_mock_content(news) for news in news_list]
+
+    results: List[Optional[Dict[str, any]]] = [None] * len(news_list)
+    cache_keys = [_cache_key(news, BATCH_PROMPT_VERSION) for news in news_list]
+    pending = []
+    for i, news in enumerate(news_list):
+        cached = _cache_get(cache_keys[i]) if use_cache else None
+        if cached:
+            results[i] = _to_card_points(cached)
+        else:
+            pending.append(i)
+
+    def generate_single(i: int) -> Dict[str, any]:
+        if on_partial:
+            return generate_news_content_stream(
+                news_list[i],
+                on_partial=lambda field, value: on_partial(i, field, value),
+                timeout=timeout,
+                use_cache=use_cache,
+            )
+        return generate_news_content(news_list[i], timeout=timeout, use_cache=use_cache)
+
+    if len(pending) == 1:
+        results[pending[0]] = generate_single(pending[0])
+        return results
+    if not pending:
+        return results
+
+    articles = "\n\n".join(
+        f"【新闻 {n}】\n标题：{news_list[i].title}\n内容：{_prompt_content(news_list[i])}\n来源：{news_list[i].source}"
+        for n, i in enumerate(pending, 1)
+    )
+    prompt = f"""你是专业的新闻编辑。请将以下 {len(pending)} 条新闻分别改写为适合短视频的格式。
+
+{articles}
+
+每条新闻都按以下要求处理，{_CONTENT_RULES}
+
+请严格按照以下JSON格式返回，items 中每条新闻对应一项，id 为上面的新闻编号：
+{{
+    "items": [
+        {{
+            "id": "1",
+            "tts_script": "完整的播报文案...",
+            "card_title": "主标题",
+            "card_points": [{{"subtitle": "小标题", "content": "详细内容"}}, ...]
+        }},
+        ...
+    ]
+}}"""
+
+    request = dict(
+        model=config.AI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        response_format={"type": "json_object"},
+        timeout=timeout,
+    )
+    items_by_id = {}
+    try:
+        if on_partial:
+            # 流式：items 中第 k 项的 id 出现后，它的字段就能对应到具体新闻
+            item_ids: Dict[int, str] = {}
+
+            def on_value(path: tuple, value: any) -> None:
+                if len(path) < 3 or path[0] != "items" or not isinstance(path[1], int):
+                    return
+                if path[2:] == ("id",):
+                    item_ids[path[1]] = str(value).strip()
+                    return
+                item_id = item_ids.get(path[1], "")
+                if item_id.isdigit() and 1 <= int(item_id) <= len(pending):
+                    index = pending[int(item_id) - 1]
+                    _emit_partial(lambda field, v: on_partial(index, field, v), path[2:], value)
+
+            parser = JSONStreamParser(on_value)
+            for delta in get_llm_client().chat_stream(**request):
+                parser.feed(delta)
+            content = parser.root_text()
+        else:
+            content = get_llm_client().chat(**request).choices[0].message.content
+
+        items = json.loads(content).get("items", [])
+        if isinstance(items, dict):
+            items = [dict(item, id=key) for key, item in items.items() if isinstance(item, dict)]
+        items_by_id = {str(item.get("id")).strip(): item for item in items if isinstance(item, dict)}
+    except Exception as e:
+        print(f"AI 批量生成失败: {e}，改为逐条生成")
+
+    for n, i in enumerate(pending, 1):
+        try:
+            if str(n) not in items_by_id:
+                raise ValueError("缺少该条结果")
+            result = _validate_result(items_by_id[str(n)])
+        except ValueError as e:
+            if items_by_id:
+                print(f"批量结果中新闻 {n} 无效: {e}，单独生成")
+            if on_partial:
+                on_partial(i, "reset", None)  # 批量请求中已展示的字段作废
+            results[i] = generate_single(i)
+            continue
+        if use_cache:
+            _cache_put(cache_keys[i], result)
+        results[i] = _to_card_points(result)
+
+    return results
+
+
 def _generate_mock_content(news: NewsItem) -> Dict[str, any]:
     """
     备用方案：不使用 AI 的简单内容生成
@@ -151,7 +409,7 @@ def _generate_mock_content(news: NewsItem) -> Dict[str, any]:
         TTS文案和卡片内容
     """
     # 清理原始内容的HTML标签
-    clean_content = clean_html_tags(news.raw_content)
+    clean_content = clean_html_tags(news.full_content or news.raw_content)
     clean_title = clean_html_tags(news.title)
 
     # 生成播报文案
@@ -226,11 +484,6 @@ def generate_opening_script(news_list: List[NewsItem]) -> str:
         return _generate_mock_opening_script(news_list)
 
     try:
-        client = OpenAI(
-            api_key=config.AI_API_KEY,
-            base_url=config.AI_BASE_URL
-        )
-
         # 提取所有新闻标题
         news_titles = []
         for i, news in enumerate(news_list):
@@ -257,7 +510,7 @@ def generate_opening_script(news_list: List[NewsItem]) -> str:
 
 请直接返回开篇文案文本，不要包含其他内容。"""
 
-        response = client.chat.completions.create(
+        response = get_llm_client().chat(
             model=config.AI_MODEL,
             messages=[{"role": "user", "content": prompt}],
         )
@@ -292,22 +545,143 @@ def _generate_mock_opening_script(news_list: List[NewsItem]) -> str:
     return script
 
 
-def batch_generate_news_content(news_list: List[NewsItem]) -> List[NewsItem]:
+def _apply_content(news: NewsItem, content: Dict[str, any]) -> None:
+    news.tts_script = content["tts_script"]
+    news.card_title = content["card_title"]
+    news.card_points = content["card_points"]
+
+
+def batch_generate_news_content(
+    news_list: List[NewsItem],
+    max_in_flight: int = None,
+    item_timeout: float = None,
+    on_item_done: Callable[[int, NewsItem], None] = None,
+    batch_size: int = None,
+    on_partial: Callable[[int, str, any], None] = None,
+    wait_for: Callable[[int], None] = None,
+) -> List[NewsItem]:
     """
-    批量为多条新闻生成内容
+    并发为多条新闻生成内容
+
+    新闻按 batch_size 条一组打包成一个请求，同时进行的请求数不超过 max_in_flight；
+    一组请求从开始起超过 item_timeout × 条数仍未完成时，组内新闻改用备用方案，不影响其他组。
+    每条新闻完成后立即回调 on_item_done(索引, 新闻)，回调按完成顺序在调用线程中执行。
 
     Args:
         news_list: 新闻列表
+        max_in_flight: 最大并发请求数，默认使用 config.AI_MAX_CONCURRENCY
+        item_timeout: 单条新闻的超时（秒），默认使用 config.AI_ITEM_TIMEOUT
+        on_item_done: 单条新闻完成时的回调
+        batch_size: 每个请求包含的新闻条数，默认使用 config.AI_BATCH_SIZE（1 表示逐条请求）
+        on_partial: 指定时以流式方式请求，字段一完整就回调 on_partial(索引, 字段, 值)，
+            在工作线程中调用，字段含义同 generate_news_content_batch（含 "reset"）；
+            超时回退后同一条可能仍有迟到的回调，调用方应忽略已完成条目的部分结果
+        wait_for: 指定时先对组内每条调用 wait_for(索引)，阻塞到该条的输入准备好（如原文抓取完成），
+            在后台线程中调用；组内输入全部就绪后才提交请求，等待不占用并发名额，也不计入超时
 
     Returns:
         更新后的新闻列表
     """
-    for i, news in enumerate(news_list):
-        print(f"正在生成第 {i+1}/{len(news_list)} 条新闻内容...")
+    if max_in_flight is None:
+        max_in_flight = config.AI_MAX_CONCURRENCY
+    if item_timeout is None:
+        item_timeout = config.AI_ITEM_TIMEOUT
+    if batch_size is None:
+        batch_size = config.AI_BATCH_SIZE
+    if not news_list:
+        return news_list
+
+    batch_size = max(1, batch_size)
+    groups = [list(range(i, min(i + batch_size, len(news_list)))) for i in range(0, len(news_list), batch_size)]
+    started: Dict[int, float] = {}
+    completed = 0
+
+    def group_timeout(group_index: int) -> float:
+        return item_timeout * len(groups[group_index])
+
+    def wait_ready(group_index: int, signal: Future) -> None:
+        try:
+            for i in groups[group_index]:
+                wait_for(i)
+        finally:
+            # 等待出错时照常提交，输入使用已有内容
+            signal.set_result(group_index)
+
+    def run(group_index: int) -> List[Dict[str, any]]:
+        indices = groups[group_index]
+        for i in indices:
+            news_list[i].tokens_saved = _compaction_savings(news_list[i])
+        started[group_index] = time.monotonic()
+        group_partial = None
+        if on_partial:
+            def group_partial(local_index: int, field: str, value: any) -> None:
+                on_partial(indices[local_index], field, value)
+
+        if len(indices) == 1 and not on_partial:
+            return [generate_news_content(news_list[indices[0]], timeout=item_timeout)]
+        return generate_news_content_batch(
+            [news_list[i] for i in indices],
+            timeout=group_timeout(group_index),
+            on_partial=group_partial,
+        )
 
-        content = generate_news_content(news)
-        news.tts_script = content["tts_script"]
-        news.card_title = content["card_title"]
-        news.card_points = content["card_points"]
+    def deliver(index: int, content: Dict[str, any]) -> None:
+        nonlocal completed
+        completed += 1
+        _apply_content(news_list[index], content)
+        print(f"已生成第 {completed}/{len(news_list)} 条新闻内容（新闻 {index+1}）")
+        if on_item_done:
+            on_item_done(index, news_list[index])
 
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(groups))))
+    try:
+        futures: Dict[Future, int] = {}  # 请求 → 组序号
+        ready: Dict[Future, int] = {}  # 输入就绪通知 → 组序号
+        for g in range(len(groups)):
+            if wait_for:
+                signal = Future()
+                ready[signal] = g
+                threading.Thread(target=wait_ready, args=(g, signal), daemon=True).start()
+            else:
+                futures[executor.submit(run, g)] = g
+        pending = set(futures) | set(ready)
+
+        while pending:
+            # 等到有请求完成、有组的输入就绪，或最早开始的那个请求超时
+            expiries = [
+                started[futures[f]] + group_timeout(futures[f])
+                for f in pending if f in futures and futures[f] in started
+            ]
+            wait_timeout = max(0.0, min(expiries) - time.monotonic()) if expiries else item_timeout
+            done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+            for future in sorted(done, key=lambda f: futures.get(f, ready.get(f))):
+                if future in ready:
+                    request = executor.submit(run, ready[future])
+                    futures[request] = ready[future]
+                    pending.add(request)
+                    continue
+                indices = groups[futures[future]]
+                try:
+                    contents = future.result()
+                except Exception as e:
+                    print(f"AI 生成失败: {e}，使用备用方案")
+                    contents = [_generate_mock_content(news_list[i]) for i in indices]
+                for index, content in zip(indices, contents):
+                    deliver(index, content)
+
+            now = time.monotonic()
+            for future in sorted(pending, key=lambda f: futures.get(f, ready.get(f))):
+                group_index = futures.get(future)
+                if group_index is not None and group_index in started and now - started[group_index] >= group_timeout(group_index):
+                    pending.discard(future)
+                    for index in groups[group_index]:
+                        print(f"AI 生成超时（新闻 {index+1}），使用备用方案")
+                        deliver(index, _generate_mock_content(news_list[index]))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    tokens_saved = sum(news.tokens_saved for news in news_list)
+    if tokens_saved:
+        print(f"正文压缩共节省约 {tokens_saved} 个 token")
     return news_list
@@ -0,0 +1,407 @@
+"""
+原文正文抽取：并发抓取新闻页面，用类似 readability 的启发式规则提取正文，按 URL 缓存
+
+RSS 摘要往往只有一两句，抓取全文后 AI 能拿到更充分的素材。抽取规则：
+1. 去掉 script/style/nav/footer 等标签，以及 class/id 明显是评论、分享、推荐的区块
+2. 按块级元素切分段落，记录每段的链接文字占比
+3. 段落得分（长度、逗号数，按链接占比打折）累加到所在容器，一半累加到上一级容器
+4. 取得分最高的容器，输出其中链接占比低的段落
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from models.news import NewsItem
+import config
+
+# 内容直接丢弃的标签
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer",
+    "aside", "form", "button", "select", "textarea",
+}
+
+# 块级标签：开始和结束时切分段落
+_BLOCK_TAGS = {
+    "html", "body", "main", "article", "section", "div", "p", "li", "ul", "ol", "dl", "dd", "dt",
+    "table", "tbody", "tr", "td", "th", "blockquote", "pre", "figure", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+
+# 段落标签：其中的文字计入上一级容器
+_PARAGRAPH_TAGS = {"p", "li", "dd", "dt", "td", "th", "blockquote", "pre", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+# 没有结束标签的元素
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_NEGATIVE_RE = re.compile(
+    r'comment|share|social|related|recommend|sidebar|footer|header|nav|menu|breadcrumb|banner|'
+    r'advert|\bads?\b|sponsor|popup|modal|subscribe|copyright|tags?\b|hot-?list|rank',
+    re.I,
+)
+_POSITIVE_RE = re.compile(r'article|content|post|entry|main|body|text|story|detail|news', re.I)
+
+# 容器 class/id 的加减分
+_CLASS_WEIGHT = 10
+
+# 参与打分的段落最少字数
+_MIN_SCORED_CHARS = 25
+
+# 输出的段落最少字数
+_MIN_PARAGRAPH_CHARS = 10
+
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class _ArticleParser(HTMLParser):
+    """把页面切分为段落，记录段落所在容器和容器层级"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parents: Dict[int, Optional[int]] = {0: None}
+        self.tags: Dict[int, str] = {0: ""}
+        self.weights: Dict[int, int] = {}
+        self.paragraphs: List[Tuple[int, str, int]] = []  # (容器, 文字, 链接文字数)
+        self._stack: List[Tuple[str, int, bool]] = []  # (标签, 节点, 是否跳过)
+        self._next_id = 1
+        self._text: List[str] = []
+        self._link_chars = 0
+        self._skip_depth = 0
+        self._link_depth = 0
+
+    def _current_block(self) -> int:
+        for tag, node, _ in reversed(self._stack):
+            if tag in _BLOCK_TAGS:
+                return node
+        return 0
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._text).split())
+        if text:
+            container = self._current_block()
+            if self.tags[container] in _PARAGRAPH_TAGS:
+                container = self.parents[container]
+            self.paragraphs.append((container, text, min(self._link_chars, len(text))))
+        self._text = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            if tag == "br" and not self._skip_depth:
+                self._flush()
+            return
+
+        attrs = dict(attrs)
+        class_id = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+        negative = tag not in ("html", "body", "article", "main") and bool(_NEGATIVE_RE.search(class_id))
+        positive = bool(_POSITIVE_RE.search(class_id))
+        skip = tag in _SKIP_TAGS or (negative and not positive)
+
+        if tag in _BLOCK_TAGS and not self._skip_depth:
+            self._flush()
+
+        node = self._next_id
+        self._next_id += 1
+        self.parents[node] = self._current_block()
+        self.tags[node] = tag
+        self.weights[node] = (_CLASS_WEIGHT if positive else 0) - (_CLASS_WEIGHT if negative else 0)
+        self._stack.append((tag, node, skip))
+        if skip:
+            self._skip_depth += 1
+        if tag == "a":
+            self._link_depth += 1
+
+    def handle_endtag(self, tag):
+        # 容忍未闭合的标签：弹出到匹配的开始标签为止，找不到时忽略
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                break
+        else:
+            return
+
+        if not self._skip_depth and any(t in _BLOCK_TAGS for t, _, _ in self._stack[depth:]):
+            self._flush()
+        for popped_tag, _, skip in self._stack[depth:]:
+            if skip:
+                self._skip_depth -= 1
+            if popped_tag == "a":
+                self._link_depth -= 1
+        del self._stack[depth:]
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self._text.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_main_text(html: str) -> str:
+    """
+    从页面 HTML 中抽取正文
+
+    Args:
+        html: 页面 HTML
+
+    Returns:
+        正文（段落间以换行分隔），找不到正文时返回空字符串
+    """
+    parser = _ArticleParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        print(f"  ⚠️ 解析页面失败: {e}")
+        return ""
+
+    scores: Dict[int, float] = defaultdict(float)
+    for node, text, link_chars in parser.paragraphs:
+        if len(text) < _MIN_SCORED_CHARS:
+            continue
+        score = (1 + text.count("，") + text.count(",") + min(len(text) / 100, 3)) * (1 - link_chars / len(text))
+        scores[node] += score
+        parent = parser.parents.get(node)
+        if parent is not None:
+            scores[parent] += score / 2
+    if not scores:
+        return ""
+
+    best = max(scores, key=lambda node: scores[node] + parser.weights.get(node, 0))
+
+    def inside_best(node: Optional[int]) -> bool:
+        while node is not None:
+            if node == best:
+                return True
+            node = parser.parents.get(node)
+        return False
+
+    return "\n".join(
+        text
+        for node, text, link_chars in parser.paragraphs
+        if len(text) >= _MIN_PARAGRAPH_CHARS and link_chars / len(text) < 0.5 and inside_best(node)
+    )
+
+
+def _decode_html(data: bytes, content_type: str) -> str:
+    """按响应头或页面 meta 中的编码解码，都没有时先试 UTF-8 再用 GB18030"""
+    match = re.search(r'charset=([\w-]+)', content_type, re.I) or _CHARSET_RE.search(data[:4096])
+    if match:
+        charset = match.group(1)
+        charset = charset.decode("ascii", "ignore") if isinstance(charset, bytes) else charset
+        try:
+            return data.decode(charset, errors="replace")
+        except LookupError:
+            pass
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("gb18030", errors="replace")
+
+
+def _fetch_html(url: str) -> str:
+    """下载页面，超过 config.ARTICLE_MAX_BYTES 的部分不再读取（正文一般在前面）"""
+    response = requests.get(
+        url,
+        timeout=config.ARTICLE_FETCH_TIMEOUT,
+        headers={"User-Agent": config.RSS_USER_AGENT},
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        if content_type and "html" not in content_type.lower():
+            raise ValueError(f"非网页响应 ({content_type.split(';')[0]})")
+
+        chunks = []
+        total = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total >= config.ARTICLE_MAX_BYTES:
+                break
+        return _decode_html(b"".join(chunks), content_type)
+    finally:
+        response.close()
+
+
+class ArticleCache:
+    """正文磁盘缓存：每个 URL 一个 JSON 文件，超过有效期视为未命中"""
+
+    def __init__(self, cache_dir: str = None, ttl: float = None, short_ttl: float = None):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，默认使用 config.ARTICLE_CACHE_DIR
+            ttl: 缓存有效期（秒），默认使用 config.ARTICLE_CACHE_TTL
+            short_ttl: 正文过短（不足 config.ARTICLE_MIN_CHARS）时的有效期（秒），
+                默认使用 config.ARTICLE_SHORT_CACHE_TTL
+        """
+        self.cache_dir = cache_dir or config.ARTICLE_CACHE_DIR
+        self.ttl = config.ARTICLE_CACHE_TTL if ttl is None else ttl
+        self.short_ttl = config.ARTICLE_SHORT_CACHE_TTL if short_ttl is None else short_ttl
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url: str) -> Optional[str]:
+        """读取缓存的正文，未命中、过期或损坏时返回 None（抽取失败的页面只短时间缓存）"""
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        text = entry.get("text", "")
+        ttl = self.ttl if len(text) >= config.ARTICLE_MIN_CHARS else self.short_ttl
+        if entry.get("url") != url or time.time() - entry.get("fetched_at", 0) >= ttl:
+            return None
+        return text
+
+    def put(self, url: str, text: str) -> None:
+        """原子写入缓存文件"""
+        path = self._path(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"url": url, "text": text, "fetched_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"  ⚠️ 写入正文缓存失败: {e}")
+
+
+_default_cache: Optional[ArticleCache] = None
+
+
+def get_article_cache() -> ArticleCache:
+    """获取全局默认的正文缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArticleCache()
+    return _default_cache
+
+
+def iter_full_articles(
+    news_list: List[NewsItem],
+    max_workers: int = None,
+    per_host_limit: int = None,
+    deadline: float = None,
+) -> Iterator[Tuple[int, NewsItem]]:
+    """
+    并发抓取新闻原文并抽取正文，每条新闻一有结果就产出，便于后续步骤逐条开始
+
+    结果写入 news.full_content。同一域名的并发连接数受限；超过总截止时间、抓取失败或正文过短
+    （不足 config.ARTICLE_MIN_CHARS）的新闻 full_content 为空，继续使用 RSS 摘要。
+    抽取结果按 URL 缓存，命中缓存的新闻最先产出。每条新闻都会产出且只产出一次。
+
+    Args:
+        news_list: 新闻列表
+        max_workers: 最大并发数，默认使用 config.ARTICLE_FETCH_WORKERS
+        per_host_limit: 每个域名的最大并发连接数，默认使用 config.ARTICLE_PER_HOST_LIMIT
+        deadline: 总截止时间（秒），默认使用 config.ARTICLE_FETCH_DEADLINE
+
+    Yields:
+        (在 news_list 中的索引, 新闻)，按完成顺序
+    """
+    if max_workers is None:
+        max_workers = config.ARTICLE_FETCH_WORKERS
+    if per_host_limit is None:
+        per_host_limit = config.ARTICLE_PER_HOST_LIMIT
+    if deadline is None:
+        deadline = config.ARTICLE_FETCH_DEADLINE
+
+    cache = get_article_cache()
+    jobs = []
+    for index, news in enumerate(news_list):
+        news.full_content = ""
+        cached = cache.get(news.url) if news.url.startswith(("http://", "https://")) else ""
+        if cached is None:
+            jobs.append(index)
+            continue
+        news.full_content = cached if len(cached) >= config.ARTICLE_MIN_CHARS else ""
+        yield index, news
+
+    if not jobs:
+        return
+
+    print(f"  📄 并发抓取 {len(jobs)} 篇新闻原文...")
+    end_time = time.monotonic() + deadline
+    host_limits: Dict[str, threading.BoundedSemaphore] = {}
+    host_limits_lock = threading.Lock()
+
+    def fetch(url: str) -> str:
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            semaphore = host_limits.setdefault(host, threading.BoundedSemaphore(per_host_limit))
+        if not semaphore.acquire(timeout=max(0.0, end_time - time.monotonic())):
+            raise TimeoutError("等待同域名连接超时")
+        try:
+            html = _fetch_html(url)
+        finally:
+            semaphore.release()
+        text = extract_main_text(html)
+        cache.put(url, text)
+        return text
+
+    def collect(future, news: NewsItem) -> None:
+        try:
+            text = future.result()
+        except Exception as e:
+            print(f"  ⚠️ 抓取原文失败 ({news.url}): {e}")
+            text = ""
+        if len(text) >= config.ARTICLE_MIN_CHARS:
+            news.full_content = text
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    try:
+        futures = {executor.submit(fetch, news_list[index].url): index for index in jobs}
+        pending = dict(futures)
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                index = pending.pop(future)
+                collect(future, news_list[index])
+                yield index, news_list[index]
+        except TimeoutError:
+            # 截止时已完成但尚未产出的抓取照常使用结果
+            for future, index in list(pending.items()):
+                del pending[future]
+                if future.done():
+                    collect(future, news_list[index])
+                else:
+                    print(f"  ⚠️ 抓取原文超时 ({news_list[index].url})")
+                yield index, news_list[index]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_full_articles(news_list: List[NewsItem], **kwargs) -> int:
+    """
+    并发抓取新闻原文并抽取正文，全部完成（或超过总截止时间）后返回
+
+    Args:
+        news_list: 新闻列表
+        **kwargs: 并发参数，同 iter_full_articles
+
+    Returns:
+        成功获取正文的新闻条数
+    """
+    for _ in iter_full_articles(news_list, **kwargs):
+        pass
+    fetched = sum(1 for news in news_list if news.full_content)
+    print(f"  ✅ 已获取 {fetched}/{len(news_list)} 篇原文正文")
+    return fetched
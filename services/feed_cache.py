@@ -0,0 +1,135 @@
+"""RSS 源缓存服务：持久化 ETag/Last-Modified 和解析后的条目"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import config
+
+# 缓存条目记录格式的版本：记录字段或截取规则变化时需同步修改，旧版本的条目视为未命中
+RECORD_SCHEMA_VERSION = 2
+
+
+def _record_schema() -> str:
+    """当前记录格式标识（摘要截取长度也会改变记录内容，一并计入）"""
+    return f"{RECORD_SCHEMA_VERSION}/{config.RSS_CONTENT_MAX_CHARS}"
+
+
+class FeedCache:
+    """
+    RSS 源磁盘缓存
+
+    每个源一个 JSON 文件，保存条件请求所需的校验字段和解析后的条目记录。
+    在 TTL 内直接返回缓存；过期后由调用方发起条件请求，304 时调用 touch 续期。
+    记录格式与当前版本不一致的条目视为未命中（也不用于条件请求），重新完整获取。
+    """
+
+    def __init__(self, cache_dir: str = None, ttl: float = None):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，默认使用 config.RSS_CACHE_DIR
+            ttl: 缓存有效期（秒），默认使用 config.RSS_CACHE_TTL，0 表示每次都发起条件请求
+        """
+        self.cache_dir = cache_dir or config.RSS_CACHE_DIR
+        self.ttl = config.RSS_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+
+    def _path(self, url: str) -> str:
+        """URL 对应的缓存文件路径"""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """读取缓存条目，不存在、损坏或记录格式已过时时返回 None"""
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception as e:
+            print(f"  ⚠️ 读取 RSS 缓存失败: {e}")
+            return None
+
+        if entry.get("url") != url or entry.get("schema") != _record_schema():
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """缓存是否仍在 TTL 内（无需任何网络请求）"""
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    @staticmethod
+    def covers(entry: Dict, count: int) -> bool:
+        """缓存的条目数量是否满足本次请求"""
+        return len(entry.get("records", [])) >= count or not entry.get("truncated", False)
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        """构造条件请求头"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, records: List[Dict], etag: str = "", last_modified: str = "", truncated: bool = False) -> Dict:
+        """
+        写入缓存
+
+        Args:
+            url: RSS 源 URL
+            records: 解析后的条目记录
+            etag: 响应的 ETag
+            last_modified: 响应的 Last-Modified
+            truncated: 条目是否只截取了源的一部分
+
+        Returns:
+            写入的缓存条目
+        """
+        entry = {
+            "url": url,
+            "schema": _record_schema(),
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "fetched_at": time.time(),
+            "truncated": truncated,
+            "records": records,
+        }
+        self._write(url, entry)
+        return entry
+
+    def touch(self, url: str, entry: Dict) -> None:
+        """304 未修改时刷新缓存时间"""
+        entry["fetched_at"] = time.time()
+        self._write(url, entry)
+
+    def _write(self, url: str, entry: Dict) -> None:
+        """原子写入缓存文件"""
+        path = self._path(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._lock:
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"  ⚠️ 写入 RSS 缓存失败: {e}")
+
+
+_default_cache: Optional[FeedCache] = None
+
+
+def get_feed_cache() -> FeedCache:
+    """获取全局默认的 RSS 缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = FeedCache()
+    return _default_cache
@@ -0,0 +1,212 @@
+"""
+后台 RSS 轮询服务（无界面）
+
+按各源自己的间隔持续轮询 ConfigManager 中配置的全部 RSS 源：
+- 源更新频繁时缩短间隔，长时间无更新时逐步拉长
+- 获取失败时指数退避
+- 新条目写入本地历史库（collected 表），供之后制作视频使用
+
+运行方式: uv run python -m services.feed_poller
+"""
+
+import argparse
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from models.news import NewsItem
+from services.config_manager import ConfigManager
+from services.feed_cache import FeedCache
+from services.history_store import HistoryStore
+from services.rss_fetcher import fetch_single_source, filter_recent_news
+import config
+
+
+@dataclass
+class SourceState:
+    """单个源的轮询状态"""
+    category: str
+    name: str
+    url: str
+    count: int
+    interval: float  # 当前轮询间隔（秒）
+    next_due: float = 0.0  # 下次轮询时间（time.time()）
+    failures: int = 0  # 连续失败次数
+    last_new_count: int = 0  # 最近一次轮询的新条目数
+    last_error: str = ""
+
+
+def _log(message: str) -> None:
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+
+class FeedPoller:
+    """按源自适应间隔轮询 RSS 的调度器"""
+
+    def __init__(
+        self,
+        config_manager: ConfigManager = None,
+        store: HistoryStore = None,
+        fetch_func: Callable[[str, str, int], List[NewsItem]] = None,
+        min_interval: float = None,
+        max_interval: float = None,
+        max_backoff: float = None,
+        categories: List[str] = None,
+        jitter: float = 0.1,
+    ):
+        """
+        初始化轮询器
+
+        Args:
+            config_manager: 配置管理器，默认新建
+            store: 新闻存储，默认使用 config.HISTORY_DB_PATH
+            fetch_func: 获取函数 fetch(url, name, count)，失败时应抛出异常
+            min_interval: 最短轮询间隔（秒），默认 config.POLL_MIN_INTERVAL
+            max_interval: 最长轮询间隔（秒），默认 config.POLL_MAX_INTERVAL
+            max_backoff: 失败退避的最长间隔（秒），默认 config.POLL_MAX_BACKOFF
+            categories: 只轮询指定分类，默认全部
+            jitter: 间隔随机抖动比例，避免多个源同时请求
+        """
+        self.config_manager = config_manager or ConfigManager()
+        self.store = store or HistoryStore()
+        self.fetch_func = fetch_func or self._default_fetch
+        self.min_interval = min_interval or config.POLL_MIN_INTERVAL
+        self.max_interval = max_interval or config.POLL_MAX_INTERVAL
+        self.max_backoff = max_backoff or config.POLL_MAX_BACKOFF
+        self.categories = categories
+        self.jitter = jitter
+        self.states: Dict[str, SourceState] = {}
+        self._stop = threading.Event()
+        # 轮询间隔本身就是刷新周期：不使用 TTL，每次轮询都发起条件请求
+        self.feed_cache = FeedCache(ttl=0)
+
+    def _default_fetch(self, url: str, name: str, count: int) -> List[NewsItem]:
+        return fetch_single_source(url, name, count, raise_errors=True, cache=self.feed_cache)
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def load_sources(self, now: float = None) -> None:
+        """从配置同步源列表：新源立即轮询，已删除的源停止轮询，保留已有源的状态"""
+        now = time.time() if now is None else now
+        current = {}
+
+        for category, sources in self.config_manager.get_all_rss_sources().items():
+            if self.categories and category not in self.categories:
+                continue
+            for source in sources:
+                url = source.get("url", "")
+                if not url:
+                    continue
+                state = self.states.get(url) or SourceState(
+                    category=category,
+                    name=source.get("name", "未知来源"),
+                    url=url,
+                    count=source.get("default_count", 5),
+                    interval=self.min_interval,
+                    next_due=now,
+                )
+                current[url] = state
+
+        self.states = current
+
+    def poll_source(self, state: SourceState, now: float = None) -> int:
+        """
+        轮询一个源并根据结果调整它的下次轮询时间
+
+        Returns:
+            新增条目数（失败时为 0）
+        """
+        now = time.time() if now is None else now
+
+        try:
+            news_list = self.fetch_func(state.url, state.name, state.count)
+            news_list = filter_recent_news(news_list, per_source_quota=0)
+            new_count = self.store.record_collected(news_list, state.category)
+        except Exception as e:
+            state.failures += 1
+            state.last_error = str(e)
+            # 指数退避：间隔 × 2^失败次数，不超过 max_backoff
+            delay = min(self.max_backoff, state.interval * (2 ** state.failures))
+            state.next_due = now + self._jittered(delay)
+            _log(f"✗ {state.name} 获取失败（连续 {state.failures} 次），{delay:.0f} 秒后重试: {e}")
+            return 0
+
+        state.failures = 0
+        state.last_error = ""
+        state.last_new_count = new_count
+
+        # 有新内容时缩短间隔，没有时逐步拉长
+        if new_count:
+            state.interval = max(self.min_interval, state.interval / 2)
+        else:
+            state.interval = min(self.max_interval, state.interval * 1.5)
+        state.next_due = now + self._jittered(state.interval)
+
+        if new_count:
+            _log(f"✓ {state.name} 新增 {new_count} 条，下次间隔 {state.interval:.0f} 秒")
+        return new_count
+
+    def run(self, max_polls: int = None, reload_interval: float = 600) -> None:
+        """
+        持续轮询，直到调用 stop()
+
+        Args:
+            max_polls: 最多轮询次数（用于测试），默认不限制
+            reload_interval: 重新读取配置文件的间隔（秒）
+        """
+        self.load_sources()
+        _log(f"开始轮询 {len(self.states)} 个 RSS 源")
+        next_reload = time.time() + reload_interval
+        polls = 0
+
+        while not self._stop.is_set():
+            if time.time() >= next_reload:
+                self.config_manager = ConfigManager(self.config_manager.config_file)
+                self.load_sources()
+                next_reload = time.time() + reload_interval
+
+            if not self.states:
+                self._stop.wait(min(reload_interval, self.min_interval))
+                continue
+
+            state = min(self.states.values(), key=lambda s: s.next_due)
+
+            wait_seconds = state.next_due - time.time()
+            if wait_seconds > 0:
+                self._stop.wait(min(wait_seconds, max(0.0, next_reload - time.time())))
+                continue
+
+            self.poll_source(state)
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+
+    def stop(self) -> None:
+        """停止轮询"""
+        self._stop.set()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="后台轮询 RSS 源并保存新条目")
+    parser.add_argument("--category", action="append", help="只轮询指定分类（可重复）")
+    parser.add_argument("--min-interval", type=float, default=None, help="最短轮询间隔（秒）")
+    parser.add_argument("--max-interval", type=float, default=None, help="最长轮询间隔（秒）")
+    args = parser.parse_args(argv)
+
+    poller = FeedPoller(
+        categories=args.category,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+    )
+    try:
+        poller.run()
+    except KeyboardInterrupt:
+        poller.stop()
+        _log("已停止轮询")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""流式 RSS/Atom 解析：读够指定条数即停止，格式异常时交由 feedparser 处理"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+RSS1_NS = "http://purl.org/rss/1.0/"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+MEDIA_NS = "http://search.yahoo.com/mrss/"
+CONTENT_NS = "http://purl.org/rss/1.0/modules/content/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+
+# 条目元素（RSS 2.0 / RSS 1.0 / Atom）
+ITEM_TAGS = {"item", f"{{{RSS1_NS}}}item", f"{{{ATOM_NS}}}entry"}
+
+# 根元素（用于判断是否为 RSS/Atom 文档）
+ROOT_TAGS = {"rss", f"{{{RDF_NS}}}RDF", f"{{{ATOM_NS}}}feed"}
+
+
+class FeedStreamError(ValueError):
+    """流式解析失败（文档格式异常或不是 RSS/Atom），调用方应回退到 feedparser"""
+
+
+def _local(tag: str) -> str:
+    """去掉命名空间前缀"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    """获取元素的完整文本（包括子元素）"""
+    if elem is None:
+        return ""
+    return "".join(elem.itertext()).strip()
+
+
+def _find(item: ET.Element, *tags: str) -> Optional[ET.Element]:
+    """按顺序查找第一个存在的子元素"""
+    for tag in tags:
+        elem = item.find(tag)
+        if elem is not None:
+            return elem
+    return None
+
+
+def _first_text(item: ET.Element, *tags: str) -> str:
+    """按顺序查找第一个非空的子元素文本"""
+    for tag in tags:
+        text = _text(item.find(tag))
+        if text:
+            return text
+    return ""
+
+
+def _item_to_record(item: ET.Element) -> Dict:
+    """将条目元素转换为与 rss_fetcher 一致的精简记录"""
+    is_atom = item.tag == f"{{{ATOM_NS}}}entry"
+    ns = f"{{{ATOM_NS}}}" if is_atom else (f"{{{RSS1_NS}}}" if item.tag.startswith(f"{{{RSS1_NS}}}") else "")
+
+    title = _text(item.find(f"{ns}title")) or "无标题"
+
+    # 链接：RSS 为文本，Atom 为 rel=alternate 的 href
+    link = ""
+    if is_atom:
+        for link_elem in item.findall(f"{ns}link"):
+            if link_elem.get("rel", "alternate") == "alternate":
+                link = link_elem.get("href", "")
+                break
+    else:
+        link = _text(item.find(f"{ns}link"))
+        if not link:
+            # 与 feedparser 一致：没有 link 时使用可作为永久链接的 guid
+            guid = item.find("guid")
+            if guid is not None and guid.get("isPermaLink", "true").lower() != "false":
+                link = _text(guid)
+
+    # 发布时间
+    if is_atom:
+        published = _first_text(item, f"{ns}published", f"{ns}issued", f"{ns}updated")
+    else:
+        published = _first_text(item, "pubDate", f"{{{DC_NS}}}date")
+
+    # 摘要：优先 summary/description，缺失时使用正文
+    if is_atom:
+        raw_content = _first_text(item, f"{ns}summary", f"{ns}content")
+    else:
+        raw_content = _first_text(item, f"{ns}description", f"{{{CONTENT_NS}}}encoded")
+
+    # 提取图片URL（最多2张），顺序与 feedparser 路径一致
+    image_urls = []
+
+    # 方法1: media_content (Media RSS，可能包在 media:group 中)
+    media_contents = item.findall(f"{{{MEDIA_NS}}}content") + item.findall(f"{{{MEDIA_NS}}}group/{{{MEDIA_NS}}}content")
+    for media in media_contents[:2]:
+        if media.get("medium") == "image" or media.get("type", "").startswith("image/"):
+            image_urls.append(media.get("url"))
+
+    # 方法2: enclosures (RSS enclosure / Atom rel=enclosure)
+    if len(image_urls) < 2:
+        if is_atom:
+            enclosures = [(e.get("href", ""), e.get("type", "")) for e in item.findall(f"{ns}link") if e.get("rel") == "enclosure"]
+        else:
+            enclosures = [(e.get("url", ""), e.get("type", "")) for e in item.findall("enclosure")]
+        for href, mime in enclosures:
+            if mime.startswith("image/"):
+                image_urls.append(href)
+                if len(image_urls) >= 2:
+                    break
+
+    # 方法3: media_thumbnail
+    if len(image_urls) < 2:
+        thumbs = item.findall(f"{{{MEDIA_NS}}}thumbnail") + item.findall(f"{{{MEDIA_NS}}}group/{{{MEDIA_NS}}}thumbnail")
+        for thumb in thumbs[:2 - len(image_urls)]:
+            image_urls.append(thumb.get("url"))
+
+    return {
+        "title": title,
+        "url": link,
+        "published": published,
+        "raw_content": raw_content[:config.RSS_CONTENT_MAX_CHARS],  # 限制长度
+        "image_urls": image_urls[:2],  # 最多保留2张
+    }
+
+
+def parse_feed_stream(chunks: Iterable[bytes], count: int) -> Tuple[List[Dict], bool]:
+    """
+    增量解析 RSS/Atom 文档，读够 count 条后立即停止读取
+
+    Args:
+        chunks: 文档字节块（如 response.iter_content()）
+        count: 需要的条目数量
+
+    Returns:
+        (条目记录列表, 是否提前停止)；提前停止时源中可能还有更多条目
+
+    Raises:
+        FeedStreamError: 文档格式异常或不是 RSS/Atom
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    records = []
+    root_checked = False
+    depth = 0
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            parser.feed(chunk)
+
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if not root_checked:
+                        if elem.tag not in ROOT_TAGS:
+                            raise FeedStreamError(f"不是 RSS/Atom 文档: <{_local(elem.tag)}>")
+                        root_checked = True
+                    if elem.tag in ITEM_TAGS:
+                        depth += 1
+                    continue
+
+                if elem.tag in ITEM_TAGS:
+                    depth -= 1
+                    if depth == 0:
+                        records.append(_item_to_record(elem))
+                        elem.clear()  # 释放已处理条目的子树
+                        if len(records) >= count:
+                            return records, True
+
+        parser.close()
+    except ET.ParseError as e:
+        raise FeedStreamError(f"XML 解析失败: {e}") from e
+
+    if not root_checked:
+        raise FeedStreamError("文档为空")
+
+    return records, False
+
+
+class RecordingStream:
+    """包装字节块迭代器，记录已读取的内容，以便回退时拼出完整文档"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._consumed: List[bytes] = []
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self._consumed.append(chunk)
+            yield chunk
+
+    def read_all(self) -> bytes:
+        """返回已读取部分加上剩余全部内容"""
+        self._consumed.extend(self._chunks)
+        return b"".join(self._consumed)
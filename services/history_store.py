@@ -0,0 +1,245 @@
+"""新闻历史记录（SQLite）：已制作的文章，以及后台轮询收集到的新闻"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Set
+from models.news import NewsItem
+from services.text_utils import clean_html_tags
+import config
+
+# 单条 SQL 的参数上限（SQLite 默认限制为 999 以上，这里保守分批）
+_QUERY_CHUNK = 500
+
+
+def content_hash(news: NewsItem) -> str:
+    """
+    计算新闻内容哈希（标题 + 清理后的正文，忽略空白和标点差异）
+
+    同一篇文章换了 URL（如带追踪参数）时仍能识别。
+    """
+    text = f"{clean_html_tags(news.title)}\n{clean_html_tags(news.raw_content)}"
+    text = re.sub(r'[\W_]+', '', text.lower())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _chunks(values: List[str], size: int = _QUERY_CHUNK) -> Iterable[List[str]]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class HistoryStore:
+    """新闻历史记录：produced 表记录已制作的新闻，collected 表保存轮询收集的新闻供后续制作"""
+
+    def __init__(self, db_path: str = None):
+        """
+        初始化历史记录
+
+        Args:
+            db_path: 数据库路径，默认使用 config.HISTORY_DB_PATH
+        """
+        self.db_path = db_path or config.HISTORY_DB_PATH
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每次操作使用独立连接，可在任意线程中调用"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS produced (
+                        url TEXT PRIMARY KEY,
+                        content_hash TEXT NOT NULL,
+                        title TEXT NOT NULL DEFAULT '',
+                        source TEXT NOT NULL DEFAULT '',
+                        produced_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_produced_content_hash ON produced(content_hash)")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS collected (
+                        url TEXT PRIMARY KEY,
+                        category TEXT NOT NULL DEFAULT '',
+                        source TEXT NOT NULL DEFAULT '',
+                        title TEXT NOT NULL DEFAULT '',
+                        published TEXT NOT NULL DEFAULT '',
+                        published_ts REAL NOT NULL DEFAULT 0,
+                        raw_content TEXT NOT NULL DEFAULT '',
+                        image_urls TEXT NOT NULL DEFAULT '[]',
+                        collected_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_collected_collected_at ON collected(collected_at)")
+        finally:
+            conn.close()
+
+    def mark_produced(self, news_list: List[NewsItem]) -> None:
+        """
+        记录已制作成视频的新闻
+
+        Args:
+            news_list: 已制作的新闻列表
+        """
+        now = time.time()
+        rows = []
+        for news in news_list:
+            digest = content_hash(news)
+            rows.append((news.url or f"hash:{digest}", digest, news.title, news.source, now))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO produced (url, content_hash, title, source, produced_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        finally:
+            conn.close()
+
+    def _existing(self, conn: sqlite3.Connection, column: str, values: List[str]) -> Set[str]:
+        """批量查询已存在的值（走主键/索引）"""
+        found = set()
+        unique_values = list(dict.fromkeys(v for v in values if v))
+        for chunk in _chunks(unique_values):
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(f"SELECT {column} FROM produced WHERE {column} IN ({placeholders})", chunk)
+            found.update(row[0] for row in cursor)
+        return found
+
+    def find_seen(self, news_list: List[NewsItem]) -> List[bool]:
+        """
+        批量判断新闻是否已制作过（URL 或内容哈希命中任一即视为已制作）
+
+        Returns:
+            与 news_list 对应的布尔列表
+        """
+        if not news_list:
+            return []
+
+        hashes = [content_hash(news) for news in news_list]
+        conn = self._connect()
+        try:
+            seen_urls = self._existing(conn, "url", [news.url for news in news_list])
+            seen_hashes = self._existing(conn, "content_hash", hashes)
+        finally:
+            conn.close()
+
+        return [
+            (news.url in seen_urls) or (h in seen_hashes)
+            for news, h in zip(news_list, hashes)
+        ]
+
+    def mark_seen(self, news_list: List[NewsItem]) -> int:
+        """
+        批量设置新闻的 seen 标记
+
+        Returns:
+            已制作过的新闻数量
+        """
+        flags = self.find_seen(news_list)
+        for news, seen in zip(news_list, flags):
+            news.seen = seen
+        return sum(flags)
+
+    def filter_unseen(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """过滤掉已制作过的新闻"""
+        flags = self.find_seen(news_list)
+        return [news for news, seen in zip(news_list, flags) if not seen]
+
+    def record_collected(self, news_list: List[NewsItem], category: str = "") -> int:
+        """
+        保存轮询收集到的新闻（已存在的 URL 会被忽略）
+
+        Args:
+            news_list: 新闻列表
+            category: RSS 分类
+
+        Returns:
+            新增的条数
+        """
+        now = time.time()
+        rows = [
+            (news.url, category, news.source, news.title, news.published, news.published_ts,
+             news.raw_content, json.dumps(news.image_urls, ensure_ascii=False), now)
+            for news in news_list if news.url
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO collected (url, category, source, title, published, published_ts, "
+                    "raw_content, image_urls, collected_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def get_collected(self, since: float = 0, category: str = None, limit: int = 200) -> List[NewsItem]:
+        """
+        读取收集到的新闻（最新收集的在前）
+
+        Args:
+            since: 只返回该时间戳之后收集的新闻
+            category: 只返回指定分类
+            limit: 最多返回条数
+
+        Returns:
+            新闻列表
+        """
+        sql = ("SELECT url, source, title, published, published_ts, raw_content, image_urls "
+               "FROM collected WHERE collected_at >= ?")
+        params: list = [since]
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        sql += " ORDER BY collected_at DESC, published_ts DESC LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            NewsItem(
+                title=title,
+                source=source,
+                url=url,
+                published=published,
+                published_ts=published_ts,
+                raw_content=raw_content,
+                image_urls=json.loads(image_urls),
+            )
+            for url, source, title, published, published_ts, raw_content, image_urls in rows
+        ]
+
+    def count(self) -> int:
+        """历史记录条数"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM produced").fetchone()[0]
+        finally:
+            conn.close()
+
+
+_default_store: Optional[HistoryStore] = None
+
+
+def get_history_store() -> HistoryStore:
+    """获取全局默认的历史记录实例"""
+    global _default_store
+    if _default_store is None:
+        _default_store = HistoryStore()
+    return _default_store
@@ -0,0 +1,176 @@
+"""新闻配图缓存：按 URL 内容寻址，保存原始字节、响应校验字段和处理后的画布"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+import config
+
+
+class ImageCache:
+    """
+    配图磁盘缓存
+
+    目录结构：
+        raw/<key>.bin         原始图片字节
+        raw/<key>.json        元数据（ETag、Last-Modified、Content-Type、获取时间等）
+        processed/<key>_<variant>.jpg  处理后的 1920x1080 画布（variant 区分不同处理参数）
+
+    文件的修改时间作为最近使用时间，超出容量上限时按 LRU 整组删除同一 key 的文件。
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, ttl: float = None):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，默认使用 config.IMAGE_CACHE_DIR
+            max_bytes: 缓存容量上限（字节），默认使用 config.IMAGE_CACHE_MAX_BYTES
+            ttl: 有效期（秒），有效期内不发起任何网络请求，默认使用 config.IMAGE_CACHE_TTL
+        """
+        self.cache_dir = cache_dir or config.IMAGE_CACHE_DIR
+        self.max_bytes = config.IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = config.IMAGE_CACHE_TTL if ttl is None else ttl
+        self.raw_dir = os.path.join(self.cache_dir, "raw")
+        self.processed_dir = os.path.join(self.cache_dir, "processed")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.raw_dir, exist_ok=True)
+        os.makedirs(self.processed_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url: str) -> str:
+        """URL 对应的缓存 key"""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    def raw_path(self, url: str) -> str:
+        return os.path.join(self.raw_dir, f"{self.key(url)}.bin")
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.raw_dir, f"{self.key(url)}.json")
+
+    def processed_path(self, url: str, variant: str) -> str:
+        """处理后画布的路径"""
+        return os.path.join(self.processed_dir, f"{self.key(url)}_{variant}.jpg")
+
+    def get_meta(self, url: str) -> Optional[Dict]:
+        """读取元数据，不存在或原始文件丢失时返回 None"""
+        meta_path = self._meta_path(url)
+        if not os.path.exists(meta_path) or not os.path.exists(self.raw_path(url)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            return None
+        return meta if meta.get("url") == url else None
+
+    def is_fresh(self, meta: Dict) -> bool:
+        """是否仍在有效期内"""
+        return time.time() - meta.get("fetched_at", 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(meta: Dict) -> Dict[str, str]:
+        """构造条件请求头"""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read_raw(self, url: str) -> bytes:
+        """读取原始图片字节"""
+        path = self.raw_path(url)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.touch(path)
+        return data
+
+    def put_raw(self, url: str, data: bytes, etag: str = "", last_modified: str = "", content_type: str = "") -> str:
+        """
+        保存原始图片和元数据
+
+        Returns:
+            原始图片路径
+        """
+        path = self.raw_path(url)
+        self._atomic_write(path, data)
+        self.update_meta(url, {
+            "url": url,
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "content_type": content_type or "",
+            "size": len(data),
+            "fetched_at": time.time(),
+        })
+        return path
+
+    def update_meta(self, url: str, fields: Dict) -> None:
+        """合并更新元数据（304 续期时刷新 fetched_at，也可附加其他字段）"""
+        meta = self.get_meta(url) or {"url": url}
+        meta.update(fields)
+        self._atomic_write(self._meta_path(url), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def touch(path: str) -> None:
+        """刷新最近使用时间"""
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """
+        超出容量上限时按最近使用时间淘汰，同一 key 的原始文件、元数据和画布一起删除
+
+        Returns:
+            释放的字节数
+        """
+        with self._lock:
+            groups: Dict[str, Dict] = {}
+            for directory in (self.raw_dir, self.processed_dir):
+                for entry in os.scandir(directory):
+                    if not entry.is_file() or entry.name.endswith(".tmp"):
+                        continue
+                    key = entry.name.split(".", 1)[0].split("_", 1)[0]
+                    stat = entry.stat()
+                    group = groups.setdefault(key, {"size": 0, "last_used": 0.0, "paths": []})
+                    group["size"] += stat.st_size
+                    group["last_used"] = max(group["last_used"], stat.st_mtime)
+                    group["paths"].append(entry.path)
+
+            total = sum(g["size"] for g in groups.values())
+            freed = 0
+            for group in sorted(groups.values(), key=lambda g: g["last_used"]):
+                if total - freed <= self.max_bytes:
+                    break
+                for path in group["paths"]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                freed += group["size"]
+
+        if freed:
+            print(f"  🧹 配图缓存已淘汰 {freed / 1024 / 1024:.1f} MB")
+        return freed
+
+
+_default_cache: Optional[ImageCache] = None
+
+
+def get_image_cache() -> ImageCache:
+    """获取全局默认的配图缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ImageCache()
+    return _default_cache
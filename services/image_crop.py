@@ -0,0 +1,58 @@
+"""新闻配图智能裁切：在缩小的灰度图上计算梯度能量，找出细节最丰富的区域"""
+
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+ANALYSIS_SIZE = 160  # 计算能量图时的最大边长（像素）
+
+
+def saliency_crop_box(img: Image.Image, aspect: float) -> Tuple[int, int, int, int]:
+    """
+    计算按目标宽高比裁切时保留细节最多的区域
+
+    裁切框在一个方向上占满原图，只沿另一个方向滑动。在最大边长 ANALYSIS_SIZE 的灰度缩略图上
+    计算梯度幅值作为能量图，对滑动方向做前缀和后即可 O(1) 得到每个窗口的能量总和。
+
+    Args:
+        img: 原图
+        aspect: 目标宽高比（宽 / 高）
+
+    Returns:
+        原图坐标下的裁切框 (left, top, right, bottom)
+    """
+    width, height = img.size
+    if width / height > aspect:
+        crop_width, crop_height = round(height * aspect), height
+    else:
+        crop_width, crop_height = width, round(width / aspect)
+    if (crop_width, crop_height) == (width, height):
+        return 0, 0, width, height
+
+    small = img.convert('L')
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+    gray = np.asarray(small, dtype=np.float32)
+
+    # 梯度幅值：水平和垂直方向相邻像素差的绝对值
+    energy = np.zeros_like(gray)
+    energy[:, 1:] += np.abs(np.diff(gray, axis=1))
+    energy[1:, :] += np.abs(np.diff(gray, axis=0))
+
+    horizontal = crop_width < width
+    profile = energy.sum(axis=0 if horizontal else 1)
+    scale = len(profile) / (width if horizontal else height)
+    window = max(1, min(len(profile), round((crop_width if horizontal else crop_height) * scale)))
+
+    # 前缀和求每个窗口的能量总和，取最大的窗口（并列时取最靠近中间的）
+    cumulative = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+    sums = cumulative[window:] - cumulative[:-window]
+    candidates = np.flatnonzero(sums >= sums.max() * (1 - 1e-6))
+    best = int(candidates[np.argmin(np.abs(candidates - (len(sums) - 1) / 2))])
+
+    offset = round(best / scale)
+    if horizontal:
+        left = min(max(0, offset), width - crop_width)
+        return left, 0, left + crop_width, height
+    top = min(max(0, offset), height - crop_height)
+    return 0, top, width, top + crop_height
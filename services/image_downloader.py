@@ -1,13 +1,223 @@
 """新闻配图下载和处理服务"""
 
+import io
+import multiprocessing
 import os
+import threading
+import time
 import requests
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
 from PIL import Image
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 from models.news import NewsItem
+from services.image_cache import ImageCache, get_image_cache
+from services.image_crop import saliency_crop_box
+from services.image_hash import dhash_bytes
 import config
 
 
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def _processed_variant(fit_mode: str) -> str:
+    """处理参数的标识，参与缓存 key，修改处理方式时需同步修改"""
+    if fit_mode == "fill":
+        return "fill_1920x1080"
+    return "letterbox_800x600"
+
+
+# 识别图片格式和尺寸时最多读取的字节数（部分 JPEG 的 EXIF 较大）
+_HEADER_SNIFF_BYTES = 256 * 1024
+
+
+def _check_image_header(buffer: bytes, complete: bool = False) -> bool:
+    """
+    尝试从已读取的数据中解析图片头部，并检查尺寸是否符合要求
+
+    Args:
+        buffer: 已读取的数据
+        complete: 是否已读完整个响应
+
+    Returns:
+        头部已解析并通过检查时返回 True，数据不足时返回 False；尺寸不符合要求时抛出异常
+    """
+    try:
+        with Image.open(io.BytesIO(buffer)) as img:
+            width, height = img.size
+    except Exception:
+        if complete or len(buffer) >= _HEADER_SNIFF_BYTES:
+            raise ValueError("无法识别的图片格式")
+        return False
+
+    if width * height > config.IMAGE_MAX_PIXELS:
+        raise ValueError(f"图片像素过多 ({width}x{height})")
+    if min(width, height) < config.IMAGE_MIN_SIDE:
+        raise ValueError(f"图片尺寸过小 ({width}x{height})")
+    return True
+
+
+def _read_image_response(response: requests.Response) -> bytes:
+    """
+    流式读取图片响应，尽早放弃不合适的图片，失败时抛出异常
+
+    依次检查状态码、Content-Type 和 Content-Length，然后边下载边解析图片头部，
+    在读到完整图片之前就能拒绝非图片、尺寸过大或过小的响应，并限制总字节数。
+
+    Returns:
+        图片原始字节
+    """
+    try:
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and not content_type.startswith("image/") and content_type != "application/octet-stream":
+            raise ValueError(f"非图片响应 ({content_type})")
+
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > config.IMAGE_MAX_BYTES:
+            raise ValueError(f"图片过大 ({int(content_length) / 1024 / 1024:.1f} MB)")
+
+        chunks = []
+        total = 0
+        header_checked = False
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            total += len(chunk)
+            if total > config.IMAGE_MAX_BYTES:
+                raise ValueError(f"图片超过 {config.IMAGE_MAX_BYTES / 1024 / 1024:.0f} MB 上限")
+            if not header_checked:
+                if len(chunks) > 1:
+                    chunks = [b"".join(chunks)]
+                header_checked = _check_image_header(chunks[0])
+
+        data = b"".join(chunks)
+        if not header_checked:
+            _check_image_header(data, complete=True)
+        return data
+    finally:
+        response.close()
+
+
+def _cached_image(url: str, cache: ImageCache, fit_mode: str) -> Optional[str]:
+    """缓存有效期内且已有处理结果时直接返回画布路径，不发起网络请求"""
+    meta = cache.get_meta(url)
+    processed_path = cache.processed_path(url, _processed_variant(fit_mode))
+    if meta and cache.is_fresh(meta) and os.path.exists(processed_path):
+        cache.touch(cache.raw_path(url))
+        cache.touch(processed_path)
+        return processed_path
+    return None
+
+
+def _image_hash(url: str, cache: ImageCache) -> str:
+    """读取缓存中的配图感知哈希，没有时从原始图片计算并保存"""
+    meta = cache.get_meta(url) or {}
+    if meta.get("dhash"):
+        return meta["dhash"]
+    try:
+        image_hash = dhash_bytes(cache.read_raw(url))
+    except Exception:
+        return ""
+    cache.update_meta(url, {"dhash": image_hash})
+    return image_hash
+
+
+def _fetch_image(url: str, cache: ImageCache, fit_mode: str) -> Tuple[str, Optional[bytes]]:
+    """
+    网络阶段：下载配图原始数据并写入缓存，失败时抛出异常
+
+    原始图片和处理后的画布都按 URL 缓存：有效期内直接复用，过期后带 ETag/Last-Modified
+    发起条件请求，服务器返回 304 时不重新下载，画布已存在时也不重新处理。
+
+    Returns:
+        (画布路径, 待处理的原始数据)，画布已可直接使用时原始数据为 None
+    """
+    processed_path = cache.processed_path(url, _processed_variant(fit_mode))
+    if _cached_image(url, cache, fit_mode):
+        return processed_path, None
+
+    meta = cache.get_meta(url)
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    if meta:
+        headers.update(cache.conditional_headers(meta))
+
+    # 下载图片（流式读取，先检查头部再决定是否继续）
+    response = requests.get(url, timeout=config.IMAGE_DOWNLOAD_TIMEOUT, headers=headers, stream=True)
+
+    if response.status_code == 304 and meta:
+        response.close()
+        # 未修改：续期缓存，复用已有文件
+        cache.update_meta(url, {"fetched_at": time.time()})
+        if os.path.exists(processed_path):
+            cache.touch(cache.raw_path(url))
+            cache.touch(processed_path)
+            return processed_path, None
+        return processed_path, cache.read_raw(url)
+
+    data = _read_image_response(response)
+    cache.put_raw(
+        url,
+        data,
+        etag=response.headers.get("ETag", ""),
+        last_modified=response.headers.get("Last-Modified", ""),
+        content_type=response.headers.get("Content-Type", ""),
+    )
+    return processed_path, data
+
+
+def _process_image_job(data: bytes, output_path: str, fit_mode: str) -> Tuple[str, str]:
+    """
+    处理阶段：生成画布并计算感知哈希（模块级函数，可在子进程中运行）
+
+    Returns:
+        (画布路径, 感知哈希)
+    """
+    # 处理图片：直接从内存解码，按 fit_mode 缩放或裁切
+    process_news_image_bytes(data, output_path, fit_mode)
+    return output_path, dhash_bytes(data)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """获取共享的配图处理进程池（使用 spawn，避免在多线程进程中 fork）"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=config.IMAGE_PROCESS_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _reset_process_pool(error: Exception) -> None:
+    """进程池损坏时丢弃它，下次使用时重建"""
+    global _process_pool
+    print(f"  配图处理进程池不可用，改为在当前线程处理: {error}")
+    with _process_pool_lock:
+        _process_pool = None
+
+
+def _download_image(url: str, cache: ImageCache = None, fit_mode: str = None) -> str:
+    """
+    下载并处理单张配图（在当前线程中完成两个阶段），失败时抛出异常
+
+    Returns:
+        处理后的图片路径
+    """
+    cache = cache or get_image_cache()
+    fit_mode = fit_mode or config.IMAGE_FIT_MODE
+    processed_path, data = _fetch_image(url, cache, fit_mode)
+    if data is not None:
+        _, image_hash = _process_image_job(data, processed_path, fit_mode)
+        cache.update_meta(url, {"dhash": image_hash})
+    return processed_path
+
+
 def download_and_process_images(news: NewsItem, index: int) -> List[str]:
     """
     下载并处理新闻配图
@@ -29,69 +239,131 @@ def download_and_process_images(news: NewsItem, index: int) -> List[str]:
 
     for i, url in enumerate(news.image_urls[:2]):  # 最多2张
         try:
-            # 下载图片
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-
-            # 保存原始图片
-            temp_path = os.path.join(config.IMAGE_DIR, f"news_{index:03d}_photo_{i}.jpg")
-            with open(temp_path, 'wb') as f:
-                f.write(response.content)
-
-            # 处理图片：调整尺寸为800x600（保持比例）
-            processed_path = process_news_image(temp_path, index, i)
-            downloaded_paths.append(processed_path)
-
-            # 删除临时文件
-            if os.path.exists(temp_path) and temp_path != processed_path:
-                os.remove(temp_path)
-
+            downloaded_paths.append(_download_image(url))
         except Exception as e:
             print(f"  ⚠️ 下载图片失败 ({url}): {e}")
             continue
 
+    get_image_cache().evict()
     return downloaded_paths
 
 
-def process_news_image(image_path: str, news_index: int, photo_index: int) -> str:
+# 配图最大尺寸和画布尺寸
+_MAX_PHOTO_SIZE = (800, 600)
+_CANVAS_SIZE = (1920, 1080)
+
+# 铺满模式的回退条件：裁切后保留的面积比例过小（如竖图），或裁切区域过窄需要大幅放大
+_FILL_MIN_AREA_RATIO = 0.5
+_FILL_MIN_WIDTH = 960
+
+
+def _fill_crop_box(img: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """铺满模式的裁切框，不适合铺满时返回 None"""
+    canvas_width, canvas_height = _CANVAS_SIZE
+    box = saliency_crop_box(img, canvas_width / canvas_height)
+    crop_width, crop_height = box[2] - box[0], box[3] - box[1]
+    if crop_width < _FILL_MIN_WIDTH:
+        return None
+    if crop_width * crop_height < img.width * img.height * _FILL_MIN_AREA_RATIO:
+        return None
+    return box
+
+
+def _render_canvas(img: Image.Image, fit_mode: str = "letterbox") -> Image.Image:
+    """
+    生成 1920x1080 画布
+
+    fit_mode 为 "fill" 时按 16:9 裁切细节最丰富的区域并铺满画布，不适合铺满的图片
+    回退为 "letterbox"：缩放到最大 800x600 并居中放到白色画布上。
+
+    JPEG 原图远大于目标尺寸时启用 draft 模式，解码阶段直接按 1/2、1/4、1/8 缩小，
+    再用 LANCZOS 精确缩放到目标尺寸，避免全分辨率解码。
+    """
+    canvas_width, canvas_height = _CANVAS_SIZE
+
+    if fit_mode == "fill":
+        if img.format == 'JPEG' and (img.width >= canvas_width * 2 or img.height >= canvas_height * 2):
+            img.draft('RGB', _CANVAS_SIZE)
+        img = img.convert('RGB')
+        box = _fill_crop_box(img)
+        if box:
+            return img.resize(_CANVAS_SIZE, Image.Resampling.LANCZOS, box=box)
+
+    max_width, max_height = _MAX_PHOTO_SIZE
+    if img.format == 'JPEG' and (img.width >= max_width * 2 or img.height >= max_height * 2):
+        img.draft('RGB', (max_width, max_height))
+    img = img.convert('RGB')
+
+    # 计算缩放比例（保持比例，最大800x600）
+    img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+    # 创建1920x1080的白色画布
+    canvas = Image.new('RGB', (canvas_width, canvas_height), (255, 255, 255))
+
+    # 计算居中位置
+    x = (canvas_width - img.width) // 2
+    y = (canvas_height - img.height) // 2
+
+    # 粘贴图片到画布中央
+    canvas.paste(img, (x, y))
+    return canvas
+
+
+def _save_canvas(canvas: Image.Image, output_path: str) -> None:
+    """先写临时文件再替换，避免并发读取到写了一半的图片"""
+    tmp_path = f"{output_path}.{threading.get_ident()}.tmp"
+    canvas.save(tmp_path, format='JPEG', quality=90)
+    os.replace(tmp_path, output_path)
+
+
+def process_news_image_bytes(data: bytes, output_path: str, fit_mode: str = None) -> str:
+    """
+    直接从内存中的图片数据生成画布，不经过临时文件，失败时抛出异常
+
+    Args:
+        data: 图片原始字节
+        output_path: 输出路径
+        fit_mode: "letterbox" 或 "fill"，默认使用 config.IMAGE_FIT_MODE
+
+    Returns:
+        处理后的图片路径
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        canvas = _render_canvas(img, fit_mode or config.IMAGE_FIT_MODE)
+    _save_canvas(canvas, output_path)
+    return output_path
+
+
+def process_news_image(
+    image_path: str,
+    news_index: int = 0,
+    photo_index: int = 0,
+    output_path: str = None,
+    fit_mode: str = None,
+) -> str:
     """
     处理新闻配图：调整尺寸、添加边距、居中显示
 
-    目标：在1920x1080画布上居中显示，图片最大尺寸800x600
+    目标：在1920x1080画布上居中显示，图片最大尺寸800x600（fill 模式下裁切铺满画布）
 
     Args:
         image_path: 原始图片路径
         news_index: 新闻索引
         photo_index: 图片索引
+        output_path: 输出路径，默认按新闻索引和图片索引在 IMAGE_DIR 下命名
+        fit_mode: "letterbox" 或 "fill"，默认使用 config.IMAGE_FIT_MODE
 
     Returns:
         处理后的图片路径
     """
     try:
-        # 打开图片
-        img = Image.open(image_path)
-        img = img.convert('RGB')
-
-        # 计算缩放比例（保持比例，最大800x600）
-        max_width, max_height = 800, 600
-        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-
-        # 创建1920x1080的白色画布
-        canvas_width, canvas_height = 1920, 1080
-        canvas = Image.new('RGB', (canvas_width, canvas_height), (255, 255, 255))
-
-        # 计算居中位置
-        x = (canvas_width - img.width) // 2
-        y = (canvas_height - img.height) // 2
-
-        # 粘贴图片到画布中央
-        canvas.paste(img, (x, y))
+        with Image.open(image_path) as img:
+            canvas = _render_canvas(img, fit_mode or config.IMAGE_FIT_MODE)
 
         # 保存处理后的图片
-        output_path = os.path.join(config.IMAGE_DIR, f"news_{news_index:03d}_photo_{photo_index}_processed.jpg")
-        canvas.save(output_path, quality=90)
+        if output_path is None:
+            output_path = os.path.join(config.IMAGE_DIR, f"news_{news_index:03d}_photo_{photo_index}_processed.jpg")
+        _save_canvas(canvas, output_path)
 
         return output_path
 
@@ -100,17 +372,200 @@ def process_news_image(image_path: str, news_index: int, photo_index: int) -> st
         return image_path  # 返回原始路径
 
 
-def download_images_for_news_list(news_list: List[NewsItem]) -> None:
+def download_images_for_news_list(
+    news_list: List[NewsItem],
+    max_workers: int = None,
+    per_host_limit: int = None,
+    deadline: float = None,
+    use_process_pool: bool = None,
+    on_news_done: Callable[[int, NewsItem], None] = None,
+) -> None:
     """
-    批量下载新闻列表的配图
+    并发下载新闻列表的配图
+
+    下载在线程池中进行，同一域名的并发连接数受限；每张图下载完成后立即交给进程池生成画布，
+    网络和图片处理两个阶段并行。超过总截止时间仍未完成的配图会被放弃。
+    结果按新闻和配图原有顺序写回 news.downloaded_images 和 news.image_hashes，与完成先后无关。
 
     Args:
         news_list: 新闻列表
+        max_workers: 最大并发数，默认使用 config.IMAGE_DOWNLOAD_WORKERS
+        per_host_limit: 每个域名的最大并发连接数，默认使用 config.IMAGE_PER_HOST_LIMIT
+        deadline: 总截止时间（秒），默认使用 config.IMAGE_DOWNLOAD_DEADLINE
+        use_process_pool: 是否在进程池中处理图片，默认使用 config.IMAGE_PROCESS_IN_POOL
+        on_news_done: 一条新闻的配图全部完成（成功、失败或超时）并写回后立即回调
+            on_news_done(索引, 新闻)，每条新闻回调一次，在调用线程中执行
     """
-    for i, news in enumerate(news_list):
-        if news.image_urls:
-            print(f"  📥 下载新闻配图 ({i+1}/{len(news_list)}): {news.title[:20]}...")
-            downloaded = download_and_process_images(news, i)
-            news.downloaded_images = downloaded
-            if downloaded:
-                print(f"  ✅ 已下载 {len(downloaded)} 张配图")
+    if use_process_pool is None:
+        use_process_pool = config.IMAGE_PROCESS_IN_POOL
+    fit_mode = config.IMAGE_FIT_MODE
+    if max_workers is None:
+        max_workers = config.IMAGE_DOWNLOAD_WORKERS
+    if per_host_limit is None:
+        per_host_limit = config.IMAGE_PER_HOST_LIMIT
+    if deadline is None:
+        deadline = config.IMAGE_DOWNLOAD_DEADLINE
+
+    jobs = [
+        (news_index, photo_index, url)
+        for news_index, news in enumerate(news_list)
+        for photo_index, url in enumerate(news.image_urls[:2])  # 最多2张
+        if url
+    ]
+    remaining = Counter(news_index for news_index, _, _ in jobs)  # 每条新闻尚未完成的配图数
+    for news_index, news in enumerate(news_list):
+        news.downloaded_images = []
+        news.image_hashes = []
+        if on_news_done and news_index not in remaining:
+            on_news_done(news_index, news)
+    if not jobs:
+        return
+
+    os.makedirs(config.IMAGE_DIR, exist_ok=True)
+    print(f"  📥 并发下载 {len(jobs)} 张新闻配图...")
+
+    end_time = time.monotonic() + deadline
+    host_limits: Dict[str, threading.BoundedSemaphore] = {}
+    host_limits_lock = threading.Lock()
+
+    def host_semaphore(url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            if host not in host_limits:
+                host_limits[host] = threading.BoundedSemaphore(per_host_limit)
+            return host_limits[host]
+
+    cache = get_image_cache()
+
+    def fetch(news_index: int, photo_index: int, url: str) -> Tuple[str, Optional[bytes]]:
+        # 缓存命中时不占用同域名连接
+        path = _cached_image(url, cache, fit_mode)
+        if path:
+            return path, None
+        semaphore = host_semaphore(url)
+        if not semaphore.acquire(timeout=max(0.0, end_time - time.monotonic())):
+            raise TimeoutError("等待同域名连接超时")
+        try:
+            return _fetch_image(url, cache, fit_mode)
+        finally:
+            semaphore.release()
+
+    results: Dict[tuple, tuple] = {}
+    downloads: Dict[Future, tuple] = {}
+    processing: Dict[Future, tuple] = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+
+    def submit_processing(data: bytes, output_path: str) -> Future:
+        if use_process_pool:
+            try:
+                return _get_process_pool().submit(_process_image_job, data, output_path, fit_mode)
+            except BrokenProcessPool as e:
+                _reset_process_pool(e)
+        return executor.submit(_process_image_job, data, output_path, fit_mode)
+
+    def finish(job: tuple, result: tuple = None) -> None:
+        """一张配图结束；该新闻的配图全部结束时按原有顺序写回并回调"""
+        news_index, photo_index, _ = job
+        if result:
+            results[(news_index, photo_index)] = result
+        remaining[news_index] -= 1
+        if remaining[news_index]:
+            return
+        news = news_list[news_index]
+        ordered = [
+            results[(news_index, i)]
+            for i in range(len(news.image_urls[:2]))
+            if (news_index, i) in results
+        ]
+        news.downloaded_images = [path for path, _ in ordered]
+        news.image_hashes = [image_hash for _, image_hash in ordered]
+        if on_news_done:
+            on_news_done(news_index, news)
+
+    def process_here(job: tuple, data: bytes, output_path: str) -> None:
+        """在当前线程处理图片"""
+        try:
+            path, image_hash = _process_image_job(data, output_path, fit_mode)
+        except Exception as e:
+            print(f"  ⚠️ 处理图片失败 ({job[2]}): {e}")
+            finish(job)
+            return
+        cache.update_meta(job[2], {"dhash": image_hash})
+        finish(job, (path, image_hash))
+
+    def collect_download(future: Future, job: tuple, inline: bool = False) -> Optional[Future]:
+        """取出下载结果，需要处理时返回处理任务"""
+        url = job[2]
+        try:
+            path, data = future.result()
+        except Exception as e:
+            print(f"  ⚠️ 下载图片失败 ({url}): {e}")
+            finish(job)
+            return None
+        if data is None:
+            finish(job, (path, _image_hash(url, cache)))
+        elif inline:
+            # 已到截止时间，不再排队等待处理任务，直接在当前线程处理
+            process_here(job, data, path)
+        else:
+            task = submit_processing(data, path)
+            processing[task] = job
+            return task
+        return None
+
+    def collect_processing(future: Future, job: tuple) -> None:
+        url = job[2]
+        try:
+            path, image_hash = future.result()
+        except BrokenProcessPool as e:
+            _reset_process_pool(e)
+            try:
+                data = cache.read_raw(url)
+            except Exception as e:
+                print(f"  ⚠️ 处理图片失败 ({url}): {e}")
+                finish(job)
+                return
+            process_here(job, data, cache.processed_path(url, _processed_variant(fit_mode)))
+            return
+        except Exception as e:
+            print(f"  ⚠️ 处理图片失败 ({url}): {e}")
+            finish(job)
+            return
+        cache.update_meta(url, {"dhash": image_hash})
+        finish(job, (path, image_hash))
+
+    try:
+        # 下载完成一张就立即提交处理，两个阶段流水线并行，都受总截止时间限制
+        downloads.update((executor.submit(fetch, *job), job) for job in jobs)
+        pending = set(downloads)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end_time - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future in downloads:
+                    task = collect_download(future, downloads[future])
+                    if task:
+                        pending.add(task)
+                else:
+                    collect_processing(future, processing[future])
+
+        # 截止时已完成但尚未取出的任务照常使用结果，其余放弃
+        for future in pending:
+            if future in downloads:
+                if future.done():
+                    collect_download(future, downloads[future], inline=True)
+                    continue
+                print(f"  ⚠️ 下载图片超时 ({downloads[future][2]})")
+                finish(downloads[future])
+            else:
+                if future.done():
+                    collect_processing(future, processing[future])
+                    continue
+                print(f"  ⚠️ 处理图片超时 ({processing[future][2]})")
+                finish(processing[future])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"  ✅ 已下载 {len(results)}/{len(jobs)} 张配图")
+    cache.evict()
@@ -0,0 +1,84 @@
+"""新闻配图感知哈希：用 dHash 找出不同新闻之间重复使用的同一张图片"""
+
+import io
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from models.news import NewsItem
+import config
+
+HASH_SIZE = 8  # 8x8 位 = 64 位哈希
+
+
+def dhash(img: Image.Image) -> str:
+    """
+    计算图片的 64 位差值哈希（dHash）
+
+    缩小为 9x8 灰度图后比较每行相邻像素的明暗，对缩放、压缩和轻微调色不敏感。
+
+    Args:
+        img: PIL 图片（JPEG 会以 draft 模式低分辨率解码）
+
+    Returns:
+        16 位十六进制字符串
+    """
+    if img.format == 'JPEG':
+        img.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+    gray = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits.ravel()).tobytes().hex()
+
+
+def dhash_bytes(data: bytes) -> str:
+    """计算图片字节数据的 dHash"""
+    with Image.open(io.BytesIO(data)) as img:
+        return dhash(img)
+
+
+def find_duplicate_images(
+    news_list: List[NewsItem],
+    max_distance: int = None,
+) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """
+    在整个新闻列表中查找重复的配图
+
+    按新闻和配图顺序，第一次出现的图片保留，之后与它汉明距离不超过 max_distance 的图片视为重复。
+
+    Args:
+        news_list: 新闻列表（使用 news.image_hashes，与 downloaded_images 一一对应）
+        max_distance: 允许的最大汉明距离（0-64），默认使用 config.IMAGE_DEDUP_DISTANCE
+
+    Returns:
+        {(新闻索引, 配图索引): 保留的 (新闻索引, 配图索引)}
+    """
+    if max_distance is None:
+        max_distance = config.IMAGE_DEDUP_DISTANCE
+
+    positions = []
+    hashes = []
+    for news_index, news in enumerate(news_list):
+        for image_index, image_hash in enumerate(news.image_hashes):
+            if image_hash:
+                positions.append((news_index, image_index))
+                hashes.append(int(image_hash, 16))
+
+    if len(hashes) < 2:
+        return {}
+
+    # 两两异或后统计置位数，得到汉明距离矩阵
+    values = np.array(hashes, dtype=np.uint64)
+    xor = values[:, None] ^ values[None, :]
+    bytes_view = xor.view(np.uint8).reshape(len(hashes), len(hashes), 8)
+    distances = np.unpackbits(bytes_view, axis=-1).sum(axis=-1)
+    close = distances <= max_distance
+
+    duplicates = {}
+    for j in range(1, len(positions)):
+        matches = np.nonzero(close[j, :j])[0]
+        if len(matches):
+            original = positions[int(matches[0])]
+            duplicates[positions[j]] = duplicates.get(original, original)
+    return duplicates
@@ -0,0 +1,105 @@
+"""增量 JSON 解析：流式接收模型输出时，每个字段一完整就交给调用方"""
+
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+Path = Tuple[Any, ...]
+
+
+class JSONStreamParser:
+    """
+    增量 JSON 解析器
+
+    分段喂入文本，每当一个字符串、对象或数组完整时回调 on_value(path, value)。
+    path 是从根到该值的键/索引元组，例如 ("card_points", 2) 表示 card_points 的第 3 项；
+    根对象完整时 path 为 ()。数字、布尔值和 null 不单独回调，只包含在上层容器中。
+    第一个 { 或 [ 之前的内容（如 markdown 代码块标记）会被忽略，root_text() 返回根值本身的文本。
+    """
+
+    def __init__(self, on_value: Callable[[Path, Any], None]):
+        self.on_value = on_value
+        self.done = False
+        self._root_span: Tuple[int, int] = None
+        self._chars: List[str] = []
+        self._frames: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+
+    def text(self) -> str:
+        """已接收的全部文本"""
+        return "".join(self._chars)
+
+    def root_text(self) -> str:
+        """根值的文本（不含前后的代码块标记等内容）；根值尚未完整时返回全部文本"""
+        if self._root_span is None:
+            return self.text()
+        start, end = self._root_span
+        return "".join(self._chars[start:end + 1])
+
+    def feed(self, text: str) -> None:
+        """喂入一段文本"""
+        for ch in text:
+            pos = len(self._chars)
+            self._chars.append(ch)
+            if self.done:
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(pos)
+                continue
+
+            if not self._frames:
+                if ch in '{[':
+                    self._open(ch, pos)
+                continue
+
+            frame = self._frames[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+                self._string_is_key = frame["type"] == '{' and frame["expect_key"]
+            elif ch in '{[':
+                self._open(ch, pos)
+            elif ch in '}]':
+                self._frames.pop()
+                self._emit(frame["start"], pos)
+                if not self._frames:
+                    self._root_span = (frame["start"], pos)
+                    self.done = True
+            elif ch == ':':
+                frame["expect_key"] = False
+            elif ch == ',':
+                if frame["type"] == '{':
+                    frame["expect_key"] = True
+                else:
+                    frame["index"] += 1
+
+    def _open(self, ch: str, pos: int) -> None:
+        self._frames.append({"type": ch, "key": None, "index": 0, "expect_key": ch == '{', "start": pos})
+
+    def _path(self) -> Path:
+        return tuple(f["key"] if f["type"] == '{' else f["index"] for f in self._frames)
+
+    def _close_string(self, pos: int) -> None:
+        if self._string_is_key:
+            try:
+                self._frames[-1]["key"] = json.loads("".join(self._chars[self._string_start:pos + 1]))
+            except ValueError:
+                self._frames[-1]["key"] = None
+            return
+        self._emit(self._string_start, pos)
+
+    def _emit(self, start: int, end: int) -> None:
+        try:
+            value = json.loads("".join(self._chars[start:end + 1]))
+        except ValueError:
+            return  # 格式有误的片段不回调，由调用方对完整文本做最终校验
+        self.on_value(self._path(), value)
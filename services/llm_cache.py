@@ -0,0 +1,144 @@
+"""AI 文案缓存（SQLite）：相同模型、提示词版本和新闻内容的生成结果直接复用"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+from models.news import NewsItem
+import config
+
+
+def make_cache_key(model: str, base_url: str, prompt_version: str, news: NewsItem) -> str:
+    """
+    计算缓存 key：模型、接口地址、提示词版本和新闻标题/正文/来源（以及抓取的原文正文）共同决定
+
+    Args:
+        model: 模型名称
+        base_url: API 地址
+        prompt_version: 提示词模板版本，修改提示词时需同步修改
+        news: 新闻对象
+
+    Returns:
+        十六进制字符串
+    """
+    parts = [model, base_url, prompt_version, news.title, news.raw_content, news.source]
+    if news.full_content:
+        parts.append(news.full_content)
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """AI 生成结果缓存：超过有效期的记录视为未命中，超过条数上限时淘汰最久未使用的记录"""
+
+    def __init__(self, db_path: str = None, ttl: float = None, max_rows: int = None):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 数据库路径，默认使用 config.LLM_CACHE_PATH
+            ttl: 有效期（秒），默认使用 config.LLM_CACHE_TTL
+            max_rows: 最多保留的记录数，默认使用 config.LLM_CACHE_MAX_ROWS
+        """
+        self.db_path = db_path or config.LLM_CACHE_PATH
+        self.ttl = config.LLM_CACHE_TTL if ttl is None else ttl
+        self.max_rows = config.LLM_CACHE_MAX_ROWS if max_rows is None else max_rows
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每次操作使用独立连接，可在任意线程中调用"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL DEFAULT '',
+                        result TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        读取缓存结果
+
+        Returns:
+            生成结果（card_points 为字典列表），未命中或已过期时返回 None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT result FROM responses WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put(self, key: str, result: Dict, model: str = "") -> None:
+        """
+        保存生成结果，并清理过期和超出条数上限的记录
+
+        Args:
+            key: 缓存 key
+            result: 可 JSON 序列化的生成结果
+            model: 模型名称（仅用于排查）
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, result, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, json.dumps(result, ensure_ascii=False), now, now),
+                )
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        """缓存记录数"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        finally:
+            conn.close()
+
+
+_default_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """获取全局默认的 AI 文案缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
@@ -0,0 +1,269 @@
+"""
+共享的 AI 接口客户端
+
+所有文案生成共用一个 OpenAI 兼容客户端：
+- 底层 httpx 连接池复用 keep-alive 连接
+- 令牌桶同时限制每分钟请求数（RPM）和每分钟 token 数（TPM）
+- 遇到限流、超时、连接错误和服务端错误时带随机抖动的指数退避重试
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+import config
+
+# 可重试的错误类型（APITimeoutError 是 APIConnectionError 的子类，这里写出便于阅读）
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# 未指定 max_tokens 时为回复预留的 token 数
+_DEFAULT_COMPLETION_TOKENS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数（中文约 1 字 1 token，其他字符约 4 个 1 token）
+
+    只用于限流预估，请求完成后会按接口返回的实际用量修正。
+    """
+    cjk = sum(1 for ch in text if ch >= '⺀')
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+class TokenBucket:
+    """线程安全的令牌桶：容量为每分钟额度，按时间匀速补充"""
+
+    def __init__(self, per_minute: float):
+        """
+        Args:
+            per_minute: 每分钟额度，0 表示不限制
+        """
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1, timeout: float = None) -> bool:
+        """
+        取出额度，不足时等待
+
+        Args:
+            amount: 需要的额度（超过容量时按容量计算，避免永远等不到）
+            timeout: 最长等待时间（秒），默认一直等待
+
+        Returns:
+            是否成功取出
+        """
+        if self.capacity <= 0:
+            return True
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait_seconds = (amount - self.tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait_seconds = min(wait_seconds, remaining)
+                self._cond.wait(wait_seconds)
+
+    def adjust(self, delta: float) -> None:
+        """按实际用量修正额度（正数退还，负数追加扣除，允许暂时为负）"""
+        if self.capacity <= 0:
+            return
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+            self._cond.notify_all()
+
+
+class LLMClient:
+    """带连接池、限流和重试的 AI 接口客户端，可在多个线程中共享"""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        model: str = None,
+        rpm: int = None,
+        tpm: int = None,
+        max_retries: int = None,
+        max_connections: int = None,
+        openai_client: OpenAI = None,
+    ):
+        """
+        初始化客户端
+
+        Args:
+            api_key: API Key，默认使用 config.AI_API_KEY
+            base_url: API 地址，默认使用 config.AI_BASE_URL
+            model: 默认模型，默认使用 config.AI_MODEL
+            rpm: 每分钟最多请求数，默认使用 config.AI_RPM_LIMIT（0 表示不限制）
+            tpm: 每分钟最多 token 数，默认使用 config.AI_TPM_LIMIT（0 表示不限制）
+            max_retries: 最多重试次数，默认使用 config.AI_MAX_RETRIES
+            max_connections: 连接池大小，默认使用 config.AI_MAX_CONNECTIONS
+            openai_client: 已创建的 OpenAI 客户端（用于测试），默认新建
+        """
+        self.api_key = config.AI_API_KEY if api_key is None else api_key
+        self.base_url = config.AI_BASE_URL if base_url is None else base_url
+        self.model = model or config.AI_MODEL
+        self.max_retries = config.AI_MAX_RETRIES if max_retries is None else max_retries
+        self.request_bucket = TokenBucket(config.AI_RPM_LIMIT if rpm is None else rpm)
+        self.token_bucket = TokenBucket(config.AI_TPM_LIMIT if tpm is None else tpm)
+
+        if openai_client is None:
+            max_connections = max_connections or config.AI_MAX_CONNECTIONS
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+            # 重试由本类统一处理，关闭 SDK 自带的重试
+            openai_client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0,
+            )
+        self.client = openai_client
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """退避时间：优先使用服务端的 Retry-After，否则按指数退避加全抖动"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(60.0, float(retry_after)) + random.uniform(0, 1)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(30.0, 1.0 * (2 ** attempt)))
+
+    def _create(self, messages: List[Dict[str, str]], estimated: int, timeout: float = None, **kwargs):
+        """
+        按限流等待额度后发起请求，可重试的错误自动重试
+
+        指定 timeout 时它是整个调用（含限流等待和重试退避）的总时限，每次请求只使用剩余的时间；
+        未指定时不向接口传 timeout，沿用 httpx 客户端自身的超时设置。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> float:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"AI 请求超过 {timeout:.0f} 秒时限")
+            return left
+
+        attempt = 0
+        while True:
+            if deadline is None:
+                self.request_bucket.acquire(1)
+                self.token_bucket.acquire(estimated)
+            elif not (self.request_bucket.acquire(1, timeout=remaining())
+                      and self.token_bucket.acquire(estimated, timeout=remaining())):
+                raise TimeoutError("等待限流额度超时")
+            if deadline is not None:
+                kwargs["timeout"] = remaining()
+            try:
+                return self.client.chat.completions.create(messages=messages, **kwargs)
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                if deadline is not None and delay >= deadline - time.monotonic():
+                    raise  # 退避后已没有剩余时间，不再重试
+                attempt += 1
+                print(f"AI 请求失败（{type(e).__name__}），{delay:.1f} 秒后第 {attempt} 次重试")
+                time.sleep(delay)
+
+    def _estimate(self, messages: List[Dict[str, str]], kwargs: Dict) -> int:
+        estimated = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        return estimated + (kwargs.get("max_tokens") or _DEFAULT_COMPLETION_TOKENS)
+
+    def chat(self, messages: List[Dict[str, str]], timeout: float = None, **kwargs):
+        """
+        调用 chat.completions.create，按限流等待额度，失败时自动重试
+
+        Args:
+            messages: 消息列表
+            timeout: 总时限（秒，含限流等待和重试退避），默认沿用客户端自身的超时
+            **kwargs: 其他参数（model、response_format、max_tokens 等）
+
+        Returns:
+            接口原始响应
+        """
+        kwargs.setdefault("model", self.model)
+        estimated = self._estimate(messages, kwargs)
+        response = self._create(messages, estimated, timeout=timeout, **kwargs)
+
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        if isinstance(total_tokens, int):
+            self.token_bucket.adjust(estimated - total_tokens)
+        return response
+
+    def chat_stream(self, messages: List[Dict[str, str]], timeout: float = None, **kwargs) -> Iterator[str]:
+        """
+        以流式方式调用 chat.completions.create，逐段返回生成的文本
+
+        限流和重试只作用于建立请求阶段；开始接收内容后出错直接抛出，由调用方决定如何回退。
+
+        Args:
+            messages: 消息列表
+            timeout: 总时限（秒，含限流等待和重试退避），默认沿用客户端自身的超时
+            **kwargs: 其他参数（model、response_format、max_tokens 等）
+
+        Yields:
+            文本片段
+        """
+        kwargs.setdefault("model", self.model)
+        stream = self._create(messages, self._estimate(messages, kwargs), timeout=timeout, stream=True, **kwargs)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+
+_default_client: Optional[LLMClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """获取共享的客户端；API Key 或地址修改后自动重建"""
+    global _default_client
+    with _default_client_lock:
+        if (
+            _default_client is None
+            or _default_client.api_key != config.AI_API_KEY
+            or _default_client.base_url != config.AI_BASE_URL
+        ):
+            _default_client = LLMClient()
+        return _default_client
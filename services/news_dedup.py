@@ -0,0 +1,162 @@
+"""跨来源新闻去重：基于 SimHash 指纹和分段索引查找近似重复的新闻"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.news import NewsItem
+from services.text_utils import clean_html_tags
+import config
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+_BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def _shingles(text: str) -> List[str]:
+    """将文本切分为字符 n-gram（对中文和英文都适用）"""
+    text = re.sub(r'[\W_]+', '', text.lower())
+    if len(text) <= SHINGLE_SIZE:
+        return [text] if text else []
+    return [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+
+
+def simhash(text: str) -> int:
+    """
+    计算文本的 64 位 SimHash 指纹
+
+    Args:
+        text: 纯文本
+
+    Returns:
+        指纹整数，空文本返回 0
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return 0
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big') for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # 每个 shingle 对每一位投票：1 记 +1，0 记 -1
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+
+    fingerprint = 0
+    for i in np.nonzero(votes > 0)[0]:
+        fingerprint |= 1 << int(i)
+    return fingerprint
+
+
+def news_fingerprint(news: NewsItem) -> int:
+    """新闻指纹：标题（加权两次）+ 清理后的正文"""
+    title = clean_html_tags(news.title)
+    content = clean_html_tags(news.raw_content)
+    return simhash(f"{title} {title} {content}")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return (a ^ b).bit_count()
+
+
+def threshold_to_distance(threshold: float) -> int:
+    """将相似度阈值（0-1）换算为允许的最大汉明距离"""
+    return max(0, int((1.0 - threshold) * FINGERPRINT_BITS))
+
+
+class SimHashIndex:
+    """
+    SimHash 分段索引
+
+    将 64 位指纹切成 max_distance + 1 段，按抽屉原理，汉明距离不超过 max_distance 的两个指纹
+    至少有一段完全相同。查询只需比较同段桶内的候选，无需遍历全部指纹。
+    """
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self._bands = [
+            (i * width, FINGERPRINT_BITS if i == bands - 1 else (i + 1) * width)
+            for i in range(bands)
+        ]
+        self._buckets: List[Dict[int, List[Tuple[int, object]]]] = [{} for _ in self._bands]
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> start) & ((1 << (end - start)) - 1) for start, end in self._bands]
+
+    def add(self, fingerprint: int, key: object) -> None:
+        """加入指纹"""
+        for bucket, band_key in zip(self._buckets, self._band_keys(fingerprint)):
+            bucket.setdefault(band_key, []).append((fingerprint, key))
+
+    def query(self, fingerprint: int) -> Optional[Tuple[object, int]]:
+        """
+        查找最相近的已有指纹
+
+        Returns:
+            (key, 汉明距离)，没有满足阈值的指纹时返回 None
+        """
+        best = None
+        for bucket, band_key in zip(self._buckets, self._band_keys(fingerprint)):
+            for candidate, key in bucket.get(band_key, ()):
+                distance = hamming_distance(fingerprint, candidate)
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+        return best
+
+
+def deduplicate_news(news_list: List[NewsItem], threshold: float = None, merge: bool = True) -> List[NewsItem]:
+    """
+    检测跨来源的近似重复新闻
+
+    列表中靠前的新闻作为保留项（fetch_multiple_sources 的结果最新的在前）。
+
+    Args:
+        news_list: 新闻列表
+        threshold: 相似度阈值（0-1），默认使用 config.NEWS_DEDUP_THRESHOLD
+        merge: True 时合并重复项（配图并入保留项）并从结果中移除；
+               False 时只在重复项的 duplicate_of 上标记保留项的 URL
+
+    Returns:
+        去重后的新闻列表（merge=False 时为原列表）
+    """
+    if threshold is None:
+        threshold = config.NEWS_DEDUP_THRESHOLD
+
+    index = SimHashIndex(max_distance=threshold_to_distance(threshold))
+    result = []
+
+    for news in news_list:
+        fingerprint = news_fingerprint(news)
+        match = index.query(fingerprint) if fingerprint else None
+
+        if match is None:
+            if fingerprint:
+                index.add(fingerprint, news)
+            result.append(news)
+            continue
+
+        canonical, distance = match
+        news.duplicate_of = canonical.url
+        print(f"  发现重复新闻（相似度 {1 - distance / FINGERPRINT_BITS:.2f}）: {news.title[:20]} ({news.source}) ≈ {canonical.source}")
+
+        if merge:
+            # 合并配图，保留更完整的摘要
+            for image_url in news.image_urls:
+                if len(canonical.image_urls) >= 2:
+                    break
+                if image_url not in canonical.image_urls:
+                    canonical.image_urls.append(image_url)
+            if len(news.raw_content) > len(canonical.raw_content):
+                canonical.raw_content = news.raw_content
+        else:
+            result.append(news)
+
+    return result
@@ -1,10 +1,268 @@
+import multiprocessing
+import threading
+import time
 import feedparser
-from typing import List, Dict
+import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Iterator, List, Dict, Optional, Tuple
 from models.news import NewsItem
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from services.feed_cache import FeedCache, get_feed_cache
+from services.feed_stream_parser import FeedStreamError, RecordingStream, parse_feed_stream
+from services.history_store import HistoryStore
+import config
 
 
-def fetch_single_source(url: str, source_name: str, count: int = 5) -> List[NewsItem]:
+@dataclass
+class SourceStatus:
+    """单个 RSS 源的获取状态"""
+    name: str
+    url: str
+    status: str = "pending"  # ok / empty / timeout / error / pending
+    count: int = 0  # 获取到的新闻数量
+    elapsed: float = 0.0  # 耗时（秒）
+    error: str = ""
+
+
+def _download_feed(url: str, timeout: float, headers: Dict[str, str] = None) -> requests.Response:
+    """以流式方式请求 RSS 源（支持条件请求头），响应体由调用方按需读取"""
+    request_headers = {'User-Agent': config.RSS_USER_AGENT}
+    if headers:
+        request_headers.update(headers)
+
+    response = requests.get(url, timeout=timeout, headers=request_headers, stream=True)
+    response.raise_for_status()
+    return response
+
+
+def _entry_to_record(entry) -> Dict:
+    """将 feedparser 条目转换为可缓存的精简记录"""
+    # 提取发布时间
+    published = entry.get("published", "")
+    if not published and hasattr(entry, "published_parsed"):
+        try:
+            published = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc).isoformat()
+        except:
+            published = datetime.now().isoformat()
+
+    # 提取内容
+    raw_content = entry.get("summary", entry.get("description", ""))
+
+    # 提取图片URL（最多2张）
+    image_urls = []
+
+    # 方法1: media_content (Media RSS)
+    if hasattr(entry, 'media_content'):
+        for media in entry.media_content[:2]:
+            if media.get('medium') == 'image' or media.get('type', '').startswith('image/'):
+                image_urls.append(media.get('url'))
+
+    # 方法2: enclosures (附件)
+    if len(image_urls) < 2 and hasattr(entry, 'enclosures'):
+        for enc in entry.enclosures:
+            if enc.get('type', '').startswith('image/'):
+                image_urls.append(enc.get('href', ''))
+                if len(image_urls) >= 2:
+                    break
+
+    # 方法3: media_thumbnail
+    if len(image_urls) < 2 and hasattr(entry, 'media_thumbnail'):
+        for thumb in entry.media_thumbnail[:2-len(image_urls)]:
+            image_urls.append(thumb.get('url'))
+
+    return {
+        "title": entry.get("title", "无标题"),
+        "url": entry.get("link", ""),
+        "published": published,
+        "raw_content": raw_content[:config.RSS_CONTENT_MAX_CHARS],  # 限制长度
+        "image_urls": image_urls[:2],  # 最多保留2张
+    }
+
+
+def parse_published(published: str) -> float:
+    """
+    将发布时间字符串统一解析为 Unix 时间戳
+
+    支持 RFC 822（RSS pubDate）和 ISO 8601（Atom）两种格式，未带时区的按本地时间处理。
+
+    Args:
+        published: 发布时间字符串
+
+    Returns:
+        时间戳，无法解析时返回 0
+    """
+    published = (published or "").strip()
+    if not published:
+        return 0.0
+
+    try:
+        return datetime.fromisoformat(published).timestamp()
+    except ValueError:
+        pass
+
+    try:
+        return parsedate_to_datetime(published).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return 0.0
+
+
+def _record_to_news(record: Dict, source_name: str) -> NewsItem:
+    """由条目记录创建新闻对象"""
+    return NewsItem(
+        title=record["title"],
+        source=source_name,
+        url=record["url"],
+        published=record["published"],
+        published_ts=parse_published(record["published"]),
+        raw_content=record["raw_content"],
+        selected=False,
+        image_urls=list(record["image_urls"]),
+    )
+
+
+def _fetch_source(
+    url: str,
+    source_name: str,
+    count: int,
+    timeout: float,
+    use_cache: bool = True,
+    parse_in_process: bool = False,
+    cache: FeedCache = None,
+) -> List[NewsItem]:
+    """
+    获取并解析单个 RSS 源，失败时抛出异常
+
+    启用缓存时：TTL 内直接返回缓存；过期后发起条件请求，304 时复用缓存条目而不重新解析。
+    parse_in_process 为 True 时，当前线程只负责下载，解析交给进程池。
+    cache 为 None 时使用全局 RSS 缓存。
+    """
+    if use_cache:
+        cache = cache or get_feed_cache()
+    else:
+        cache = None
+    cached = cache.get(url) if cache else None
+    headers = {}
+
+    if cached and cache.covers(cached, count):
+        if cache.is_fresh(cached):
+            return [_record_to_news(r, source_name) for r in cached["records"][:count]]
+        headers = cache.conditional_headers(cached)
+
+    response = _download_feed(url, timeout, headers)
+
+    try:
+        if response.status_code == 304 and cached:
+            cache.touch(url, cached)
+            return [_record_to_news(r, source_name) for r in cached["records"][:count]]
+
+        if parse_in_process:
+            records, truncated = _parse_in_process(response.content, count, response.headers.get("Content-Type", ""))
+        else:
+            records, truncated = _parse_response(response, count)
+    finally:
+        # 提前停止读取时连接不可复用，直接关闭
+        response.close()
+
+    if cache and records:
+        cache.put(
+            url,
+            records,
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+            truncated=truncated,
+        )
+
+    return [_record_to_news(r, source_name) for r in records]
+
+
+def _parse_response(response: requests.Response, count: int) -> Tuple[List[Dict], bool]:
+    """
+    解析 RSS 响应为条目记录
+
+    优先使用流式解析，读够 count 条即停止读取；文档格式异常时读取剩余内容交给 feedparser。
+
+    Returns:
+        (条目记录列表, 是否只截取了源的一部分)
+    """
+    stream = RecordingStream(response.iter_content(chunk_size=16 * 1024))
+
+    if config.RSS_STREAM_PARSE:
+        try:
+            return parse_feed_stream(stream, count)
+        except FeedStreamError as e:
+            print(f"  流式解析失败，回退到 feedparser: {e}")
+
+    return _parse_with_feedparser(stream.read_all(), count, response.headers.get("Content-Type", ""))
+
+
+def _parse_with_feedparser(data: bytes, count: int, content_type: str = "") -> Tuple[List[Dict], bool]:
+    """使用 feedparser 解析完整文档"""
+    feed = feedparser.parse(data, response_headers={"content-type": content_type})
+    records = [_entry_to_record(entry) for entry in feed.entries[:count]]
+    return records, len(feed.entries) > count
+
+
+def parse_feed_bytes(data: bytes, count: int, content_type: str = "") -> Tuple[List[Dict], bool]:
+    """
+    解析已下载的 RSS 文档为精简条目记录（可在子进程中运行）
+
+    Args:
+        data: 文档字节
+        count: 需要的条目数量
+        content_type: 响应的 Content-Type（用于 feedparser 判断编码）
+
+    Returns:
+        (条目记录列表, 是否只截取了源的一部分)
+    """
+    if config.RSS_STREAM_PARSE:
+        try:
+            return parse_feed_stream([data], count)
+        except FeedStreamError:
+            pass
+
+    return _parse_with_feedparser(data, count, content_type)
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """获取共享的解析进程池（使用 spawn，避免在多线程进程中 fork）"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=config.RSS_PARSE_PROCESSES or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _parse_in_process(data: bytes, count: int, content_type: str) -> Tuple[List[Dict], bool]:
+    """在进程池中解析文档，进程池不可用时回退到当前线程"""
+    global _process_pool
+    try:
+        return _get_process_pool().submit(parse_feed_bytes, data, count, content_type).result()
+    except BrokenProcessPool as e:
+        print(f"  解析进程池不可用，改为在当前线程解析: {e}")
+        with _process_pool_lock:
+            _process_pool = None
+        return parse_feed_bytes(data, count, content_type)
+
+
+def fetch_single_source(
+    url: str,
+    source_name: str,
+    count: int = 5,
+    timeout: float = None,
+    use_cache: bool = True,
+    raise_errors: bool = False,
+    cache: FeedCache = None,
+) -> List[NewsItem]:
     """
     从单个 RSS 源获取新闻
 
@@ -12,95 +270,260 @@ def fetch_single_source(url: str, source_name: str, count: int = 5) -> List[News
         url: RSS 源 URL
         source_name: 来源名称
         count: 获取数量
+        timeout: 请求超时（秒），默认使用 config.RSS_SOURCE_TIMEOUT
+        use_cache: 是否使用 RSS 缓存（TTL 内不发起请求，过期后发起条件请求）
+        raise_errors: 为 True 时获取失败直接抛出异常，而不是返回空列表
+        cache: 使用的 RSS 缓存，默认使用全局缓存
 
     Returns:
         新闻列表
     """
+    if timeout is None:
+        timeout = config.RSS_SOURCE_TIMEOUT
+
     news_list = []
 
     try:
-        feed = feedparser.parse(url)
+        news_list = _fetch_source(url, source_name, count, timeout, use_cache, cache=cache)
 
-        if not feed.entries:
+        if not news_list:
             print(f"警告: {source_name} 未获取到内容")
-            return news_list
-
-        for entry in feed.entries[:count]:
-            # 提取发布时间
-            published = entry.get("published", "")
-            if not published and hasattr(entry, "published_parsed"):
-                try:
-                    published = datetime(*entry.published_parsed[:6]).isoformat()
-                except:
-                    published = datetime.now().isoformat()
-
-            # 提取内容
-            raw_content = entry.get("summary", entry.get("description", ""))
-
-            # 提取图片URL（最多2张）
-            image_urls = []
-
-            # 方法1: media_content (Media RSS)
-            if hasattr(entry, 'media_content'):
-                for media in entry.media_content[:2]:
-                    if media.get('medium') == 'image' or media.get('type', '').startswith('image/'):
-                        image_urls.append(media.get('url'))
-
-            # 方法2: enclosures (附件)
-            if len(image_urls) < 2 and hasattr(entry, 'enclosures'):
-                for enc in entry.enclosures:
-                    if enc.get('type', '').startswith('image/'):
-                        image_urls.append(enc.get('href', ''))
-                        if len(image_urls) >= 2:
-                            break
-
-            # 方法3: media_thumbnail
-            if len(image_urls) < 2 and hasattr(entry, 'media_thumbnail'):
-                for thumb in entry.media_thumbnail[:2-len(image_urls)]:
-                    image_urls.append(thumb.get('url'))
-
-            news = NewsItem(
-                title=entry.get("title", "无标题"),
-                source=source_name,
-                url=entry.get("link", ""),
-                published=published,
-                raw_content=raw_content[:500],  # 限制长度
-                selected=False,
-                image_urls=image_urls[:2]  # 最多保留2张
-            )
-            news_list.append(news)
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"获取 {source_name} 失败: {e}")
 
     return news_list
 
 
-def fetch_multiple_sources(sources: List[Dict]) -> List[NewsItem]:
+def news_sort_key(news: NewsItem) -> float:
+    """新闻排序键（配合 reverse=True 使最新的在前，时间未知的排在最后）"""
+    return news.published_ts
+
+
+def filter_recent_news(
+    news_list: List[NewsItem],
+    max_age_hours: float = None,
+    per_source_quota: int = None,
+    now: float = None,
+) -> List[NewsItem]:
     """
-    从多个 RSS 源批量获取新闻
+    按时间窗口和来源配额过滤新闻，在任何 AI/语音/渲染工作之前丢弃过期条目
 
     Args:
-        sources: RSS 源配置列表
-                 [{"name": "36氪", "url": "...", "count": 5}, ...]
+        news_list: 新闻列表
+        max_age_hours: 只保留最近 N 小时内的新闻，默认使用 config.RSS_MAX_AGE_HOURS，0 表示不限制；
+                       发布时间未知的新闻会保留
+        per_source_quota: 每个来源最多保留的条数（优先保留最新的），默认使用 config.RSS_PER_SOURCE_QUOTA，0 表示不限制
+        now: 当前时间戳（用于测试）
 
     Returns:
-        所有新闻的合并列表（按时间排序）
+        过滤后的新闻列表（保持原有顺序）
     """
-    all_news = []
+    if max_age_hours is None:
+        max_age_hours = config.RSS_MAX_AGE_HOURS
+    if per_source_quota is None:
+        per_source_quota = config.RSS_PER_SOURCE_QUOTA
+    if now is None:
+        now = time.time()
+
+    result = news_list
+    if max_age_hours:
+        cutoff = now - max_age_hours * 3600
+        result = [news for news in result if not news.published_ts or news.published_ts >= cutoff]
+
+    if per_source_quota:
+        kept = set()
+        counts: Dict[str, int] = {}
+        for news in sorted(result, key=news_sort_key, reverse=True):
+            if counts.get(news.source, 0) < per_source_quota:
+                counts[news.source] = counts.get(news.source, 0) + 1
+                kept.add(id(news))
+        result = [news for news in result if id(news) in kept]
 
+    return result
+
+
+def _prepare_jobs(sources: List[Dict]) -> List[Tuple[SourceStatus, int]]:
+    """将源配置转换为 (状态, 获取数量) 任务列表，跳过没有 URL 的源"""
+    jobs = []
     for source in sources:
         url = source.get("url", "")
         name = source.get("name", "未知来源")
-        count = source.get("count", 5)
+        count = source.get("count", source.get("default_count", 5))
 
         if not url:
             continue
 
-        news_list = fetch_single_source(url, name, count)
+        jobs.append((SourceStatus(name=name, url=url), count))
+    return jobs
+
+
+def _iter_jobs(
+    jobs: List[Tuple[SourceStatus, int]],
+    max_workers: int = None,
+    source_timeout: float = None,
+    total_timeout: float = None,
+    use_cache: bool = True,
+    history: Optional[HistoryStore] = None,
+    skip_seen: bool = False,
+    max_age_hours: float = None,
+    per_source_quota: int = None,
+    parse_in_process: bool = None,
+) -> Iterator[Tuple[SourceStatus, List[NewsItem]]]:
+    """并发执行获取任务，按完成顺序逐个产出结果"""
+    if parse_in_process is None:
+        parse_in_process = config.RSS_PARSE_IN_PROCESS
+    if max_workers is None:
+        max_workers = config.RSS_FETCH_MAX_WORKERS
+    if source_timeout is None:
+        source_timeout = config.RSS_SOURCE_TIMEOUT
+    if total_timeout is None:
+        total_timeout = config.RSS_TOTAL_TIMEOUT
+
+    if not jobs:
+        return
+
+    def run(status: SourceStatus, count: int) -> List[NewsItem]:
+        start = time.monotonic()
+        try:
+            return _fetch_source(status.url, status.name, count, source_timeout, use_cache, parse_in_process)
+        finally:
+            status.elapsed = time.monotonic() - start
+
+    def collect(future, status: SourceStatus) -> List[NewsItem]:
+        try:
+            news_list = future.result()
+        except Exception as e:
+            status.status = "timeout" if isinstance(e, requests.Timeout) else "error"
+            status.error = str(e)
+            print(f"获取 {status.name} 失败: {e}")
+            return []
+
+        # 丢弃过期条目并应用来源配额
+        news_list = filter_recent_news(news_list, max_age_hours, per_source_quota)
+
+        # 标记/过滤已制作过的新闻
+        if history is not None and news_list:
+            if skip_seen:
+                news_list = history.filter_unseen(news_list)
+            else:
+                history.mark_seen(news_list)
+
+        status.count = len(news_list)
+        status.status = "ok" if news_list else "empty"
+        if not news_list:
+            print(f"警告: {status.name} 未获取到内容")
+        return news_list
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    futures = {executor.submit(run, status, count): status for status, count in jobs}
+    pending = dict(futures)
+    try:
+        try:
+            for future in as_completed(futures, timeout=total_timeout):
+                status = pending.pop(future)
+                yield status, collect(future, status)
+        except FuturesTimeoutError:
+            for future, status in list(pending.items()):
+                del pending[future]
+                if future.done():
+                    yield status, collect(future, status)
+                    continue
+                status.status = "timeout"
+                status.error = f"超过总截止时间 {total_timeout} 秒"
+                print(f"获取 {status.name} 超时")
+                yield status, []
+    finally:
+        # 不等待超时的源，直接返回已完成的部分结果
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_multiple_sources(sources: List[Dict], **kwargs) -> Iterator[Tuple[SourceStatus, List[NewsItem]]]:
+    """
+    并发获取多个 RSS 源，每个源完成后立即产出其结果，便于界面逐步填充
+
+    超过总截止时间仍未完成的源会以 timeout 状态和空列表产出。
+
+    Args:
+        sources: RSS 源配置列表
+                 [{"name": "36氪", "url": "...", "count": 5}, ...]
+        **kwargs: 并发参数，同 fetch_multiple_sources_with_status
+
+    Yields:
+        (源状态, 该源的新闻列表)，按完成顺序；单个源内保持 RSS 原有顺序
+    """
+    yield from _iter_jobs(_prepare_jobs(sources), **kwargs)
+
+
+def fetch_multiple_sources_with_status(
+    sources: List[Dict],
+    max_workers: int = None,
+    source_timeout: float = None,
+    total_timeout: float = None,
+    use_cache: bool = True,
+    history: Optional[HistoryStore] = None,
+    skip_seen: bool = False,
+    max_age_hours: float = None,
+    per_source_quota: int = None,
+    parse_in_process: bool = None,
+) -> Tuple[List[NewsItem], List[SourceStatus]]:
+    """
+    并发地从多个 RSS 源获取新闻，并返回每个源的获取状态
+
+    超过总截止时间仍未完成的源会被标记为 timeout，已完成源的结果照常返回。
+
+    Args:
+        sources: RSS 源配置列表
+                 [{"name": "36氪", "url": "...", "count": 5}, ...]
+        max_workers: 最大并发数，默认使用 config.RSS_FETCH_MAX_WORKERS
+        source_timeout: 单个源的请求超时（秒），默认使用 config.RSS_SOURCE_TIMEOUT
+        total_timeout: 总截止时间（秒），默认使用 config.RSS_TOTAL_TIMEOUT
+        use_cache: 是否使用 RSS 缓存
+        history: 已制作历史记录，提供时会批量标记新闻的 seen 字段
+        skip_seen: 为 True 时直接过滤掉已制作过的新闻（需提供 history）
+        max_age_hours: 只保留最近 N 小时内的新闻，默认使用 config.RSS_MAX_AGE_HOURS
+        per_source_quota: 每个来源最多保留的条数，默认使用 config.RSS_PER_SOURCE_QUOTA
+        parse_in_process: 是否在进程池中解析（下载仍在线程中进行），默认使用 config.RSS_PARSE_IN_PROCESS
+
+    Returns:
+        (新闻列表, 各源状态列表)，新闻按时间排序，状态顺序与 sources 一致
+    """
+    jobs = _prepare_jobs(sources)
+    all_news = []
+
+    for _, news_list in _iter_jobs(
+        jobs,
+        max_workers=max_workers,
+        source_timeout=source_timeout,
+        total_timeout=total_timeout,
+        use_cache=use_cache,
+        history=history,
+        skip_seen=skip_seen,
+        max_age_hours=max_age_hours,
+        per_source_quota=per_source_quota,
+        parse_in_process=parse_in_process,
+    ):
         all_news.extend(news_list)
 
     # 按发布时间排序（最新的在前）
-    all_news.sort(key=lambda x: x.published, reverse=True)
+    all_news.sort(key=news_sort_key, reverse=True)
+
+    return all_news, [status for status, _ in jobs]
+
+
+def fetch_multiple_sources(sources: List[Dict], **kwargs) -> List[NewsItem]:
+    """
+    从多个 RSS 源批量获取新闻
 
+    Args:
+        sources: RSS 源配置列表
+                 [{"name": "36氪", "url": "...", "count": 5}, ...]
+        **kwargs: 透传给 fetch_multiple_sources_with_status 的并发参数
+
+    Returns:
+        所有新闻的合并列表（按时间排序）
+    """
+    all_news, _ = fetch_multiple_sources_with_status(sources, **kwargs)
     return all_news
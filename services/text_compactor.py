@@ -0,0 +1,136 @@
+"""
+新闻正文压缩：发送给 AI 之前去掉样板文字，并按 token 预算抽取最有信息量的句子
+
+输入应为已经过 clean_html_tags 清理的纯文本。流程：
+1. 按中英文句末标点切分句子
+2. 去掉样板句（"阅读原文"、分享链接、版权声明等）、重复句和与标题相同的句子
+3. 超出预算时按位置、与标题的重合度和是否包含数字给句子打分，
+   选取得分高的句子，再按原文顺序拼接
+"""
+
+import re
+from typing import List
+
+from services.llm_client import estimate_tokens
+
+# 句子：到句末标点（连同后面的引号、括号）、英文句点加空白或换行为止
+_SENTENCE_RE = re.compile(r'[^\n]+?(?:[。！？!?；;…]+[”"’」』）)]*|\.(?=\s)|$)', re.M)
+
+# 整句丢弃的样板文字
+_BOILERPLATE_RE = re.compile(
+    r'阅读原文|点击(?:查看|阅读|这里|链接|下方)|(?:分享|转发)(?:到|至|给)|扫码|二维码|关注(?:我们|公众号)'
+    r'|版权(?:所有|声明)|未经(?:授权|许可)|转载请|免责声明|责任编辑|原文链接|本文链接|相关阅读|延伸阅读'
+    r'|read more|continue reading|appeared first on|click here|share (?:this|on)|subscribe'
+    r'|all rights reserved',
+    re.I,
+)
+
+# 句中去掉的链接
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+
+# 少于该字数（去掉标点后）的句子视为碎片
+_MIN_SENTENCE_CHARS = 4
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    切分句子
+
+    Args:
+        text: 纯文本
+
+    Returns:
+        句子列表（保留句末标点）
+    """
+    return [s.strip() for s in _SENTENCE_RE.findall(text or "") if s.strip()]
+
+
+def _normalize(sentence: str) -> str:
+    """去掉标点和空白，用于比较句子是否重复"""
+    return re.sub(r'[\W_]+', '', sentence).lower()
+
+
+def strip_boilerplate(sentences: List[str], title: str = "") -> List[str]:
+    """
+    去掉样板句、链接、碎片、重复句和与标题相同的句子
+
+    Args:
+        sentences: 句子列表
+        title: 新闻标题
+
+    Returns:
+        保留的句子（保持原顺序）
+    """
+    seen = {_normalize(title)} if title else set()
+    kept = []
+    for sentence in sentences:
+        if _BOILERPLATE_RE.search(sentence):
+            continue
+        sentence = re.sub(r'\s+', ' ', _URL_RE.sub('', sentence)).strip()
+        key = _normalize(sentence)
+        if len(key) < _MIN_SENTENCE_CHARS or key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return kept
+
+
+def _bigrams(text: str) -> set:
+    """字符二元组（中文）和单词（英文），用于计算与标题的重合度"""
+    text = text.lower()
+    chars = re.sub(r'[\W_a-z0-9]+', '', text)
+    return {chars[i:i + 2] for i in range(len(chars) - 1)} | set(re.findall(r'[a-z0-9]{2,}', text))
+
+
+def _join(sentences: List[str]) -> str:
+    """拼接句子：中文句子直接相连，英文句子后加空格"""
+    text = ""
+    for sentence in sentences:
+        if text and text[-1].isascii():
+            text += " "
+        text += sentence
+    return text
+
+
+def compact_text(text: str, token_budget: int, title: str = "") -> str:
+    """
+    压缩正文：去掉样板文字，超出预算时抽取得分最高的句子
+
+    Args:
+        text: 已清理 HTML 的纯文本
+        token_budget: token 预算（按 estimate_tokens 估算），0 表示只去除样板文字不做抽取
+        title: 新闻标题（用于去掉与标题重复的句子、给句子打分）
+
+    Returns:
+        压缩后的文本
+    """
+    sentences = strip_boilerplate(split_sentences(text), title)
+    compacted = _join(sentences)
+    if token_budget <= 0 or estimate_tokens(compacted) <= token_budget:
+        return compacted
+
+    title_grams = _bigrams(title)
+    scores = []
+    for i, sentence in enumerate(sentences):
+        score = 1.0 / (1 + i)  # 新闻导语信息量最大
+        if title_grams:
+            score += len(title_grams & _bigrams(sentence)) / len(title_grams)
+        if re.search(r'\d', sentence):
+            score += 0.2  # 数字通常是关键事实
+        scores.append(score)
+
+    chosen = []
+    used = 0
+    for i in sorted(range(len(sentences)), key=lambda k: (-scores[k], k)):
+        cost = estimate_tokens(sentences[i])
+        if used + cost <= token_budget:
+            chosen.append(i)
+            used += cost
+
+    if not chosen:
+        # 单句就超出预算时按比例截断得分最高的句子
+        best = max(range(len(sentences)), key=lambda k: (scores[k], -k))
+        sentence = sentences[best]
+        return sentence[:max(1, len(sentence) * token_budget // estimate_tokens(sentence))]
+
+    return _join([sentences[i] for i in sorted(chosen)])
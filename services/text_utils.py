@@ -0,0 +1,34 @@
+"""文本工具：不依赖 AI 接口的纯文本处理，供 RSS 获取、去重和历史记录等模块共用"""
+
+import re
+
+
+def clean_html_tags(text: str) -> str:
+    """
+    清理HTML标签和特殊符号
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        清理后的纯文本
+    """
+    if not text:
+        return ""
+
+    # 移除HTML标签
+    text = re.sub(r'<[^>]+>', '', text)
+
+    # 移除常见的HTML实体
+    text = text.replace('&nbsp;', ' ')
+    text = text.replace('&lt;', '<')
+    text = text.replace('&gt;', '>')
+    text = text.replace('&amp;', '&')
+    text = text.replace('&quot;', '"')
+    text = text.replace('&#39;', "'")
+
+    # 移除多余的空白
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+
+    return text
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""测试 AI 文案生成：并发、批量请求与文案缓存（替换 API 调用，无需真实 API）"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import config
+from models.news import CardPoint, NewsItem
+from services import ai_writer, llm_cache, llm_client
+from services.json_stream import JSONStreamParser
+from services.llm_cache import LLMCache
+from services.llm_client import LLMClient
+
+
+def make_news(i: int) -> NewsItem:
+    return NewsItem(
+        title=f"测试新闻 {i}",
+        source="测试源",
+        url=f"https://example.com/{i}",
+        published="2025-01-01",
+        raw_content="这是一条测试新闻的正文内容，用于验证批量生成。第二句话补充更多细节信息。",
+    )
+
+
+def fake_content(news: NewsItem) -> dict:
+    return {
+        "tts_script": f"播报：{news.title}",
+        "card_title": news.title,
+        "card_points": [CardPoint(subtitle="要点", content=f"{news.title} 的要点 {k}") for k in range(3)],
+    }
+
+
+def test_batch_concurrency_and_callbacks():
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+    delays = {0: 0.4, 1: 0.1, 2: 0.3, 3: 0.1, 4: 0.2, 5: 0.1}
+
+    def slow_generate(news, timeout=None):
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        time.sleep(delays[int(news.title.split()[-1])])
+        with lock:
+            active -= 1
+        return fake_content(news)
+
+    original = ai_writer.generate_news_content
+    ai_writer.generate_news_content = slow_generate
+    try:
+        news_list = [make_news(i) for i in range(6)]
+        delivered = []
+        callback_threads = set()
+
+        def on_item_done(index, news):
+            delivered.append(index)
+            callback_threads.add(threading.get_ident())
+            assert news.tts_script == f"播报：测试新闻 {index}"
+
+        start = time.monotonic()
+        ai_writer.batch_generate_news_content(
+            news_list, max_in_flight=3, item_timeout=5, on_item_done=on_item_done, batch_size=1,
+        )
+        elapsed = time.monotonic() - start
+
+        assert max_active <= 3
+        assert sorted(delivered) == list(range(6))
+        assert delivered[0] != 0  # 按完成顺序回调，慢的第一条不会阻塞其他条目
+        assert callback_threads == {threading.get_ident()}  # 回调在调用线程中执行
+        assert elapsed < sum(delays.values())
+        print(f"✓ 并发生成 6 条，最大并发 {max_active}，耗时 {elapsed:.2f}s，完成顺序 {delivered}")
+    finally:
+        ai_writer.generate_news_content = original
+
+
+def test_item_timeout_falls_back_to_mock():
+    def hanging_generate(news, timeout=None):
+        if news.title.endswith("1"):
+            time.sleep(3)
+        return fake_content(news)
+
+    original = ai_writer.generate_news_content
+    ai_writer.generate_news_content = hanging_generate
+    try:
+        news_list = [make_news(i) for i in range(3)]
+        start = time.monotonic()
+        ai_writer.batch_generate_news_content(news_list, max_in_flight=3, item_timeout=0.5, batch_size=1)
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 2, f"单条超时未生效: {elapsed:.2f}s"
+        assert news_list[0].tts_script.startswith("播报")
+        assert not news_list[1].tts_script.startswith("播报")  # 超时的条目使用备用方案
+        assert len(news_list[1].card_points) >= 3
+        print(f"✓ 超时条目回退备用方案，耗时 {elapsed:.2f}s")
+    finally:
+        ai_writer.generate_news_content = original
+
+
+def test_wait_for_starts_items_as_inputs_become_ready():
+    original = ai_writer.generate_news_content
+    ai_writer.generate_news_content = lambda news, timeout=None: fake_content(news)
+    try:
+        news_list = [make_news(i) for i in range(3)]
+        ready = [threading.Event() for _ in news_list]
+        ready[1].set()
+        ready[2].set()
+        threading.Timer(0.3, ready[0].set).start()  # 第 1 条的输入最晚准备好
+
+        delivered = []
+        ai_writer.batch_generate_news_content(
+            news_list, max_in_flight=1, item_timeout=0.2, batch_size=1,
+            on_item_done=lambda i, news: delivered.append(i), wait_for=lambda i: ready[i].wait(),
+        )
+        # 只有一个并发名额：等待中的第 1 条不占用名额，后面已就绪的条目先生成
+        assert delivered == [1, 2, 0]
+        assert news_list[0].tts_script == "播报：测试新闻 0"  # 等待时间不计入超时
+        print(f"✓ 输入准备好的条目先生成，完成顺序 {delivered}")
+    finally:
+        ai_writer.generate_news_content = original
+
+
+class FakeOpenAI:
+    """模拟 OpenAI 客户端，记录请求次数"""
+
+    calls = 0
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        FakeOpenAI.calls += 1
+        content = json.dumps({
+            "tts_script": "<p>模拟播报文案</p>",
+            "card_title": "模拟标题",
+            "card_points": [{"subtitle": f"要点{k}", "content": f"模拟要点内容 {k}"} for k in range(3)],
+        }, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_llm_cache_hit_skips_request():
+    original_key = config.AI_API_KEY
+    config.AI_API_KEY = "test-key"
+    llm_client._default_client = LLMClient(openai_client=FakeOpenAI())
+    llm_cache._default_cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"))
+    try:
+        FakeOpenAI.calls = 0
+        news = make_news(0)
+        first = ai_writer.generate_news_content(news)
+        second = ai_writer.generate_news_content(news)
+
+        assert FakeOpenAI.calls == 1
+        assert first["tts_script"] == second["tts_script"] == "模拟播报文案"
+        assert all(isinstance(p, CardPoint) for p in second["card_points"])
+        assert second["card_points"] == first["card_points"]
+
+        # 内容变化或不使用缓存时重新请求
+        news.raw_content += "更新"
+        ai_writer.generate_news_content(news)
+        ai_writer.generate_news_content(news, use_cache=False)
+        assert FakeOpenAI.calls == 3
+        print("✓ 相同新闻的文案直接命中缓存")
+    finally:
+        config.AI_API_KEY = original_key
+        llm_client._default_client = None
+        llm_cache._default_cache = None
+
+
+class BatchFakeOpenAI:
+    """批量请求时第 2 条返回不合格的结果，单条请求正常返回"""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        points = [{"subtitle": f"要点{k}", "content": f"要点内容 {k}"} for k in range(3)]
+        if '"items"' in prompt:
+            payload = {"items": [
+                {"id": "1", "tts_script": "批量文案 1", "card_title": "标题 1", "card_points": points},
+                {"id": "2", "tts_script": "批量文案 2", "card_title": "标题 2", "card_points": points[:2]},
+                {"id": "3", "tts_script": "批量文案 3", "card_title": "标题 3", "card_points": points},
+            ]}
+        else:
+            payload = {"tts_script": "单条文案", "card_title": "单条标题", "card_points": points}
+        content = json.dumps(payload, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_batched_prompt_retries_only_invalid_entries():
+    original_key = config.AI_API_KEY
+    config.AI_API_KEY = "test-key"
+    fake = BatchFakeOpenAI()
+    llm_client._default_client = LLMClient(openai_client=fake)
+    llm_cache._default_cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"))
+    try:
+        news_list = [make_news(i) for i in range(3)]
+        results = ai_writer.generate_news_content_batch(news_list)
+
+        assert len(fake.prompts) == 2  # 一次批量请求 + 第 2 条单独重试
+        assert all(news.title in fake.prompts[0] for news in news_list)
+        assert news_list[1].title in fake.prompts[1] and news_list[0].title not in fake.prompts[1]
+        assert [r["tts_script"] for r in results] == ["批量文案 1", "单条文案", "批量文案 3"]
+        assert all(isinstance(p, CardPoint) for r in results for p in r["card_points"])
+
+        # 结果已缓存，再次生成不发请求
+        ai_writer.generate_news_content_batch(news_list)
+        assert len(fake.prompts) == 2
+
+        # 批量模板的结果不会被单条生成当作单条模板的结果复用
+        assert ai_writer.generate_news_content(news_list[0])["tts_script"] == "单条文案"
+        assert len(fake.prompts) == 3
+        print("✓ 批量请求只对不合格条目单独重试")
+    finally:
+        config.AI_API_KEY = original_key
+        llm_client._default_client = None
+        llm_cache._default_cache = None
+
+
+class MalformedBatchFakeOpenAI(BatchFakeOpenAI):
+    """批量请求时第 3 条的标题不是字符串"""
+
+    def create(self, messages, **kwargs):
+        response = super().create(messages, **kwargs)
+        payload = json.loads(response.choices[0].message.content)
+        if "items" in payload:
+            payload["items"][2]["card_title"] = 123
+        response.choices[0].message.content = json.dumps(payload, ensure_ascii=False)
+        return response
+
+
+def test_batched_malformed_entry_only_affects_itself():
+    original_key = config.AI_API_KEY
+    config.AI_API_KEY = "test-key"
+    fake = MalformedBatchFakeOpenAI()
+    llm_client._default_client = LLMClient(openai_client=fake)
+    llm_cache._default_cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"))
+    try:
+        results = ai_writer.generate_news_content_batch([make_news(i) for i in range(3)])
+
+        # 字段类型错误的条目与要点不足的条目一样单独重试，其余条目保留批量结果
+        assert len(fake.prompts) == 3
+        assert [r["tts_script"] for r in results] == ["批量文案 1", "单条文案", "单条文案"]
+        print("✓ 字段类型错误的条目单独重试，不影响同组其他条目")
+    finally:
+        config.AI_API_KEY = original_key
+        llm_client._default_client = None
+        llm_cache._default_cache = None
+
+
+class StreamFakeOpenAI:
+    """流式返回预设 JSON，每次 5 个字符"""
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload, ensure_ascii=False)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        assert stream
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.text[i:i + 5]))])
+            for i in range(0, len(self.text), 5)
+        ])
+
+
+def test_json_stream_parser_emits_completed_values():
+    events = []
+    parser = JSONStreamParser(lambda path, value: events.append((path, value)))
+    text = '```json\n{"a": "x\\"}", "n": 1, "list": [{"k": "v"}, "s"]}```'
+    for ch in text:
+        parser.feed(ch)
+
+    assert (("a",), 'x"}') in events
+    assert (("list", 0), {"k": "v"}) in events and (("list", 1), "s") in events
+    assert events[-1] == ((), {"a": 'x"}', "n": 1, "list": [{"k": "v"}, "s"]})
+    assert parser.done
+    assert json.loads(parser.root_text()) == events[-1][1]  # 根值文本不含代码块标记
+    print("✓ 增量 JSON 解析按字段回调")
+
+
+def test_stream_generation_reports_partial_fields():
+    points = [{"subtitle": f"要点{k}", "content": f"流式要点内容 {k}"} for k in range(3)]
+    original_key = config.AI_API_KEY
+    config.AI_API_KEY = "test-key"
+    llm_cache._default_cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"))
+    try:
+        llm_client._default_client = LLMClient(openai_client=StreamFakeOpenAI(
+            {"tts_script": "流式播报", "card_title": "流式标题", "card_points": points}
+        ))
+        partial = []
+        result = ai_writer.generate_news_content_stream(make_news(0), on_partial=lambda f, v: partial.append((f, v)))
+        assert [f for f, _ in partial] == ["tts_script", "card_title", "card_point", "card_point", "card_point"]
+        assert partial[2][1] == CardPoint(subtitle="要点0", content="流式要点内容 0")
+        assert result["card_points"] == [v for f, v in partial if f == "card_point"]
+
+        # 包在代码块中的回复：最终结果与预览一致，不回退备用方案
+        fenced = StreamFakeOpenAI({"tts_script": "代码块播报", "card_title": "流式标题", "card_points": points})
+        fenced.text = f"```json\n{fenced.text}\n```"
+        llm_client._default_client = LLMClient(openai_client=fenced)
+        assert ai_writer.generate_news_content_stream(make_news(1))["tts_script"] == "代码块播报"
+
+        # 批量流式：按 id 把字段对应到新闻
+        llm_client._default_client = LLMClient(openai_client=StreamFakeOpenAI({"items": [
+            {"id": "2", "tts_script": "第二条", "card_title": "标题二", "card_points": points},
+            {"id": "1", "tts_script": "第一条", "card_title": "标题一", "card_points": points},
+        ]}))
+        partial = []
+        news_list = [make_news(10), make_news(11)]
+        results = ai_writer.generate_news_content_batch(news_list, on_partial=lambda i, f, v: partial.append((i, f, v)))
+        assert (1, "tts_script", "第二条") in partial and (0, "tts_script", "第一条") in partial
+        assert [r["tts_script"] for r in results] == ["第一条", "第二条"]
+        print("✓ 流式生成逐字段回调")
+    finally:
+        config.AI_API_KEY = original_key
+        llm_client._default_client = None
+        llm_cache._default_cache = None
+
+
+class StreamBatchFakeOpenAI(BatchFakeOpenAI):
+    """与 BatchFakeOpenAI 相同的结果，以流式返回"""
+
+    def create(self, messages, stream=False, **kwargs):
+        response = super().create(messages, **kwargs)
+        text = response.choices[0].message.content
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 7]))])
+            for i in range(0, len(text), 7)
+        ])
+
+
+def test_stream_batch_retry_resets_partials():
+    original_key = config.AI_API_KEY
+    config.AI_API_KEY = "test-key"
+    llm_client._default_client = LLMClient(openai_client=StreamBatchFakeOpenAI())
+    llm_cache._default_cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"))
+    try:
+        partial = []
+        ai_writer.generate_news_content_batch(
+            [make_news(i) for i in range(3)], on_partial=lambda i, f, v: partial.append((i, f, v)),
+        )
+        events = [(f, v) for i, f, v in partial if i == 1]
+        reset_at = events.index(("reset", None))
+        assert ("tts_script", "批量文案 2") in events[:reset_at]  # 批量请求中先展示过
+        assert events[reset_at + 1:][0] == ("tts_script", "单条文案")  # 重新生成的字段在 reset 之后
+        assert ("reset", None) not in [(f, v) for i, f, v in partial if i != 1]
+        print("✓ 单独重新生成前通知调用方丢弃部分结果")
+    finally:
+        config.AI_API_KEY = original_key
+        llm_client._default_client = None
+        llm_cache._default_cache = None
+
+
+def test_llm_cache_ttl_and_eviction():
+    cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.db"), ttl=3600, max_rows=3)
+    for i in range(5):
+        cache.put(f"key{i}", {"tts_script": str(i)})
+        time.sleep(0.01)
+    assert cache.count() == 3
+    assert cache.get("key0") is None and cache.get("key4") == {"tts_script": "4"}
+
+    cache.ttl = 0
+    assert cache.get("key4") is None  # 过期视为未命中
+    print("✓ 文案缓存按条数淘汰，过期不命中")
+
+
+if __name__ == "__main__":
+    test_batch_concurrency_and_callbacks()
+    test_item_timeout_falls_back_to_mock()
+    test_wait_for_starts_items_as_inputs_become_ready()
+    test_llm_cache_hit_skips_request()
+    test_batched_prompt_retries_only_invalid_entries()
+    test_batched_malformed_entry_only_affects_itself()
+    test_json_stream_parser_emits_completed_values()
+    test_stream_generation_reports_partial_fields()
+    test_stream_batch_retry_resets_partials()
+    test_llm_cache_ttl_and_eviction()
+    print("\n✓ AI 文案生成测试通过")
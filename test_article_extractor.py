@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""测试原文正文抽取（使用本地 HTTP 服务器，无需外网）"""
+
+import tempfile
+import threading
+import time
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models.news import NewsItem
+from services import ai_writer, article_extractor
+from services.article_extractor import ArticleCache, extract_main_text, fetch_full_articles, iter_full_articles
+
+PARAGRAPHS = [
+    "月之暗面今天正式发布了最新的推理模型，该模型在数学、代码和长文本理解等多项评测中表现优异，引起业界广泛关注。",
+    "据介绍，新模型采用了全新的训练方法，推理速度比上一代提升约两倍，同时显著降低了调用成本，开发者可以通过接口直接使用。",
+    "公司表示，未来几个月还将陆续开放更多能力，包括多模态输入、工具调用和更长的上下文窗口，并计划与更多合作伙伴展开合作。",
+    "分析人士认为，随着推理能力和成本的持续改善，大模型在教育、金融、医疗等行业的落地速度有望进一步加快。",
+]
+
+ARTICLE_HTML = f"""<html><head><meta charset="gbk"><title>新模型发布</title>
+<script>var tracking = "这段脚本里的文字，不应该出现在正文中，即使它很长很长很长很长。";</script></head>
+<body>
+<nav><a href="/">首页</a> <a href="/tech">科技</a> <a href="/ai">人工智能频道的导航链接文字</a></nav>
+<div class="layout">
+  <div class="article-content">
+    <h1>新模型发布</h1>
+    {''.join(f'<p>{p}</p>' for p in PARAGRAPHS)}
+    <p>分享到：<a href="#">微博</a> <a href="#">微信</a></p>
+  </div>
+  <div class="sidebar">
+    <p>热门推荐：这是侧边栏里的一段推荐文字，虽然也比较长，但是不属于正文内容，应该被过滤掉才对。</p>
+  </div>
+  <div class="comments"><p>网友评论：这篇文章写得很好，我非常赞同作者的观点，期待后续的更多报道和分析。</p></div>
+  <ul class="links">
+    <li><a href="/1">相关新闻一：另一家公司也发布了新的大模型产品，性能同样表现不错</a></li>
+    <li><a href="/2">相关新闻二：人工智能行业融资持续升温，多家创业公司完成新一轮融资</a></li>
+  </ul>
+</div>
+<footer>版权所有 2025 示例网站，未经授权不得转载，所有内容仅供参考。</footer>
+</body></html>"""
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    """/article/* 返回 GBK 编码的新闻页（编码只写在 meta 中），/short/* 正文过短，/slow/* 超时；记录请求数和最大并发数"""
+
+    active = 0
+    max_active = 0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with ArticleHandler.lock:
+            ArticleHandler.active += 1
+            ArticleHandler.requests += 1
+            ArticleHandler.max_active = max(ArticleHandler.max_active, ArticleHandler.active)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(2)
+                body = ARTICLE_HTML.encode("gbk")
+            elif self.path.startswith("/short"):
+                body = "<html><body><p>只有一句话。</p></body></html>".encode("utf-8")
+            else:
+                time.sleep(0.3)
+                body = ARTICLE_HTML.encode("gbk")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with ArticleHandler.lock:
+                ArticleHandler.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_news(url: str) -> NewsItem:
+    return NewsItem(title="新模型发布", source="测试源", url=url, published="2025-01-01", raw_content="一句话摘要。")
+
+
+def use_temp_cache() -> None:
+    article_extractor._default_cache = ArticleCache(tempfile.mkdtemp())
+
+
+def test_extract_main_text_keeps_article_paragraphs():
+    text = extract_main_text(ARTICLE_HTML)
+    assert text.split("\n") == PARAGRAPHS
+    assert extract_main_text("<html><body><a href='/'>首页</a></body></html>") == ""
+    print(f"✓ 抽取正文 {len(text)} 字，过滤导航、侧边栏、评论和相关链接")
+
+
+def test_fetch_concurrently_with_cache():
+    server, base = start_server()
+    use_temp_cache()
+    try:
+        ArticleHandler.requests = ArticleHandler.max_active = 0
+        news_list = [make_news(f"{base}/article/{i}") for i in range(4)] + [make_news(f"{base}/short/1")]
+
+        start = time.monotonic()
+        fetched = fetch_full_articles(news_list, max_workers=4, per_host_limit=2)
+        elapsed = time.monotonic() - start
+
+        assert fetched == 4
+        assert news_list[0].full_content.split("\n") == PARAGRAPHS  # meta 中声明的 GBK 编码正确解码
+        assert news_list[4].full_content == ""  # 正文过短时继续使用摘要
+        assert ArticleHandler.max_active <= 2  # 同一域名并发受限
+        assert elapsed < 0.3 * 4  # 逐个抓取至少需要 1.2 秒
+
+        # 再次抓取全部命中缓存
+        requests_before = ArticleHandler.requests
+        assert fetch_full_articles(news_list) == 4
+        assert ArticleHandler.requests == requests_before
+
+        # 正文过短的页面只短时间缓存，到期后只重新抓取它
+        article_extractor._default_cache.short_ttl = 0
+        assert fetch_full_articles(news_list) == 4
+        assert ArticleHandler.requests == requests_before + 1
+        print(f"✓ 并发抓取 5 篇原文，耗时 {elapsed:.2f}s，最大同域名并发 {ArticleHandler.max_active}，再次抓取命中缓存")
+    finally:
+        server.shutdown()
+        article_extractor._default_cache = None
+
+
+def test_deadline_and_prompt_uses_full_content():
+    server, base = start_server()
+    use_temp_cache()
+    try:
+        news_list = [make_news(f"{base}/article/fast"), make_news(f"{base}/slow/1")]
+        start = time.monotonic()
+        fetch_full_articles(news_list, deadline=1)
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 1.8, f"总截止时间未生效: {elapsed:.2f}s"
+        assert news_list[0].full_content and news_list[1].full_content == ""
+
+        # 逐条产出：命中缓存的先产出，超时的在截止时产出，每条只产出一次
+        news_list.append(make_news(f"{base}/slow/2"))
+        order = [i for i, _ in iter_full_articles(news_list, deadline=0.5)]
+        assert order[0] == 0 and sorted(order) == [0, 1, 2]
+
+        # 截止时已完成但尚未产出的抓取照常使用结果
+        def late_as_completed(futures, timeout=None):
+            wait(futures)
+            raise TimeoutError
+
+        use_temp_cache()
+        original_as_completed = article_extractor.as_completed
+        article_extractor.as_completed = late_as_completed
+        try:
+            late = [make_news(f"{base}/article/late")]
+            assert [i for i, _ in iter_full_articles(late)] == [0]
+            assert late[0].full_content.split("\n") == PARAGRAPHS
+        finally:
+            article_extractor.as_completed = original_as_completed
+
+        prompt = ai_writer._build_news_prompt(news_list[0])
+        assert PARAGRAPHS[0] in prompt and "一句话摘要" not in prompt
+        assert ai_writer._cache_key(news_list[0]) != ai_writer._cache_key(news_list[1])
+        print(f"✓ 超时的页面继续使用摘要，耗时 {elapsed:.2f}s；提示词使用原文正文")
+    finally:
+        server.shutdown()
+        article_extractor._default_cache = None
+
+
+if __name__ == "__main__":
+    test_extract_main_text_keeps_article_paragraphs()
+    test_fetch_concurrently_with_cache()
+    test_deadline_and_prompt_uses_full_content()
+    print("\n✓ 原文正文抽取测试通过")
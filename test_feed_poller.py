@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""测试后台 RSS 轮询的自适应间隔与失败退避"""
+
+import json
+import os
+import tempfile
+import time
+
+from models.news import NewsItem
+from services.config_manager import ConfigManager
+from services.feed_poller import FeedPoller
+from services.history_store import HistoryStore
+
+
+def make_poller(fetch_func):
+    tmp_dir = tempfile.mkdtemp()
+    config_file = os.path.join(tmp_dir, "user_config.json")
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump({"rss_sources": {"科技新闻": [
+            {"name": "测试源", "url": "https://example.com/feed", "default_count": 3},
+        ]}}, f, ensure_ascii=False)
+
+    poller = FeedPoller(
+        config_manager=ConfigManager(config_file),
+        store=HistoryStore(os.path.join(tmp_dir, "history.db")),
+        fetch_func=fetch_func,
+        min_interval=60,
+        max_interval=600,
+        max_backoff=3600,
+        jitter=0,
+    )
+    poller.load_sources(now=0)
+    return poller
+
+
+def make_news(i: int) -> NewsItem:
+    return NewsItem(
+        title=f"新闻 {i}",
+        source="测试源",
+        url=f"https://example.com/{i}",
+        published="",
+        raw_content="内容",
+        published_ts=time.time(),
+    )
+
+
+def test_interval_adapts_to_changes():
+    batches = [[make_news(1), make_news(2)], [make_news(1), make_news(2)], [make_news(2), make_news(3)]]
+    poller = make_poller(lambda url, name, count: batches.pop(0))
+    state = poller.states["https://example.com/feed"]
+
+    assert poller.poll_source(state, now=0) == 2
+    assert state.interval == 60  # 有新内容，保持最短间隔
+
+    assert poller.poll_source(state, now=60) == 0
+    assert state.interval == 90 and state.next_due == 150  # 无新内容，间隔拉长
+
+    assert poller.poll_source(state, now=150) == 1
+    assert state.interval == 60
+    assert sorted(n.url for n in poller.store.get_collected()) == [f"https://example.com/{i}" for i in (1, 2, 3)]
+    print("✓ 轮询间隔随更新频率自适应")
+
+
+def test_backoff_on_failure():
+    def failing_fetch(url, name, count):
+        raise ConnectionError("网络不可用")
+
+    poller = make_poller(failing_fetch)
+    state = poller.states["https://example.com/feed"]
+
+    delays = []
+    for _ in range(7):
+        poller.poll_source(state, now=0)
+        delays.append(state.next_due)
+
+    assert delays[:3] == [120, 240, 480]
+    assert delays[-1] == 3600  # 不超过最长退避
+    assert state.failures == 7
+    print(f"✓ 失败退避间隔: {delays}")
+
+
+if __name__ == "__main__":
+    test_interval_adapts_to_changes()
+    test_backoff_on_failure()
+    print("\n✓ 后台轮询测试通过")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""测试已制作新闻历史记录"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from models.news import NewsItem
+from services.history_store import HistoryStore
+
+
+def make_news(i: int, url: str = None) -> NewsItem:
+    return NewsItem(
+        title=f"测试新闻 {i}",
+        source="测试源",
+        url=url if url is not None else f"https://example.com/{i}",
+        published="2025-11-07T08:00:00Z",
+        raw_content=f"<p>第 {i} 条新闻的内容。</p>",
+    )
+
+
+def test_mark_and_find_seen():
+    store = HistoryStore(os.path.join(tempfile.mkdtemp(), "history.db"))
+    store.mark_produced([make_news(1), make_news(2)])
+
+    # URL 相同，或 URL 不同但内容相同，都视为已制作
+    candidates = [make_news(1), make_news(2, url="https://example.com/2?utm_source=rss"), make_news(3)]
+    assert store.find_seen(candidates) == [True, True, False]
+
+    assert store.mark_seen(candidates) == 2
+    assert [n.seen for n in candidates] == [True, True, False]
+    assert [n.url for n in store.filter_unseen(candidates)] == ["https://example.com/3"]
+    print("✓ 已制作新闻标记与过滤正常")
+
+
+def test_bulk_lookup_uses_index():
+    store = HistoryStore(os.path.join(tempfile.mkdtemp(), "history.db"))
+    store.mark_produced([make_news(i) for i in range(50000)])
+    assert store.count() == 50000
+
+    candidates = [make_news(i) for i in range(49900, 50100)]
+    start = time.perf_counter()
+    flags = store.find_seen(candidates)
+    elapsed = time.perf_counter() - start
+    assert sum(flags) == 100
+
+    conn = sqlite3.connect(store.db_path)
+    plan = " ".join(str(row) for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT content_hash FROM produced WHERE content_hash IN (?)", ("x",)))
+    conn.close()
+    assert "idx_produced_content_hash" in plan
+    print(f"✓ 5 万条记录中批量查询 200 条耗时 {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    test_mark_and_find_seen()
+    test_bulk_lookup_uses_index()
+    print("\n✓ 历史记录测试通过")
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""测试新闻配图并发下载（使用本地 HTTP 服务器，无需外网）"""
+
+import glob
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+
+import config
+from models.news import NewsItem
+from services import image_cache, image_downloader
+from services.image_cache import ImageCache
+from services.image_downloader import (
+    download_images_for_news_list,
+    process_news_image,
+    process_news_image_bytes,
+)
+from services.image_crop import saliency_crop_box
+from services.image_hash import find_duplicate_images
+
+
+def make_jpeg(width: int = 1600, height: int = 1200, color=(200, 80, 40)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """
+    /img/* 延迟返回 JPEG（支持 ETag），/slow/* 超时，/missing/* 返回 404，
+    /tiny/* 返回 16x16 图标，/html/* 返回网页，/huge/* 声明超大 Content-Length；记录请求数和最大并发数
+    """
+
+    body = make_jpeg()
+    tiny_body = make_jpeg(16, 16)
+    etag = '"photo-v1"'
+    active = 0
+    max_active = 0
+    requests = 0
+    not_modified = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with ImageHandler.lock:
+            ImageHandler.active += 1
+            ImageHandler.requests += 1
+            ImageHandler.max_active = max(ImageHandler.max_active, ImageHandler.active)
+        try:
+            if self.path.startswith("/missing"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            if self.path.startswith("/html"):
+                self._send(b"<html><body>not an image</body></html>", "text/html; charset=utf-8")
+                return
+            if self.path.startswith("/tiny"):
+                self._send(self.tiny_body, "image/jpeg")
+                return
+            if self.path.startswith("/huge"):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(200 * 1024 * 1024))
+                self.end_headers()
+                self.wfile.write(self.body)
+                return
+            if self.headers.get("If-None-Match") == self.etag:
+                with ImageHandler.lock:
+                    ImageHandler.not_modified += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            time.sleep(3 if self.path.startswith("/slow") else 0.2)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(self.body)))
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            self.wfile.write(self.body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with ImageHandler.lock:
+                ImageHandler.active -= 1
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_process_pool_matches_thread_processing():
+    server, base = start_server()
+    try:
+        urls = [f"{base}/img/p{i}.jpg" for i in range(4)]
+        pooled = [make_news(0, urls[:2]), make_news(1, urls[2:])]
+        threaded = [make_news(0, urls[:2]), make_news(1, urls[2:])]
+
+        use_temp_cache()
+        download_images_for_news_list(pooled, use_process_pool=True)
+        use_temp_cache()
+        download_images_for_news_list(threaded, use_process_pool=False)
+
+        for a, b in zip(pooled, threaded):
+            assert len(a.downloaded_images) == len(b.downloaded_images) == 2
+            assert a.image_hashes == b.image_hashes
+            for path_a, path_b in zip(a.downloaded_images, b.downloaded_images):
+                with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+                    assert fa.read() == fb.read()
+        print("✓ 进程池处理结果与线程内处理一致")
+    finally:
+        server.shutdown()
+
+
+def test_rejects_unsuitable_responses():
+    server, base = start_server()
+    use_temp_cache()
+    original_max_pixels = config.IMAGE_MAX_PIXELS
+    config.IMAGE_MAX_PIXELS = 1_000_000  # 1600x1200 的测试图超过此上限
+    try:
+        rejected = {}
+        for name in ("html", "tiny", "huge", "img"):
+            try:
+                image_downloader._download_image(f"{base}/{name}/x.jpg")
+            except ValueError as e:
+                rejected[name] = str(e)
+
+        assert set(rejected) == {"html", "tiny", "huge", "img"}, rejected
+        assert "非图片" in rejected["html"]
+        assert "过小" in rejected["tiny"]
+        assert "过大" in rejected["huge"]
+        assert "像素过多" in rejected["img"]
+        print(f"✓ 不合适的响应提前放弃: {rejected}")
+    finally:
+        config.IMAGE_MAX_PIXELS = original_max_pixels
+        server.shutdown()
+
+
+def test_process_bytes_matches_file_path():
+    """大图走 draft 解码，输出尺寸和内容与文件路径版本一致"""
+    data = make_jpeg(4000, 3000, color=(30, 120, 200))
+    tmp_dir = tempfile.mkdtemp()
+    source_path = os.path.join(tmp_dir, "source.jpg")
+    with open(source_path, "wb") as f:
+        f.write(data)
+
+    from_bytes = process_news_image_bytes(data, os.path.join(tmp_dir, "from_bytes.jpg"))
+    from_file = process_news_image(source_path, output_path=os.path.join(tmp_dir, "from_file.jpg"))
+
+    with Image.open(from_bytes) as a, Image.open(from_file) as b:
+        assert a.size == b.size == (1920, 1080)
+        assert a.getpixel((960, 540)) == b.getpixel((960, 540))
+        assert a.getpixel((10, 10)) == (255, 255, 255)
+    print("✓ 内存解码与文件解码结果一致")
+
+
+def test_duplicate_photos_across_news():
+    server, base = start_server()
+    use_temp_cache()
+    try:
+        # 同一张图片出现在不同新闻中（URL 不同），另一张是不同的图片
+        other = base.replace("127.0.0.1", "localhost")
+        news_list = [
+            make_news(0, [f"{base}/img/press.jpg"]),
+            make_news(1, [f"{base}/tiny/icon.jpg", f"{other}/img/copy-of-press.jpg"]),
+            make_news(2, [f"{base}/img/other.jpg?v=2"]),
+        ]
+        ImageHandler.body = make_jpeg(color=(200, 80, 40))
+        download_images_for_news_list(news_list[:2])
+        ImageHandler.body = make_gradient_jpeg()
+        download_images_for_news_list(news_list[2:])
+
+        assert [len(n.image_hashes) for n in news_list] == [1, 1, 1]
+        duplicates = find_duplicate_images(news_list)
+        assert duplicates == {(1, 0): (0, 0)}, duplicates
+
+        # 哈希保存在缓存中，重复获取不再计算
+        cached = make_news(0, [f"{base}/img/press.jpg"])
+        download_images_for_news_list([cached])
+        assert cached.image_hashes == news_list[0].image_hashes
+        print(f"✓ 跨新闻重复配图: {duplicates}")
+    finally:
+        ImageHandler.body = make_jpeg()
+        server.shutdown()
+
+
+def make_gradient_jpeg() -> bytes:
+    img = Image.linear_gradient("L").rotate(90).resize((1600, 1200)).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_fill_mode_crops_detailed_region():
+    # 宽幅图片：左侧纯色，右侧有细节
+    rng = np.random.default_rng(0)
+    wide = Image.new("RGB", (3600, 1200), (240, 240, 240))
+    noise = rng.integers(0, 255, size=(1200, 900, 3), dtype=np.uint8)
+    wide.paste(Image.fromarray(noise), (2600, 0))
+
+    left, top, right, bottom = saliency_crop_box(wide, 16 / 9)
+    assert (top, bottom) == (0, 1200) and right - left == round(1200 * 16 / 9)
+    assert right >= 3400, (left, right)
+
+    buffer = io.BytesIO()
+    wide.save(buffer, format="JPEG")
+    tmp_dir = tempfile.mkdtemp()
+    filled = process_news_image_bytes(buffer.getvalue(), os.path.join(tmp_dir, "fill.jpg"), fit_mode="fill")
+    with Image.open(filled) as img:
+        assert img.size == (1920, 1080)
+        assert img.getpixel((10, 540)) != (255, 255, 255)  # 铺满画布，没有白边
+
+    # 竖图裁切损失过多，回退为居中留白
+    portrait = process_news_image_bytes(make_jpeg(900, 1600), os.path.join(tmp_dir, "portrait.jpg"), fit_mode="fill")
+    with Image.open(portrait) as img:
+        assert img.getpixel((10, 540)) == (255, 255, 255)
+    print(f"✓ 铺满模式裁切区域: {(left, top, right, bottom)}")
+
+
+def use_temp_cache(**kwargs) -> ImageCache:
+    """测试使用独立的临时缓存目录"""
+    cache = ImageCache(tempfile.mkdtemp(), **kwargs)
+    image_cache._default_cache = cache
+    return cache
+
+
+def make_news(i: int, image_urls) -> NewsItem:
+    return NewsItem(
+        title=f"配图新闻 {i}",
+        source="测试源",
+        url=f"https://example.com/{i}",
+        published="",
+        raw_content="",
+        image_urls=image_urls,
+    )
+
+
+def test_concurrent_download_order_and_host_limit():
+    server, base = start_server()
+    use_temp_cache()
+    try:
+        ImageHandler.max_active = 0
+        news_list = [
+            make_news(0, [f"{base}/img/0a.jpg", f"{base}/missing/0b.jpg"]),
+            make_news(1, []),
+            make_news(2, [f"{base}/img/2a.jpg", f"{base}/img/2b.jpg"]),
+            make_news(3, [f"{base}/img/3a.jpg", f"{base}/img/3b.jpg"]),
+        ]
+
+        done = []
+        start = time.monotonic()
+        download_images_for_news_list(
+            news_list, max_workers=8, per_host_limit=2, deadline=10,
+            on_news_done=lambda i, news: done.append((i, len(news.downloaded_images))),
+        )
+        elapsed = time.monotonic() - start
+
+        assert ImageHandler.max_active <= 2, f"同域名并发超限: {ImageHandler.max_active}"
+        assert [len(n.downloaded_images) for n in news_list] == [1, 0, 2, 2]
+        assert sorted(done) == [(0, 1), (1, 0), (2, 2), (3, 2)]  # 每条新闻回调一次，回调时已写回
+        # 结果按配图原有顺序排列，不同 URL 的文件互不覆盖
+        assert [os.path.basename(p).split("_")[0] for p in news_list[2].downloaded_images] == [
+            ImageCache.key(url) for url in news_list[2].image_urls
+        ]
+        for news in news_list:
+            for path in news.downloaded_images:
+                with Image.open(path) as img:
+                    assert img.size == (1920, 1080)
+        print(f"✓ 并发下载完成，耗时 {elapsed:.2f}s，同域名最大并发 {ImageHandler.max_active}")
+    finally:
+        server.shutdown()
+
+
+def test_deadline_returns_partial_results():
+    server, base = start_server()
+    use_temp_cache()
+    try:
+        news_list = [
+            make_news(0, [f"{base}/img/fast.jpg", f"{base}/slow/late.jpg"]),
+            make_news(1, [f"{base}/img/other.jpg"]),
+        ]
+
+        done_at = {}
+        start = time.monotonic()
+        download_images_for_news_list(
+            news_list, per_host_limit=4, deadline=1, use_process_pool=False,
+            on_news_done=lambda i, news: done_at.setdefault(i, time.monotonic() - start),
+        )
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 2, f"总截止时间未生效: {elapsed:.2f}s"
+        assert [len(n.downloaded_images) for n in news_list] == [1, 1]
+        assert done_at[1] < 0.9 <= done_at[0]  # 配图齐全的新闻不等截止时间就回调
+
+        # 截止时已下载完成但尚未取出的配图照常处理
+        def late_wait(futures, timeout=None, return_when=None):
+            wait(futures)
+            return set(), set(futures)
+
+        use_temp_cache()
+        image_downloader.wait = late_wait
+        try:
+            late = [make_news(1, [f"{base}/img/late1.jpg", f"{base}/img/late2.jpg"])]
+            download_images_for_news_list(late, use_process_pool=False)
+            assert len(late[0].downloaded_images) == 2 and all(late[0].image_hashes)
+        finally:
+            image_downloader.wait = wait
+        print(f"✓ 截止时间内返回部分结果，耗时 {elapsed:.2f}s")
+    finally:
+        server.shutdown()
+
+
+def test_cache_reuses_downloads_and_revalidates():
+    server, base = start_server()
+    cache = use_temp_cache()
+    processed = []
+    original_process = image_downloader.process_news_image_bytes
+
+    def counting_process(*args, **kwargs):
+        processed.append(args[0])
+        return original_process(*args, **kwargs)
+
+    image_downloader.process_news_image_bytes = counting_process
+    try:
+        urls = [f"{base}/img/c1.jpg", f"{base}/img/c2.jpg"]
+        download_images_for_news_list([make_news(0, urls)], use_process_pool=False)
+        assert len(processed) == 2
+
+        # 有效期内重复获取：零网络请求，不重新处理
+        ImageHandler.requests = 0
+        news = make_news(0, urls)
+        download_images_for_news_list([news], use_process_pool=False)
+        assert ImageHandler.requests == 0 and len(processed) == 2
+        assert len(news.downloaded_images) == 2
+
+        # 过期后发起条件请求，304 时复用已有画布
+        cache.ttl = 0
+        ImageHandler.requests = 0
+        ImageHandler.not_modified = 0
+        news = make_news(0, urls)
+        download_images_for_news_list([news], use_process_pool=False)
+        assert ImageHandler.requests == 2 and ImageHandler.not_modified == 2
+        assert len(processed) == 2 and len(news.downloaded_images) == 2
+        print("✓ 缓存命中零请求，过期后 304 复用")
+    finally:
+        image_downloader.process_news_image_bytes = original_process
+        server.shutdown()
+
+
+def test_cache_lru_eviction():
+    cache = use_temp_cache(max_bytes=10_000)
+    for i in range(5):
+        cache.put_raw(f"https://example.com/{i}.jpg", b"x" * 4000)
+        past = time.time() - 100 + i
+        for path in glob.glob(os.path.join(cache.raw_dir, ImageCache.key(f"https://example.com/{i}.jpg") + ".*")):
+            os.utime(path, (past, past))
+    cache.read_raw("https://example.com/0.jpg")  # 最近访问，应保留
+
+    cache.evict()
+    kept = [i for i in range(5) if cache.get_meta(f"https://example.com/{i}.jpg")]
+    assert kept == [0, 4], kept
+    print(f"✓ LRU 淘汰后保留: {kept}")
+
+
+if __name__ == "__main__":
+    test_concurrent_download_order_and_host_limit()
+    test_deadline_returns_partial_results()
+    test_cache_reuses_downloads_and_revalidates()
+    test_cache_lru_eviction()
+    test_process_pool_matches_thread_processing()
+    test_rejects_unsuitable_responses()
+    test_duplicate_photos_across_news()
+    test_process_bytes_matches_file_path()
+    test_fill_mode_crops_detailed_region()
+    print("\n✓ 配图下载测试通过")
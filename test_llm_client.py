@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""测试共享 AI 客户端的限流与重试（使用模拟客户端，无需真实 API）"""
+
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import BadRequestError, RateLimitError
+
+from services.llm_client import LLMClient, TokenBucket, estimate_tokens
+
+
+def make_error(error_class, status: int, headers=None):
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    response = httpx.Response(status, request=request, headers=headers or {})
+    return error_class("error", response=response, body=None)
+
+
+class ScriptedOpenAI:
+    """按顺序抛出预设错误，之后返回成功响应"""
+
+    def __init__(self, errors, total_tokens=50):
+        self.errors = list(errors)
+        self.calls = 0
+        self.total_tokens = total_tokens
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.last_kwargs = kwargs
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(total_tokens=self.total_tokens),
+        )
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(per_minute=600)  # 每秒补充 10 个
+    for _ in range(600):
+        assert bucket.acquire(1, timeout=0)
+    assert not bucket.acquire(1, timeout=0)
+
+    start = time.monotonic()
+    assert bucket.acquire(2)
+    elapsed = time.monotonic() - start
+    assert 0.1 < elapsed < 0.5, elapsed
+    assert TokenBucket(per_minute=0).acquire(10 ** 9, timeout=0)  # 0 表示不限制
+    print(f"✓ 令牌桶耗尽后等待补充 {elapsed:.2f}s")
+
+
+def test_retries_rate_limit_with_retry_after():
+    fake = ScriptedOpenAI([
+        make_error(RateLimitError, 429, {"retry-after": "0"}),
+        make_error(RateLimitError, 429, {"retry-after": "0"}),
+    ])
+    client = LLMClient(api_key="k", base_url="https://api.example.com/v1", model="m", rpm=0, tpm=0, openai_client=fake)
+    response = client.chat([{"role": "user", "content": "你好"}])
+    assert response.choices[0].message.content == "ok"
+    assert fake.calls == 3
+    print("✓ 429 按 Retry-After 重试后成功")
+
+
+def test_gives_up_after_max_retries_and_skips_client_errors():
+    fake = ScriptedOpenAI([make_error(RateLimitError, 429, {"retry-after": "0"})] * 3)
+    client = LLMClient(api_key="k", base_url="u", model="m", rpm=0, tpm=0, max_retries=1, openai_client=fake)
+    try:
+        client.chat([{"role": "user", "content": "你好"}])
+        assert False, "应抛出 RateLimitError"
+    except RateLimitError:
+        pass
+    assert fake.calls == 2
+
+    fake = ScriptedOpenAI([make_error(BadRequestError, 400)])
+    client = LLMClient(api_key="k", base_url="u", model="m", rpm=0, tpm=0, openai_client=fake)
+    try:
+        client.chat([{"role": "user", "content": "你好"}])
+        assert False, "应抛出 BadRequestError"
+    except BadRequestError:
+        pass
+    assert fake.calls == 1  # 请求本身有误时不重试
+    print("✓ 超过重试次数或请求错误时直接抛出")
+
+
+def test_timeout_is_optional_and_bounds_retries():
+    fake = ScriptedOpenAI([])
+    client = LLMClient(api_key="k", base_url="u", model="m", rpm=0, tpm=0, openai_client=fake)
+    client.chat([{"role": "user", "content": "你好"}])
+    assert "timeout" not in fake.last_kwargs  # 未指定时沿用客户端自身的超时
+    client.chat([{"role": "user", "content": "你好"}], timeout=5)
+    assert 0 < fake.last_kwargs["timeout"] <= 5
+
+    fake = ScriptedOpenAI([make_error(RateLimitError, 429, {"retry-after": "3"})])
+    client = LLMClient(api_key="k", base_url="u", model="m", rpm=0, tpm=0, openai_client=fake)
+    start = time.monotonic()
+    try:
+        client.chat([{"role": "user", "content": "你好"}], timeout=1)
+        assert False, "应抛出 RateLimitError"
+    except RateLimitError:
+        pass
+    assert fake.calls == 1 and time.monotonic() - start < 0.5  # 退避会超过总时限时不再重试
+    print("✓ 未指定超时不覆盖客户端设置，重试不超过总时限")
+
+
+def test_token_usage_is_reconciled():
+    fake = ScriptedOpenAI([], total_tokens=100)
+    client = LLMClient(api_key="k", base_url="u", model="m", rpm=0, tpm=10000, openai_client=fake)
+    messages = [{"role": "user", "content": "新闻内容" * 50}]
+    client.chat(messages, max_tokens=500)
+
+    estimated = estimate_tokens(messages[0]["content"]) + 500
+    assert estimated > 100
+    assert abs(client.token_bucket.tokens - (10000 - 100)) < 5  # 多预扣的部分已退还
+    print(f"✓ 预估 {estimated} tokens，按实际用量 100 修正")
+
+
+if __name__ == "__main__":
+    test_token_bucket_limits_rate()
+    test_retries_rate_limit_with_retry_after()
+    test_gives_up_after_max_retries_and_skips_client_errors()
+    test_timeout_is_optional_and_bounds_retries()
+    test_token_usage_is_reconciled()
+    print("\n✓ AI 客户端测试通过")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""测试跨来源新闻去重"""
+
+from models.news import NewsItem
+from services.news_dedup import SimHashIndex, deduplicate_news, hamming_distance, simhash
+
+
+def make_news(title: str, content: str, source: str, url: str, image_urls=None) -> NewsItem:
+    return NewsItem(
+        title=title,
+        source=source,
+        url=url,
+        published="2025-11-07T08:00:00Z",
+        raw_content=content,
+        image_urls=image_urls or [],
+    )
+
+
+STORY = "月之暗面今天正式发布了最新的AI推理模型Kimi K2 Thinking，该模型在多项数学与代码评测中表现优异，并将向开发者开放API调用。"
+
+
+def test_simhash_similarity():
+    a = simhash(STORY)
+    b = simhash(STORY.replace("今天", "今日") + "<p>阅读原文</p>")
+    c = simhash("苹果公司发布第四季度财报，iPhone 营收同比增长，服务业务创下历史新高。")
+    assert hamming_distance(a, b) < hamming_distance(a, c)
+    print(f"✓ 相似文本距离 {hamming_distance(a, b)}，无关文本距离 {hamming_distance(a, c)}")
+
+
+def test_index_query():
+    index = SimHashIndex(max_distance=3)
+    index.add(0b1011, "a")
+    assert index.query(0b1010) == ("a", 1)
+    assert index.query((1 << 63) | (1 << 40) | (1 << 20) | (1 << 5)) is None
+    print("✓ 分段索引查询正常")
+
+
+def test_deduplicate_merge_and_flag():
+    news_list = [
+        make_news("Kimi K2 Thinking 模型发布", STORY, "36氪", "https://36kr.com/1"),
+        make_news("Kimi K2 Thinking 模型发布", "<p>" + STORY.replace("今天", "今日") + "</p>", "机器之心", "https://jiqizhixin.com/1",
+                  image_urls=["https://img.example.com/k2.jpg"]),
+        make_news("苹果发布财报", "苹果公司发布第四季度财报，iPhone 营收同比增长，服务业务创下历史新高。", "IT之家", "https://ithome.com/1"),
+    ]
+
+    flagged = deduplicate_news(news_list, threshold=0.85, merge=False)
+    assert len(flagged) == 3
+    assert news_list[1].duplicate_of == "https://36kr.com/1"
+    assert news_list[2].duplicate_of == ""
+
+    merged = deduplicate_news(news_list, threshold=0.85, merge=True)
+    assert [n.source for n in merged] == ["36氪", "IT之家"]
+    assert merged[0].image_urls == ["https://img.example.com/k2.jpg"]
+    print("✓ 重复新闻标记与合并正常")
+
+
+if __name__ == "__main__":
+    test_simhash_similarity()
+    test_index_query()
+    test_deduplicate_merge_and_flag()
+    print("\n✓ 新闻去重测试通过")
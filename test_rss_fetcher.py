@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""测试 RSS 并发获取（使用本地 HTTP 服务器，无需外网）"""
+
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+from services import feed_cache
+from services.feed_cache import FeedCache
+from services.feed_stream_parser import FeedStreamError, parse_feed_stream
+from models.news import NewsItem
+from services.rss_fetcher import (
+    fetch_multiple_sources_with_status,
+    fetch_single_source,
+    filter_recent_news,
+    iter_multiple_sources,
+    parse_published,
+)
+
+
+def build_rss(title: str, items: int) -> bytes:
+    """生成测试用 RSS 文档"""
+    entries = "".join(
+        f"<item><title>{title} {i}</title><link>https://example.com/{title}/{i}</link>"
+        f"<pubDate>Fri, 07 Nov 2025 0{i % 10}:00:00 GMT</pubDate>"
+        f"<description>{title} 第 {i} 条新闻内容。</description></item>"
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{title}</title>{entries}</channel></rss>"
+    ).encode("utf-8")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """/fast 立即返回，/slow 延迟返回，/broken 返回 500，/etag 支持条件请求"""
+
+    requests_seen = []
+
+    def do_GET(self):
+        FeedHandler.requests_seen.append(self.path)
+
+        if self.path.startswith("/etag") and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(2)
+        if self.path.startswith("/broken"):
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        body = build_rss(self.path.strip("/"), 5)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def use_temp_cache(ttl: float) -> None:
+    """使用临时目录作为 RSS 缓存，避免测试之间互相影响"""
+    feed_cache._default_cache = FeedCache(cache_dir=tempfile.mkdtemp(), ttl=ttl)
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_fetch_single_source():
+    use_temp_cache(ttl=0)
+    server, base = start_server()
+    try:
+        news_list = fetch_single_source(f"{base}/fast", "本地源", count=3)
+        assert len(news_list) == 3
+        assert news_list[0].source == "本地源"
+        assert news_list[0].url == "https://example.com/fast/0"
+        print(f"✓ 单源获取 {len(news_list)} 条")
+    finally:
+        server.shutdown()
+
+
+def test_fetch_multiple_sources_partial_results():
+    use_temp_cache(ttl=0)
+    server, base = start_server()
+    try:
+        sources = [
+            {"name": "快速源", "url": f"{base}/fast", "count": 2},
+            {"name": "慢速源", "url": f"{base}/slow", "count": 2},
+            {"name": "故障源", "url": f"{base}/broken", "count": 2},
+        ]
+
+        start = time.monotonic()
+        news_list, statuses = fetch_multiple_sources_with_status(sources, total_timeout=0.5)
+        elapsed = time.monotonic() - start
+
+        by_name = {s.name: s for s in statuses}
+        assert elapsed < 1.5, f"总截止时间未生效: {elapsed:.2f}s"
+        assert by_name["快速源"].status == "ok" and by_name["快速源"].count == 2
+        assert by_name["慢速源"].status == "timeout"
+        assert by_name["故障源"].status == "error"
+        assert len(news_list) == 2
+        print(f"✓ 部分结果返回，耗时 {elapsed:.2f}s")
+    finally:
+        server.shutdown()
+
+
+def test_parse_in_process_pool():
+    use_temp_cache(ttl=0)
+    server, base = start_server()
+    try:
+        sources = [{"name": f"源{i}", "url": f"{base}/proc{i}", "count": 3} for i in range(4)]
+        threaded, _ = fetch_multiple_sources_with_status(sources, parse_in_process=False)
+        pooled, statuses = fetch_multiple_sources_with_status(sources, parse_in_process=True, total_timeout=60)
+
+        assert all(s.status == "ok" for s in statuses)
+        assert sorted(n.url for n in pooled) == sorted(n.url for n in threaded)
+        assert len(pooled) == 12
+        print("✓ 进程池解析结果与线程解析一致")
+    finally:
+        server.shutdown()
+
+
+def test_iter_multiple_sources_yields_as_completed():
+    use_temp_cache(ttl=0)
+    server, base = start_server()
+    try:
+        sources = [
+            {"name": "慢速源", "url": f"{base}/slow", "count": 2},
+            {"name": "快速源", "url": f"{base}/fast", "count": 2},
+        ]
+
+        start = time.monotonic()
+        arrivals = []
+        for status, news_list in iter_multiple_sources(sources, total_timeout=5):
+            arrivals.append((status.name, len(news_list), time.monotonic() - start))
+
+        assert [a[0] for a in arrivals] == ["快速源", "慢速源"]
+        assert arrivals[0][2] < 1.0, "快速源应在慢速源完成前产出"
+        assert all(a[1] == 2 for a in arrivals)
+        print(f"✓ 逐源产出结果，首个源 {arrivals[0][2]:.2f}s 到达")
+    finally:
+        server.shutdown()
+
+
+def test_parse_published_and_time_window():
+    rfc = parse_published("Fri, 07 Nov 2025 08:00:00 GMT")
+    iso = parse_published("2025-11-07T16:00:00+08:00")
+    assert rfc == iso == parse_published("2025-11-07T08:00:00Z")
+    assert parse_published("") == 0 and parse_published("不是时间") == 0
+
+    now = parse_published("2025-11-08T08:00:00Z")
+    news_list = [
+        NewsItem(title="新", source="A", url="1", published="", raw_content="", published_ts=now - 3600),
+        NewsItem(title="旧", source="A", url="2", published="", raw_content="", published_ts=now - 5 * 86400),
+        NewsItem(title="未知", source="B", url="3", published="", raw_content=""),
+        NewsItem(title="较新", source="A", url="4", published="", raw_content="", published_ts=now - 7200),
+    ]
+    recent = filter_recent_news(news_list, max_age_hours=24, per_source_quota=0, now=now)
+    assert [n.title for n in recent] == ["新", "未知", "较新"]
+
+    quota = filter_recent_news(news_list, max_age_hours=24, per_source_quota=1, now=now)
+    assert [n.title for n in quota] == ["新", "未知"]
+    print("✓ 发布时间解析与时间窗口过滤正常")
+
+
+def test_feed_cache_ttl_and_not_modified():
+    server, base = start_server()
+    try:
+        url = f"{base}/etag"
+
+        # TTL 内重复获取：不发起网络请求
+        use_temp_cache(ttl=60)
+        FeedHandler.requests_seen.clear()
+        first = fetch_single_source(url, "缓存源", count=3)
+        second = fetch_single_source(url, "缓存源", count=3)
+        assert len(FeedHandler.requests_seen) == 1
+        assert [n.url for n in first] == [n.url for n in second]
+
+        # TTL 过期：发起条件请求，304 复用缓存条目
+        feed_cache._default_cache.ttl = 0
+        third = fetch_single_source(url, "缓存源", count=3)
+        assert len(FeedHandler.requests_seen) == 2
+        assert [n.title for n in third] == [n.title for n in first]
+
+        # 请求数量超过缓存的截断条目：重新完整获取
+        more = fetch_single_source(url, "缓存源", count=5)
+        assert len(more) == 5
+        assert len(FeedHandler.requests_seen) == 3
+
+        # 记录格式变化（如摘要截取长度调整）后旧条目视为未命中，不发条件请求
+        feed_cache._default_cache.ttl = 60
+        original_max_chars = config.RSS_CONTENT_MAX_CHARS
+        config.RSS_CONTENT_MAX_CHARS = 500
+        try:
+            fetch_single_source(url, "缓存源", count=5)
+        finally:
+            config.RSS_CONTENT_MAX_CHARS = original_max_chars
+        assert len(FeedHandler.requests_seen) == 4
+
+        # 显式传入的缓存优先于全局缓存：后台轮询使用 ttl=0 的缓存，每次都发条件请求
+        poll_cache = FeedCache(cache_dir=tempfile.mkdtemp(), ttl=0)
+        fetch_single_source(url, "缓存源", count=3, cache=poll_cache)
+        polled = fetch_single_source(url, "缓存源", count=3, cache=poll_cache)
+        assert len(FeedHandler.requests_seen) == 6
+        assert [n.title for n in polled] == [n.title for n in first]
+        print("✓ RSS 缓存命中与 304 复用正常")
+    finally:
+        server.shutdown()
+
+
+MEDIA_RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>media</title>
+<item><title>\xe5\x9b\xbe\xe7\x89\x87\xe6\x96\xb0\xe9\x97\xbb</title><link>https://example.com/a</link>
+<pubDate>Fri, 07 Nov 2025 08:00:00 GMT</pubDate>
+<description><![CDATA[<p>Hello <b>world</b></p>]]></description>
+<media:content url="https://img.example.com/1.jpg" medium="image"/>
+<enclosure url="https://img.example.com/2.png" type="image/png" length="1"/>
+<media:thumbnail url="https://img.example.com/3.jpg"/>
+</item>
+<item><title>second</title><link>https://example.com/b</link></item>
+<item><title>third</title><link>https://example.com/c</link></item>
+</channel></rss>"""
+
+ATOM_FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>atom</title>
+<entry><title>Atom entry</title>
+<link rel="alternate" href="https://example.com/atom/1"/>
+<link rel="enclosure" type="image/jpeg" href="https://img.example.com/atom.jpg"/>
+<published>2025-11-07T08:00:00Z</published>
+<summary>Atom summary</summary></entry>
+</feed>"""
+
+
+def test_stream_parser_stops_after_count():
+    chunks_read = []
+
+    def chunks():
+        for i in range(0, len(MEDIA_RSS), 64):
+            chunks_read.append(i)
+            yield MEDIA_RSS[i:i + 64]
+
+    records, truncated = parse_feed_stream(chunks(), count=1)
+    assert truncated and len(records) == 1
+    assert len(chunks_read) < len(MEDIA_RSS) // 64, "读够条数后应停止读取"
+
+    record = records[0]
+    assert record["title"] == "图片新闻"
+    assert record["url"] == "https://example.com/a"
+    assert record["published"] == "Fri, 07 Nov 2025 08:00:00 GMT"
+    assert record["raw_content"] == "<p>Hello <b>world</b></p>"
+    assert record["image_urls"] == ["https://img.example.com/1.jpg", "https://img.example.com/2.png"]
+    print("✓ 流式解析提前停止，字段提取正确")
+
+
+def test_stream_parser_atom_and_fallback():
+    records, truncated = parse_feed_stream([ATOM_FEED], count=5)
+    assert not truncated and len(records) == 1
+    assert records[0]["url"] == "https://example.com/atom/1"
+    assert records[0]["published"] == "2025-11-07T08:00:00Z"
+    assert records[0]["image_urls"] == ["https://img.example.com/atom.jpg"]
+
+    # 没有 link 时使用 guid 作为链接，isPermaLink="false" 的 guid 除外
+    records, _ = parse_feed_stream([
+        b"<rss><channel>"
+        b"<item><title>a</title><guid>https://example.com/guid/1</guid></item>"
+        b"<item><title>b</title><guid isPermaLink=\"false\">tag:example.com,2025:2</guid></item>"
+        b"</channel></rss>"
+    ], count=5)
+    assert [r["url"] for r in records] == ["https://example.com/guid/1", ""]
+
+    # 未定义的 HTML 实体属于格式异常，应交由 feedparser 处理
+    try:
+        parse_feed_stream([b"<rss><channel><item><title>a&nbsp;b</title></item></channel></rss>"], count=1)
+        assert False, "应抛出 FeedStreamError"
+    except FeedStreamError:
+        pass
+    print("✓ Atom 解析、guid 链接与格式异常回退正常")
+
+
+if __name__ == "__main__":
+    test_fetch_single_source()
+    test_fetch_multiple_sources_partial_results()
+    test_parse_in_process_pool()
+    test_iter_multiple_sources_yields_as_completed()
+    test_parse_published_and_time_window()
+    test_feed_cache_ttl_and_not_modified()
+    test_stream_parser_stops_after_count()
+    test_stream_parser_atom_and_fallback()
+    print("\n✓ RSS 获取测试通过")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""测试发送给 AI 前的正文压缩"""
+
+import config
+from models.news import NewsItem
+from services import ai_writer
+from services.llm_client import estimate_tokens
+from services.text_compactor import compact_text, split_sentences, strip_boilerplate
+
+TITLE = "苹果发布 iPhone 17"
+CONTENT = (
+    "苹果公司今天发布了新款 iPhone 17。该机售价 5999 元起，比上一代便宜 500 元。"
+    "阅读原文 https://example.com/a。分享到微博。Apple said the phone ships Friday. "
+    "新机采用全新设计，屏幕更大。详情见 https://example.com/b 页面介绍。"
+    "责任编辑：张三。苹果公司今天发布了新款 iPhone 17。"
+)
+
+
+def test_split_and_strip_boilerplate():
+    sentences = split_sentences(CONTENT)
+    assert sentences[0] == "苹果公司今天发布了新款 iPhone 17。"
+    assert "Apple said the phone ships Friday." in sentences
+
+    kept = strip_boilerplate(sentences, TITLE)
+    assert not any("阅读原文" in s or "分享到" in s or "责任编辑" in s for s in kept)
+    assert not any("http" in s for s in kept)
+    assert "详情见 页面介绍。" in kept  # 句中链接只去掉链接本身
+    assert sum(s.startswith("苹果公司今天") for s in kept) == 1  # 重复句只保留一次
+    print(f"✓ 切分 {len(sentences)} 句，去除样板后保留 {len(kept)} 句")
+
+
+def test_compact_to_budget_keeps_order():
+    full = compact_text(CONTENT, 0, TITLE)
+    compacted = compact_text(CONTENT, 30, TITLE)
+
+    assert estimate_tokens(compacted) <= 30 < estimate_tokens(full)
+    assert compacted.startswith("苹果公司今天发布了新款 iPhone 17。")  # 导语优先保留
+    assert "5999" in compacted or "Apple" in compacted
+    # 抽取的句子保持原文顺序
+    positions = [full.index(s) for s in split_sentences(compacted)]
+    assert positions == sorted(positions)
+
+    assert len(compact_text("没有标点的一整段很长很长很长很长很长很长的文字", 5)) < 20
+    print(f"✓ 压缩到预算：{estimate_tokens(full)} → {estimate_tokens(compacted)} tokens")
+
+
+def test_prompt_uses_compacted_content_and_records_savings():
+    original_budget = config.AI_INPUT_TOKEN_BUDGET
+    config.AI_INPUT_TOKEN_BUDGET = 30
+    try:
+        news = NewsItem(title=TITLE, source="测试源", url="https://example.com/1",
+                        published="2025-01-01", raw_content=f"<p>{CONTENT}</p>")
+        prompt = ai_writer._build_news_prompt(news)
+        assert "阅读原文" not in prompt and "<p>" not in prompt
+        assert "苹果公司今天发布了新款 iPhone 17。" in prompt
+        assert news.tokens_saved == 0  # 构造提示词不修改新闻对象
+
+        # 节省量以清理 HTML 后的正文为基准，去掉的标签不算作压缩节省
+        saved = ai_writer._compaction_savings(news)
+        plain = NewsItem(title=TITLE, source="测试源", url="https://example.com/2",
+                         published="2025-01-01", raw_content=CONTENT)
+        assert saved == ai_writer._compaction_savings(plain) > 0
+        print(f"✓ 提示词使用压缩后的正文，节省 {saved} tokens")
+    finally:
+        config.AI_INPUT_TOKEN_BUDGET = original_budget
+
+
+if __name__ == "__main__":
+    test_split_and_strip_boilerplate()
+    test_compact_to_budget_keeps_order()
+    test_prompt_uses_compacted_content_and_records_savings()
+    print("\n✓ 正文压缩测试通过")